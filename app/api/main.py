@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import logging
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import List
 
@@ -13,6 +14,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.routes import router
 from app.api.realtime import manager
+from app.api.scheduler import RuleRefreshScheduler
 
 CONFIG_PATH = Path("config/default.yaml")
 
@@ -30,16 +32,39 @@ def _resolve_path(relative: str) -> Path:
     return Path(relative)
 
 
-def _load_api_settings() -> dict:
-    """Load API settings from the default configuration file."""
+def _load_config_section(section: str) -> dict:
+    """Load one section of the default configuration file."""
     config_path = _resolve_path(str(CONFIG_PATH))
     if config_path.exists():
         with config_path.open("r", encoding="utf-8") as handle:
             data = yaml.safe_load(handle) or {}
-            return data.get("api", {}) if isinstance(data, dict) else {}
+            return data.get(section, {}) if isinstance(data, dict) else {}
     return {}
 
 
+def _load_api_settings() -> dict:
+    """Load API settings from the default configuration file."""
+    return _load_config_section("api")
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """Run the rolling-window rule refresher for the lifetime of the server."""
+    scheduler = None
+    if _load_config_section("streaming").get("enabled", False):
+        from app.api.services import get_analytics_service
+
+        service = get_analytics_service()
+        scheduler = RuleRefreshScheduler(service, interval_seconds=service.streaming_interval_seconds)
+        scheduler.start()
+    app.state.rule_refresher = scheduler
+    try:
+        yield
+    finally:
+        if scheduler:
+            scheduler.stop()
+
+
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
     api_settings = _load_api_settings()
@@ -53,6 +78,7 @@ def create_app() -> FastAPI:
         title=title,
         description=description,
         version="1.0.0",
+        lifespan=_lifespan,
     )
 
     # Enable CORS for local Streamlit UI and default localhost clients
@@ -75,6 +101,8 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Mining endpoints report truncated or budget-adjusted results in headers
+        expose_headers=["X-Partial-Result", "X-Mining-Adjusted"],
     )
 
     app.include_router(router)
@@ -67,8 +67,144 @@ class RuleFilter(ContextFilter):
     max_depth: int = Field(
         default=0,
         ge=0,
-        le=2,
-        description="Context depth for mining (0=overall only, 1=add single dimensions, 2=double combinations).",
+        le=5,
+        description=(
+            "Context depth for mining (0=overall only, 1=add single dimensions, "
+            "2=double combinations, up to 5=every dimension combined)."
+        ),
+    )
+    max_len: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=10,
+        description=(
+            "Maximum items per rule (antecedent + consequent); at 3 or less the pair-matrix engine "
+            "becomes eligible and is used where its calibrated cost is lowest."
+        ),
+    )
+    n_jobs: Optional[int] = Field(
+        default=None,
+        ge=-1,
+        le=64,
+        description=(
+            "Worker processes for per-context mining (1=sequential, -1=all cores, unset=config default); "
+            "capped at the number of cores."
+        ),
+    )
+    approximate: bool = Field(
+        default=False,
+        description=(
+            "Mine a random sample of each context at a lowered threshold and verify candidates "
+            "with one exact pass (supports stay exact; faster on large stores)."
+        ),
+    )
+    sample_size: Optional[int] = Field(
+        default=None,
+        ge=100,
+        description="Baskets sampled per context in approximate mode (unset=derived from the error bound).",
+    )
+    time_budget_ms: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Approximate mode: size each sample to fit this mining time budget.",
+    )
+    itemset_mode: Optional[str] = Field(
+        default=None,
+        pattern="^(all|closed|maximal)$",
+        description=(
+            "Itemsets rules are built from: all frequent itemsets, closed itemsets only "
+            "(non-redundant rules), or maximal itemsets only (unset=config default)."
+        ),
+    )
+    deadline_ms: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description=(
+            "Time budget for mining: contexts are mined Overall first, then festivals, single "
+            "dimensions and pairs; when it runs out the finished contexts are returned and the "
+            "X-Partial-Result header is true. Streamed (out-of-core) mining finishes all contexts "
+            "together, so it returns no rules when stopped."
+        ),
+    )
+    multi_level: Optional[bool] = Field(
+        default=None,
+        description=(
+            "Also mine item categories: category, SKU and cross-level rules (e.g. category:Dairy "
+            "-> BREAD) counted together, minus rules implied by a more general one (unset=config default)."
+        ),
+    )
+
+
+class ContrastFilter(ContextFilter):
+    """Parameters for emerging-pattern (contrast) mining across contexts."""
+
+    min_support: float = Field(
+        default=0.01,
+        ge=0.0,
+        le=1.0,
+        description="Minimum support of a pattern within its own context.",
+    )
+    min_growth: float = Field(
+        default=2.0,
+        gt=1.0,
+        description="Minimum ratio of context support to the support in every parent context.",
+    )
+    max_depth: int = Field(
+        default=1,
+        ge=1,
+        le=5,
+        description="Context depth compared (1=single dimensions against Overall, 2=pairs against each dimension, ...).",
+    )
+    max_len: Optional[int] = Field(
+        default=3, ge=2, le=10, description="Maximum items per pattern."
+    )
+    min_rows_per_context: int = Field(
+        default=50,
+        ge=5,
+        description="Minimum rows required per context segment.",
+    )
+    limit: int = Field(
+        default=25,
+        ge=1,
+        le=200,
+        description="Maximum number of patterns to return.",
+    )
+
+
+class UtilityFilter(ContextFilter):
+    """Parameters for profit-first (high-utility) itemset mining."""
+
+    min_utility: float = Field(
+        default=0.01,
+        gt=0.0,
+        le=1.0,
+        description=(
+            "Minimum share of a context's total margin an itemset must earn. Checked against "
+            "the mining budget like min_support, which may raise it."
+        ),
+    )
+    min_len: int = Field(
+        default=2, ge=1, le=10, description="Minimum items per itemset (1 includes single items)."
+    )
+    max_len: Optional[int] = Field(
+        default=3, ge=1, le=10, description="Maximum items per itemset."
+    )
+    max_depth: int = Field(
+        default=0,
+        ge=0,
+        le=5,
+        description="Context depth for mining (0=overall only, 1=add single dimensions, ...).",
+    )
+    min_rows_per_context: int = Field(
+        default=50,
+        ge=5,
+        description="Minimum rows required per context segment.",
+    )
+    limit: int = Field(
+        default=25,
+        ge=1,
+        le=200,
+        description="Maximum number of itemsets to return.",
     )
 
 
@@ -150,6 +286,37 @@ class RuleResponse(BaseModel):
     )
 
 
+class ContrastPatternResponse(BaseModel):
+    """Itemset that is bought together far more often in a context than in its parent."""
+
+    items: List[str] = Field(description="Items in the emerging pattern.")
+    context: ContextSummary = Field(description="Context where the pattern spikes.")
+    parent_context: ContextSummary = Field(
+        description="Broader context it is compared with (the parent with the smallest growth)."
+    )
+    support: float = Field(description="Share of the context's baskets containing the pattern.")
+    parent_support: float = Field(description="Share of the parent context's baskets containing it.")
+    growth_rate: float = Field(description="Support divided by parent support.")
+    lift: float = Field(description="Lift of the pattern within the context (vs. item independence).")
+    parent_lift: float = Field(description="Lift of the pattern within the parent context.")
+    lift_delta: float = Field(description="Lift minus parent lift.")
+    explanation: str = Field(description="Plain-English summary of the contrast.")
+
+
+class HighUtilityItemsetResponse(BaseModel):
+    """Itemset ranked by the margin it earns within a context."""
+
+    items: List[str] = Field(description="Items in the itemset.")
+    context: ContextSummary = Field(description="Context segment the itemset was mined in.")
+    margin: float = Field(
+        description="Margin of the itemset's items, summed over baskets containing all of them."
+    )
+    margin_share: float = Field(description="Share of the context's total margin.")
+    margin_per_basket: float = Field(description="Margin averaged over every basket in the context.")
+    support: float = Field(description="Share of the context's baskets containing the itemset.")
+    explanation: str = Field(description="Plain-English summary of the itemset's contribution.")
+
+
 class BundleResponse(BaseModel):
     """Aggregated bundle recommendation derived from high-value rules."""
 
@@ -255,6 +422,51 @@ class MaintenanceSnapshot(BaseModel):
     )
 
 
+class StatementMetrics(BaseModel):
+    """Latency and volume statistics for one normalized SQL statement."""
+
+    statement: str = Field(description="Whitespace-normalized SQL text.")
+    kind: str = Field(description="Execution path: query, insert, many, script or snapshot_query.")
+    count: int = Field(description="Number of executions.")
+    total_ms: float = Field(description="Total wall-clock time across executions.")
+    mean_ms: float = Field(description="Mean latency per execution.")
+    p95_ms: float = Field(description="Approximate 95th percentile latency (bucket upper bound).")
+    max_ms: float = Field(description="Slowest single execution.")
+    rows: int = Field(description="Rows returned or affected across executions.")
+    lock_waits: int = Field(description="Executions that had to wait on a database lock.")
+    lock_wait_ms: float = Field(description="Total time spent waiting on locks.")
+    histogram: Dict[str, int] = Field(
+        default_factory=dict, description="Execution counts per latency bucket."
+    )
+
+
+class SlowQueryEntry(BaseModel):
+    """A single slow statement captured with its query plan."""
+
+    statement: str = Field(description="Whitespace-normalized SQL text.")
+    kind: str = Field(description="Execution path of the statement.")
+    elapsed_ms: float = Field(description="Wall-clock latency of the execution.")
+    rows: int = Field(description="Rows returned or affected.")
+    lock_wait_ms: float = Field(description="Time spent waiting on locks.")
+    plan: List[str] = Field(
+        default_factory=list, description="EXPLAIN QUERY PLAN detail lines."
+    )
+    recorded_at: float = Field(description="Unix timestamp when the query finished.")
+
+
+class DatabaseMetricsResponse(BaseModel):
+    """Database instrumentation snapshot for finding hot spots."""
+
+    enabled: bool = Field(description="Whether statement instrumentation is active.")
+    slow_query_ms: float = Field(description="Threshold for the slow-query log.")
+    statements: List[StatementMetrics] = Field(
+        default_factory=list, description="Per-statement statistics, highest total time first."
+    )
+    slow_queries: List[SlowQueryEntry] = Field(
+        default_factory=list, description="Most recent slow queries, newest first."
+    )
+
+
 class MaintenanceActionRequest(BaseModel):
     """Request payload for clearing cached/ingested data."""
 
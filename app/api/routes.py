@@ -1,23 +1,44 @@
 """FastAPI route definitions for ProfitLift."""
 
-from typing import List
+import asyncio
+import threading
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 
 from app.api.models import (
     BundleResponse,
+    ContrastFilter,
+    ContrastPatternResponse,
+    HighUtilityItemsetResponse,
+    DatabaseMetricsResponse,
     MaintenanceActionRequest,
     MaintenanceActionResponse,
     MaintenanceSnapshot,
     RuleFilter,
     RuleResponse,
+    UtilityFilter,
     WhatIfRequest,
     WhatIfResponse,
 )
 from app.api.services import AnalyticsService, get_analytics_service
+from app.mining.cost_estimator import MiningBudgetExceeded
 
 router = APIRouter()
 
+# How often a running /api/rules request checks whether its client disconnected
+DISCONNECT_POLL_SECONDS = 0.25
+
+
+def _set_adjusted_header(response: Response, adjusted: Optional[Tuple[float, Optional[int]]]):
+    """Report in X-Mining-Adjusted whether the mining budget changed the requested thresholds."""
+    if adjusted is None:
+        response.headers["X-Mining-Adjusted"] = "false"
+    else:
+        min_support, max_len = adjusted
+        response.headers["X-Mining-Adjusted"] = f"min_support={min_support:g}; max_len={max_len}"
+
 
 @router.post(
     "/api/upload",
@@ -51,13 +72,28 @@ async def upload_dataset(
     response_model=List[RuleResponse],
     summary="Retrieve context-aware association rules",
 )
-def get_rules(
+async def get_rules(
+    request: Request,
+    response: Response,
     filters: RuleFilter = Depends(),
     service: AnalyticsService = Depends(get_analytics_service),
 ) -> List[RuleResponse]:
     """Return scored association rules with plain-English explanations."""
+    cancel = threading.Event()
+    mining = asyncio.ensure_future(run_in_threadpool(service.get_rules_result, filters, cancel))
     try:
-        return service.get_rules(filters)
+        # Mining runs in a worker thread; stop it between contexts if the client goes away
+        while not mining.done():
+            await asyncio.wait({mining}, timeout=DISCONNECT_POLL_SECONDS)
+            if not mining.done() and await request.is_disconnected():
+                cancel.set()
+                break
+        result = await mining
+        response.headers["X-Partial-Result"] = "true" if result.partial else "false"
+        _set_adjusted_header(response, result.adjusted)
+        return result.responses
+    except MiningBudgetExceeded as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
     except Exception as exc:  # pragma: no cover - defensive guard
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
@@ -68,12 +104,53 @@ def get_rules(
     summary="Retrieve bundle recommendations",
 )
 def get_bundles(
+    response: Response,
     filters: RuleFilter = Depends(),
     service: AnalyticsService = Depends(get_analytics_service),
 ) -> List[BundleResponse]:
     """Return bundle recommendations derived from top rules."""
     try:
-        return service.get_bundles(filters)
+        result = service.get_bundles_result(filters)
+        _set_adjusted_header(response, result.adjusted)
+        return result.responses
+    except MiningBudgetExceeded as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    except Exception as exc:  # pragma: no cover - defensive guard
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@router.get(
+    "/api/contrast",
+    response_model=List[ContrastPatternResponse],
+    summary="Retrieve itemsets that emerge in specific contexts",
+)
+def get_contrasts(
+    filters: ContrastFilter = Depends(),
+    service: AnalyticsService = Depends(get_analytics_service),
+) -> List[ContrastPatternResponse]:
+    """Return itemsets whose support in a context is a multiple of their parent context's."""
+    try:
+        return service.get_contrasts(filters)
+    except MiningBudgetExceeded as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    except Exception as exc:  # pragma: no cover - defensive guard
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@router.get(
+    "/api/high-utility",
+    response_model=List[HighUtilityItemsetResponse],
+    summary="Retrieve the itemsets that earn the most margin per context",
+)
+def get_high_utility(
+    filters: UtilityFilter = Depends(),
+    service: AnalyticsService = Depends(get_analytics_service),
+) -> List[HighUtilityItemsetResponse]:
+    """Return itemsets ranked by margin, mined without a support threshold."""
+    try:
+        return service.get_high_utility(filters)
+    except MiningBudgetExceeded as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
     except Exception as exc:  # pragma: no cover - defensive guard
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
@@ -123,6 +200,22 @@ def get_settings_overview(
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+@router.get(
+    "/api/metrics/db",
+    response_model=DatabaseMetricsResponse,
+    summary="Database query latency metrics and slow-query log",
+)
+def get_db_metrics(
+    reset: bool = False,
+    service: AnalyticsService = Depends(get_analytics_service),
+) -> DatabaseMetricsResponse:
+    """Return per-statement latency histograms, row counts, lock waits and slow queries."""
+    try:
+        return service.get_db_metrics(reset=reset)
+    except Exception as exc:  # pragma: no cover - defensive guard
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
 @router.post(
     "/api/settings/clear",
     response_model=MaintenanceActionResponse,
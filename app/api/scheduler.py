@@ -0,0 +1,70 @@
+"""Background refresher for the precomputed rolling-window rule set."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover - import for type checking only
+    from app.api.services import AnalyticsService
+
+
+class RuleRefreshScheduler:
+    """Re-mines the rolling window whenever new data has arrived, on a fixed interval."""
+
+    def __init__(self, service: "AnalyticsService", interval_seconds: float = 300):
+        """
+        Initialize scheduler.
+
+        Args:
+            service: Analytics service owning the database and mining settings
+            interval_seconds: Seconds between checks for new data
+        """
+        self.service = service
+        self.interval_seconds = interval_seconds
+        self.logger = logging.getLogger(__name__)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_version: Optional[tuple] = None
+
+    def start(self):
+        """Start the background thread (refreshes immediately, then every interval)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rule-refresh", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Rule refresher started (every {self.interval_seconds:.0f}s)")
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Signal the thread to stop and wait for the current refresh to finish."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self, force: bool = False) -> bool:
+        """
+        Refresh the precomputed rules if the data changed since the last refresh.
+
+        Args:
+            force: Refresh even when no new data has arrived
+
+        Returns:
+            True when a refresh ran
+        """
+        version = self.service.data_version()
+        if not force and version == self._last_version:
+            return False
+        self.service.refresh_precomputed_rules()
+        self._last_version = version
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as exc:
+                self.logger.warning(f"Rule refresh failed: {exc}")
+            self._stop.wait(self.interval_seconds)
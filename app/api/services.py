@@ -2,13 +2,16 @@
 
 from __future__ import annotations
 
+import json
 import logging
+import threading
 from functools import lru_cache
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 import sys
-from typing import Dict, List, Optional, TYPE_CHECKING
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, TYPE_CHECKING
 
+import numpy as np
 import yaml
 from fastapi import UploadFile
 
@@ -20,22 +23,37 @@ else:
         import pandas as pd
         return pd
 
-from app.assets.database import DatabaseManager
+from app.assets.database import DatabaseManager, DatabaseSnapshot
 from app.causal.causal_estimator import CausalEstimator, UpliftResult
 from app.ingest.csv_importer import CSVImporter, ImportResult
+from app.ingest.india_calendar import get_major_festival
 from app.mining.context_aware_miner import ContextAwareMiner
+from app.mining.contrast import ContrastPattern
+from app.mining.basket_stream import BasketStream
+from app.mining.cost_estimator import MiningBudget
+from app.mining.engine_selector import load_calibration
+from app.mining.high_utility import HighUtilityItemset
+from app.mining.incremental import IncrementalMiner
+from app.mining.sampling import SamplingConfig
+from app.mining.time_window import decay_weights, window_transactions
 from app.mining.context_types import Context, ContextualRule
+from app.mining.rule_set import RuleSet
 from app.score.multi_objective import MultiObjectiveScorer
 from app.api.models import (
     BundleResponse,
     ContextFilter,
     ContextSummary,
+    ContrastFilter,
+    ContrastPatternResponse,
+    DatabaseMetricsResponse,
+    HighUtilityItemsetResponse,
     MaintenanceActionRequest,
     MaintenanceActionResponse,
     MaintenanceSnapshot,
     RuleFilter,
     RuleResponse,
     UpliftMetrics,
+    UtilityFilter,
     WhatIfRequest,
     WhatIfResponse,
 )
@@ -43,6 +61,22 @@ from app.api.models import (
 DEFAULT_CONFIG_PATH = Path("config/default.yaml")
 DEFAULT_SCORING_PATH = Path("config/scoring.yaml")
 
+# Rule filter behind the dashboard statistics (and the precomputed rule set)
+DASHBOARD_RULE_FILTER = {
+    "min_support": 0.05,
+    "min_confidence": 0.1,
+    "min_lift": 1.2,
+    "limit": 200,
+    "max_depth": 0,
+}
+
+
+class MiningResult(NamedTuple):
+    """Responses of a mining request and how mining departed from what was asked."""
+    responses: list
+    partial: bool = False                  # Contexts were left unmined (deadline or cancellation)
+    adjusted: Optional[Tuple[float, Optional[int]]] = None  # (min_support, max_len) set by the budget
+
 
 def _resolve_path(relative: Path) -> Path:
     """Resolve resource paths for both dev and frozen builds."""
@@ -80,12 +114,26 @@ def _build_context_summary(context: Context) -> ContextSummary:
 
 def _make_rule_explanation(rule: ContextualRule, uplift: Optional[UpliftResult]) -> str:
     """Generate a concise, business-facing explanation for a rule."""
-    ant_str = ", ".join(sorted(rule.antecedent))
-    cons_str = ", ".join(sorted(rule.consequent))
-    context_label = str(rule.context)
+    return _explain_rule(sorted(rule.antecedent), sorted(rule.consequent), rule.context,
+                         rule.confidence, rule.lift, rule.profit_score, uplift)
+
+
+def _explain_rule(
+    antecedent: List[str],
+    consequent: List[str],
+    context: Context,
+    confidence: float,
+    lift: float,
+    profit_score: Optional[float],
+    uplift: Optional[UpliftResult],
+) -> str:
+    """Explanation text from a rule's sorted items and metrics."""
+    ant_str = ", ".join(antecedent)
+    cons_str = ", ".join(consequent)
+    context_label = str(context)
     base = (
         f"When shoppers buy {ant_str}, they also tend to add {cons_str} "
-        f"({rule.confidence:.0%} of the time, lift {rule.lift:.2f})."
+        f"({confidence:.0%} of the time, lift {lift:.2f})."
     )
     if context_label != "Overall":
         base = f"In {context_label.lower()}, {base[0].lower()}{base[1:]}"
@@ -95,29 +143,32 @@ def _make_rule_explanation(rule: ContextualRule, uplift: Optional[UpliftResult])
             f" True uplift of {uplift.incremental_attach_rate:.1%} "
             f"drives about ${uplift.incremental_margin:.2f} extra margin per basket."
         )
-    elif rule.profit_score:
-        base += f" Expect roughly ${rule.profit_score:.2f} extra margin per basket."
+    elif profit_score:
+        base += f" Expect roughly ${profit_score:.2f} extra margin per basket."
 
     return base
 
 
+def _uplift_metrics(uplift: Optional[UpliftResult]) -> Optional[UpliftMetrics]:
+    """Convert an uplift estimate into its API payload."""
+    if not uplift:
+        return None
+    return UpliftMetrics(
+        incremental_attach_rate=uplift.incremental_attach_rate,
+        incremental_revenue=uplift.incremental_revenue,
+        incremental_margin=uplift.incremental_margin,
+        control_rate=uplift.control_rate,
+        treatment_rate=uplift.treatment_rate,
+        confidence_interval=uplift.confidence_interval,
+        sample_size=uplift.sample_size,
+    )
+
+
 def _rule_to_response(
     rule: ContextualRule,
     uplift: Optional[UpliftResult],
 ) -> RuleResponse:
     """Convert a contextual rule into a RuleResponse payload."""
-    uplift_payload: Optional[UpliftMetrics] = None
-    if uplift:
-        uplift_payload = UpliftMetrics(
-            incremental_attach_rate=uplift.incremental_attach_rate,
-            incremental_revenue=uplift.incremental_revenue,
-            incremental_margin=uplift.incremental_margin,
-            control_rate=uplift.control_rate,
-            treatment_rate=uplift.treatment_rate,
-            confidence_interval=uplift.confidence_interval,
-            sample_size=uplift.sample_size,
-        )
-
     return RuleResponse(
         antecedent=sorted(rule.antecedent),
         consequent=sorted(rule.consequent),
@@ -129,26 +180,52 @@ def _rule_to_response(
         diversity_score=rule.diversity_score,
         overall_score=rule.overall_score,
         explanation=_make_rule_explanation(rule, uplift),
-        uplift=uplift_payload,
+        uplift=_uplift_metrics(uplift),
     )
 
 
+def _rule_set_to_responses(
+    rules: RuleSet,
+    uplifts: Dict[int, UpliftResult],
+) -> List[RuleResponse]:
+    """Convert a RuleSet into RuleResponse payloads straight from its columns."""
+    def optional(values: np.ndarray) -> List[Optional[float]]:
+        return [None if np.isnan(v) else v for v in values.tolist()]
+
+    summaries = [_build_context_summary(context) for context in rules.contexts]
+    columns = zip(
+        rules.context_ids.tolist(), rules.support.tolist(), rules.confidence.tolist(),
+        rules.lift.tolist(), optional(rules.profit_score), optional(rules.diversity_score),
+        optional(rules.overall_score),
+    )
+    responses: List[RuleResponse] = []
+    for idx, (context_id, support, confidence, lift, profit, diversity, overall) in enumerate(columns):
+        antecedent = rules.antecedent_labels(idx)
+        consequent = rules.consequent_labels(idx)
+        uplift = uplifts.get(idx)
+        responses.append(RuleResponse(
+            antecedent=antecedent,
+            consequent=consequent,
+            context=summaries[context_id],
+            support=support,
+            confidence=confidence,
+            lift=lift,
+            profit_score=profit,
+            diversity_score=diversity,
+            overall_score=overall,
+            explanation=_explain_rule(antecedent, consequent, rules.contexts[context_id],
+                                      confidence, lift, profit, uplift),
+            uplift=_uplift_metrics(uplift),
+        ))
+    return responses
+
+
 def _rule_to_bundle_response(
     rule: ContextualRule,
     uplift: Optional[UpliftResult],
 ) -> BundleResponse:
     """Convert contextual rule into bundle recommendation payload."""
-    uplift_payload: Optional[UpliftMetrics] = None
-    if uplift:
-        uplift_payload = UpliftMetrics(
-            incremental_attach_rate=uplift.incremental_attach_rate,
-            incremental_revenue=uplift.incremental_revenue,
-            incremental_margin=uplift.incremental_margin,
-            control_rate=uplift.control_rate,
-            treatment_rate=uplift.treatment_rate,
-            confidence_interval=uplift.confidence_interval,
-            sample_size=uplift.sample_size,
-        )
+    uplift_payload = _uplift_metrics(uplift)
 
     bundle_id = f"{'-'.join(sorted(rule.antecedent))}__{('-'.join(sorted(rule.consequent)))}__{str(rule.context)}"
     anchor_items = sorted(rule.antecedent)
@@ -191,6 +268,47 @@ def _rule_to_bundle_response(
     )
 
 
+def _contrast_to_response(pattern: ContrastPattern) -> ContrastPatternResponse:
+    """Convert an emerging pattern into an API payload with a plain-English summary."""
+    items = sorted(pattern.itemset)
+    explanation = (
+        f"{' + '.join(items)} is bought together {pattern.growth_rate:.1f}x as often in "
+        f"{str(pattern.context)} as in {str(pattern.parent)} "
+        f"({pattern.support:.1%} vs {pattern.parent_support:.1%} of baskets)."
+    )
+    return ContrastPatternResponse(
+        items=items,
+        context=_build_context_summary(pattern.context),
+        parent_context=_build_context_summary(pattern.parent),
+        support=pattern.support,
+        parent_support=pattern.parent_support,
+        growth_rate=pattern.growth_rate,
+        lift=pattern.lift,
+        parent_lift=pattern.parent_lift,
+        lift_delta=pattern.lift_delta,
+        explanation=explanation,
+    )
+
+
+def _high_utility_to_response(itemset: HighUtilityItemset) -> HighUtilityItemsetResponse:
+    """Convert a high-utility itemset into an API payload with a plain-English summary."""
+    items = sorted(itemset.itemset)
+    margin_per_basket = itemset.utility / itemset.n_baskets if itemset.n_baskets else 0.0
+    explanation = (
+        f"{' + '.join(items)} earns {itemset.utility_share:.1%} of the margin in "
+        f"{str(itemset.context)} (${itemset.utility:,.2f}) from {itemset.support:.1%} of baskets."
+    )
+    return HighUtilityItemsetResponse(
+        items=items,
+        context=_build_context_summary(itemset.context),
+        margin=itemset.utility,
+        margin_share=itemset.utility_share,
+        margin_per_basket=margin_per_basket,
+        support=itemset.support,
+        explanation=explanation,
+    )
+
+
 class AnalyticsService:
     """Encapsulates business logic required by the API routes."""
 
@@ -198,24 +316,56 @@ class AnalyticsService:
         self.logger = logging.getLogger(__name__)
         config = _load_yaml(config_path)
 
-        db_path = (
-            config.get("database", {}).get("path")
-            if isinstance(config.get("database"), dict)
-            else None
-        ) or "profitlift.db"
+        db_config = config.get("database", {}) if isinstance(config.get("database"), dict) else {}
+        db_path = db_config.get("path") or "profitlift.db"
         self.db = DatabaseManager(db_path)
+        # Analytics jobs read from a pinned snapshot ("wal") or a temp copy ("copy")
+        self.snapshot_mode = db_config.get("snapshot_mode", "wal")
+        self.db.metrics.configure(
+            slow_query_ms=db_config.get("slow_query_ms"),
+            slow_log_size=db_config.get("slow_query_log_size"),
+            enabled=db_config.get("metrics_enabled"),
+        )
         self.csv_importer = CSVImporter(db_path=db_path)
 
         scoring_config = _load_yaml(DEFAULT_SCORING_PATH)
         weights = scoring_config.get("weights") if isinstance(scoring_config, dict) else None
         self.scorer = MultiObjectiveScorer(weights=weights)
 
+        mining_config = config.get("mining", {}) if isinstance(config, dict) else {}
+        self.mining_n_jobs = int(mining_config.get("n_jobs", 1) or 1)
+        # Engines the per-segment selector may pick, costed by the benchmark calibration
+        self.mining_algorithms = mining_config.get("algorithms") or None
+        self.mining_calibration = load_calibration(mining_config.get("calibration_file"))
+        self.mining_counting = mining_config.get("context_counting", "per_segment")
+        # Maintain per-context itemset counts across imports instead of re-mining
+        self.mining_incremental = bool(mining_config.get("incremental", False))
+        # Closed/maximal modes mine a lossless (or smallest) summary of the frequent itemsets
+        self.mining_itemset_mode = mining_config.get("itemset_mode", "all")
+        self.bundle_itemset_mode = mining_config.get("bundle_itemset_mode", "closed")
+        self.max_consequent_size = mining_config.get("max_consequent_size")
+        self.mining_multi_level = bool(mining_config.get("multi_level", False))
+        self.mining_stream_batch_baskets = mining_config.get("stream_batch_baskets")
+        # Predicted time / memory limits checked before every mining request
+        budget_config = mining_config.get("budget")
+        self.mining_budget = MiningBudget(**budget_config) if budget_config else None
+
+        # Rolling-window rule set maintained by the background refresher
+        streaming_config = config.get("streaming", {}) if isinstance(config, dict) else {}
+        self.streaming_enabled = bool(streaming_config.get("enabled", False))
+        self.streaming_interval_seconds = float(streaming_config.get("check_interval_seconds", 300))
+        self.rolling_window_days = streaming_config.get("window_days")
+        self.decay_half_life_days = streaming_config.get("decay_half_life_days")
+        self._precomputed_version: Optional[tuple] = None
+
         uplift_config = config.get("uplift", {}) if isinstance(config, dict) else {}
         min_incremental_lift = uplift_config.get("min_incremental_lift", 0.05)
         self.causal_estimator = CausalEstimator(min_incremental_lift=min_incremental_lift)
         
         # Simple in-memory cache for mined rules
         self._rules_cache: Dict[str, List[ContextualRule]] = {}
+        # (min_support, max_len) the mining budget applied to a cached result instead of the request's
+        self._mining_adjustments: Dict[str, Tuple[float, Optional[int]]] = {}
 
         # Ensure fresh installs have data to work with (use bundled demo CSV).
         self._maybe_seed_demo_data()
@@ -223,6 +373,7 @@ class AnalyticsService:
     def clear_cache(self):
         """Clear the rules cache."""
         self._rules_cache = {}
+        self._mining_adjustments = {}
 
     def _maybe_seed_demo_data(self):
         """Load bundled demo data so recommendations are not empty on first run."""
@@ -252,9 +403,20 @@ class AnalyticsService:
     # ------------------------------------------------------------------ #
     # Data loading helpers
     # ------------------------------------------------------------------ #
-    def _load_transactions(self, filters: ContextFilter | None = None) -> 'pd.DataFrame':
-        """Load transaction-level data, applying context filters if provided."""
-        pd = _get_pandas()
+    def _read_snapshot(self):
+        """Pin a consistent read snapshot for a mining/scoring/causal job."""
+        return self.db.snapshot(copy=self.snapshot_mode == "copy")
+
+    def _resolve_n_jobs(self, filters: RuleFilter) -> int:
+        """Per-request n_jobs override, falling back to mining.n_jobs from config."""
+        return filters.n_jobs if filters.n_jobs is not None else self.mining_n_jobs
+
+    def _transaction_query(
+        self,
+        filters: ContextFilter | None = None,
+        item_ids: Optional[Sequence[str]] = None,
+    ) -> Tuple[str, List]:
+        """SQL and parameters for line items matching the context filters (and items)."""
         query = """
             SELECT
                 t.transaction_id,
@@ -265,6 +427,7 @@ class AnalyticsService:
                 t.context_weekday_weekend,
                 t.context_quarter,
                 t.discount_flag,
+                ti.id AS line_id,
                 ti.item_id,
                 ti.quantity,
                 ti.price,
@@ -291,11 +454,26 @@ class AnalyticsService:
             if filters.quarter:
                 conditions.append("t.context_quarter = ?")
                 params.append(filters.quarter)
+        if item_ids is not None:
+            conditions.append(f"ti.item_id IN ({', '.join('?' * len(item_ids))})")
+            params.extend(item_ids)
 
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
+        return query, params
+
+    def _load_transactions(
+        self,
+        filters: ContextFilter | None = None,
+        source: Optional[DatabaseSnapshot] = None,
+        item_ids: Optional[Sequence[str]] = None,
+    ) -> 'pd.DataFrame':
+        """Load transaction-level data, applying context filters (and an item subset) if provided."""
+        pd = _get_pandas()
+        query, params = self._transaction_query(filters, item_ids)
 
-        rows = self.db.execute_query(query, tuple(params) if params else None)
+        reader = source if source is not None else self.db
+        rows = reader.execute_query(query, tuple(params) if params else None)
         df = pd.DataFrame(rows)
 
         if df.empty:
@@ -308,6 +486,24 @@ class AnalyticsService:
 
         return df
 
+    def _basket_stream(self, filters: ContextFilter, source: DatabaseSnapshot,
+                       batch_baskets: int) -> BasketStream:
+        """Out-of-core source of whole-basket batches read straight from the cursor."""
+        query, params = self._transaction_query(filters)
+        query += " ORDER BY t.transaction_id"
+        return BasketStream(
+            lambda: source.iter_query(query, tuple(params) if params else None),
+            batch_baskets=batch_baskets,
+        )
+
+    def _count_baskets(self, filters: ContextFilter, source: DatabaseSnapshot) -> int:
+        """Number of baskets matching the context filters."""
+        query, params = self._transaction_query(filters)
+        rows = source.execute_query(
+            f"SELECT COUNT(DISTINCT transaction_id) AS baskets FROM ({query})", tuple(params) if params else None
+        )
+        return int(rows[0]["baskets"]) if rows else 0
+
     # ------------------------------------------------------------------ #
     # CSV import
     # ------------------------------------------------------------------ #
@@ -321,6 +517,8 @@ class AnalyticsService:
         try:
             result = self.csv_importer.import_csv(str(temp_path))
             self.clear_cache() # Invalidate cache on new data
+            if self.mining_incremental and result.rows_imported > 0:
+                self._refresh_incremental_states()
             return result
         finally:
             temp_path.unlink(missing_ok=True)
@@ -330,33 +528,82 @@ class AnalyticsService:
     # ------------------------------------------------------------------ #
     def get_rules(self, filters: RuleFilter) -> List[RuleResponse]:
         """Mine, score, and format association rules."""
+        return self.get_rules_result(filters).responses
+
+    def get_rules_result(self, filters: RuleFilter, cancel: Optional[threading.Event] = None) -> MiningResult:
+        """
+        Mine, score, and format association rules within the request's deadline.
+
+        Args:
+            filters: Rule filter (deadline_ms caps context mining)
+            cancel: Event set when the caller no longer wants the result
+
+        Returns:
+            MiningResult with the rules, whether contexts were left unmined and
+            the min_support / max_len the budget applied if it changed them
+        """
         # Check cache for exact filter match (simplified caching strategy)
-        cache_key = f"rules_{filters.min_support}_{filters.min_confidence}_{filters.min_rows_per_context}_{filters.max_depth}"
-        
-        transactions = self._load_transactions(filters)
+        cache_key = f"rules_{filters.min_support}_{filters.min_confidence}_{filters.min_lift}_{filters.min_rows_per_context}_{filters.max_depth}_{filters.max_len}"
+        if filters.approximate:
+            cache_key += f"_approx_{filters.sample_size}_{filters.time_budget_ms}"
+        itemset_mode = filters.itemset_mode or self.mining_itemset_mode
+        multi_level = self.mining_multi_level if filters.multi_level is None else filters.multi_level
+        cache_key += f"_{itemset_mode}_{multi_level}"
+
+        if (self.mining_stream_batch_baskets and not filters.include_causal and not filters.approximate
+                and itemset_mode == "all" and not multi_level):
+            # Causal uplift needs every line item in memory; rules alone can be streamed
+            return self._get_rules_streaming(filters, cache_key, cancel)
+
+        with self._read_snapshot() as snapshot:
+            transactions = self._load_transactions(filters, snapshot)
         if transactions.empty:
-            return []
+            return MiningResult([])
+
+        partial = False
 
         if cache_key in self._rules_cache:
             rules = self._rules_cache[cache_key]
+        elif (self.mining_incremental and not filters.approximate and itemset_mode == "all"
+              and not multi_level):
+            incremental = self._incremental_miner(filters)
+            rules = incremental.update(transactions, deadline_ms=filters.deadline_ms, cancel=cancel)
+            partial = incremental.partial
+            if incremental.adjusted is not None:
+                self._mining_adjustments[cache_key] = incremental.adjusted
+            if not partial:
+                self._rules_cache[cache_key] = rules
         else:
             miner = ContextAwareMiner(
                 min_support=filters.min_support,
                 min_confidence=filters.min_confidence,
                 min_rows_per_context=filters.min_rows_per_context,
+                n_jobs=self._resolve_n_jobs(filters),
+                max_len=filters.max_len,
+                algorithms=self.mining_algorithms,
+                calibration=self.mining_calibration,
+                counting=self.mining_counting,
+                sampling=self._sampling_config(filters),
+                itemset_mode=itemset_mode,
+                min_lift=filters.min_lift,
+                max_consequent_size=self.max_consequent_size,
+                budget=self.mining_budget,
+                multi_level=multi_level,
             )
-            rules = miner.mine_all_contexts(transactions, max_depth=filters.max_depth)
-            self._rules_cache[cache_key] = rules
+            rules = miner.mine_all_contexts(
+                transactions, max_depth=filters.max_depth, deadline_ms=filters.deadline_ms, cancel=cancel
+            )
+            partial = miner.partial
+            if not partial:
+                self._cache_rules(cache_key, rules, miner)
+        adjusted = self._mining_adjustments.get(cache_key)
 
-        if not rules:
-            return []
+        if cancel is not None and cancel.is_set():
+            return MiningResult([], partial=True)
+        if not len(rules):
+            return MiningResult([], partial=partial, adjusted=adjusted)
 
-        # Filter by lift threshold
-        rules = [rule for rule in rules if rule.lift >= filters.min_lift]
-        if not rules:
-            return []
-
-        # Cap candidates to keep scoring performant
+        # Lift is pruned during rule generation; cap candidates to keep scoring performant
         max_candidates = max(filters.limit * 10, 500)
         rules = rules[:max_candidates]
 
@@ -369,11 +616,232 @@ class AnalyticsService:
                 uplift_result = self.causal_estimator.estimate_uplift(rule, transactions)
                 uplift_results[idx] = uplift_result
 
-        responses: List[RuleResponse] = []
-        for idx, rule in enumerate(top_rules):
-            uplift = uplift_results.get(idx)
-            responses.append(_rule_to_response(rule, uplift))
+        return MiningResult(_rule_set_to_responses(top_rules, uplift_results), partial=partial, adjusted=adjusted)
+
+    def _get_rules_streaming(self, filters: RuleFilter, cache_key: str,
+                             cancel: Optional[threading.Event] = None) -> MiningResult:
+        """
+        Mine rules out of core and score them from their items' line items only.
 
+        Baskets are streamed in batches of stream_batch_baskets and mined with
+        SON (two scans of one snapshot), so memory follows the itemset counts
+        rather than the size of the history. SON finishes every context at
+        once, so a request stopped by its deadline or cancel event gets no rules.
+        """
+        with self._read_snapshot() as snapshot:
+            if cache_key in self._rules_cache:
+                rules = self._rules_cache[cache_key]
+            else:
+                miner = ContextAwareMiner(
+                    min_support=filters.min_support,
+                    min_confidence=filters.min_confidence,
+                    min_rows_per_context=filters.min_rows_per_context,
+                    n_jobs=self._resolve_n_jobs(filters),
+                    max_len=filters.max_len,
+                    algorithms=self.mining_algorithms,
+                    calibration=self.mining_calibration,
+                    min_lift=filters.min_lift,
+                    max_consequent_size=self.max_consequent_size,
+                    budget=self.mining_budget,
+                )
+                stream = self._basket_stream(filters, snapshot, int(self.mining_stream_batch_baskets))
+                rules = miner.mine_partitioned(
+                    stream, max_depth=filters.max_depth, total_baskets=self._count_baskets(filters, snapshot),
+                    deadline_ms=filters.deadline_ms, cancel=cancel,
+                )
+                if miner.partial:
+                    return MiningResult([], partial=True)
+                self._cache_rules(cache_key, rules, miner)
+
+            adjusted = self._mining_adjustments.get(cache_key)
+            if not len(rules):
+                return MiningResult([], adjusted=adjusted)
+            rules = rules[: max(filters.limit * 10, 500)]
+            # Profit scoring only reads the line items of the rules' items
+            transactions = self._load_transactions(
+                filters, snapshot, item_ids=sorted({str(item) for item in rules.items})
+            )
+
+        top_rules = self.scorer.score_rules(rules, transactions)[: filters.limit]
+        return MiningResult(_rule_set_to_responses(top_rules, {}), adjusted=adjusted)
+
+    def _cache_rules(self, cache_key: str, rules: RuleSet, miner: ContextAwareMiner):
+        """Cache mined rules along with the thresholds the budget applied, if it changed them."""
+        self._rules_cache[cache_key] = rules
+        plan = miner.cost_plan
+        if plan is not None and plan.adjusted:
+            self._mining_adjustments[cache_key] = (plan.min_support, plan.max_len)
+
+    def _sampling_config(self, filters: RuleFilter) -> Optional[SamplingConfig]:
+        """Approximate-mode settings for a rule filter (None for exact mining)."""
+        if not filters.approximate:
+            return None
+        return SamplingConfig(sample_size=filters.sample_size, time_budget_ms=filters.time_budget_ms)
+
+    def _incremental_miner(self, filters: RuleFilter) -> IncrementalMiner:
+        """Incremental miner for a rule filter's mining parameters and context scope."""
+        return IncrementalMiner(
+            self.db,
+            min_support=filters.min_support,
+            min_confidence=filters.min_confidence,
+            min_rows_per_context=filters.min_rows_per_context,
+            max_depth=filters.max_depth,
+            max_len=filters.max_len,
+            scope={
+                "store_id": filters.store_id,
+                "time_bin": filters.time_bin,
+                "weekday_weekend": filters.weekday_weekend,
+                "quarter": filters.quarter,
+            },
+            algorithms=self.mining_algorithms,
+            calibration=self.mining_calibration,
+            min_lift=filters.min_lift,
+            max_consequent_size=self.max_consequent_size,
+            budget=self.mining_budget,
+        )
+
+    def _refresh_incremental_states(self):
+        """Fold newly imported baskets into every stored incremental mining state."""
+        for params in IncrementalMiner.stored_params(self.db):
+            try:
+                filters = RuleFilter(**params.get("scope", {}), **{
+                    key: params[key] for key in (
+                        "min_support", "min_confidence", "min_rows_per_context", "max_depth", "max_len"
+                    )
+                })
+                with self._read_snapshot() as snapshot:
+                    transactions = self._load_transactions(filters, snapshot)
+                self._incremental_miner(filters).update(transactions)
+            except Exception as exc:
+                self.logger.warning("Incremental refresh failed for %s: %s", params, exc)
+
+    # ------------------------------------------------------------------ #
+    # Precomputed rolling-window rules
+    # ------------------------------------------------------------------ #
+    def data_version(self) -> tuple:
+        """Cheap fingerprint of the line-item data (changes on import or clear)."""
+        rows = self.db.execute_query(
+            "SELECT MAX(id) AS max_id, COUNT(*) AS line_count FROM transaction_items"
+        )
+        return (rows[0]["max_id"], rows[0]["line_count"]) if rows else (None, 0)
+
+    def refresh_precomputed_rules(self, filters: Optional[RuleFilter] = None) -> int:
+        """
+        Re-mine the rolling window and replace the persisted rule set.
+
+        Args:
+            filters: Mining parameters (defaults to the dashboard filter)
+
+        Returns:
+            Number of rules persisted
+        """
+        filters = filters or RuleFilter(**DASHBOARD_RULE_FILTER)
+        version = self.data_version()
+
+        with self._read_snapshot() as snapshot:
+            transactions = self._load_transactions(filters, snapshot)
+        transactions = window_transactions(transactions, self.rolling_window_days)
+
+        scored = RuleSet.empty()
+        if not transactions.empty:
+            weights = None
+            if self.decay_half_life_days:
+                weights = decay_weights(transactions, float(self.decay_half_life_days))
+            miner = ContextAwareMiner(
+                min_support=filters.min_support,
+                min_confidence=filters.min_confidence,
+                min_rows_per_context=filters.min_rows_per_context,
+                n_jobs=self._resolve_n_jobs(filters),
+                max_len=filters.max_len,
+                algorithms=self.mining_algorithms,
+                calibration=self.mining_calibration,
+                counting=self.mining_counting,
+                min_lift=filters.min_lift,
+                max_consequent_size=self.max_consequent_size,
+                budget=self.mining_budget,
+            )
+            rules = miner.mine_all_contexts(
+                transactions, max_depth=filters.max_depth, basket_weights=weights
+            )
+            if len(rules):
+                scored = self.scorer.score_rules(rules, transactions)[: filters.limit]
+
+        self._save_precomputed_rules(scored)
+        self._precomputed_version = version
+        self.logger.info(
+            "Refreshed %s precomputed rules (window=%s days, half-life=%s days)",
+            len(scored), self.rolling_window_days, self.decay_half_life_days,
+        )
+        return len(scored)
+
+    def _save_precomputed_rules(self, rules: RuleSet):
+        """Replace the association_rules table contents in one transaction."""
+        def optional(values: np.ndarray) -> List[Optional[float]]:
+            return [None if np.isnan(v) else v for v in values.tolist()]
+
+        contexts = [
+            (c.store_id, c.time_bin, c.weekday_weekend, c.quarter, c.festival_period)
+            for c in rules.contexts
+        ]
+        records = [
+            (
+                json.dumps(rules.antecedent_labels(idx)),
+                json.dumps(rules.consequent_labels(idx)),
+                support, confidence, lift, profit, diversity, overall,
+                *contexts[context_id],
+            )
+            for idx, (context_id, support, confidence, lift, profit, diversity, overall) in enumerate(zip(
+                rules.context_ids.tolist(), rules.support.tolist(), rules.confidence.tolist(),
+                rules.lift.tolist(), optional(rules.profit_score), optional(rules.diversity_score),
+                optional(rules.overall_score),
+            ))
+        ]
+        # Runs on the refresher thread: write through a dedicated connection so
+        # this transaction never interleaves with request-thread writes
+        with self.db.dedicated_writer() as writer, writer.transaction():
+            writer.execute_insert("DELETE FROM uplift_results")
+            writer.execute_insert("DELETE FROM association_rules")
+            if records:
+                writer.execute_many("""
+                    INSERT INTO association_rules
+                    (antecedent, consequent, support, confidence, lift, profit_score,
+                     diversity_score, overall_score, context_store_id, context_time_bin,
+                     context_weekday_weekend, context_quarter, context_festival_period)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, records)
+
+    def get_precomputed_rules(self, limit: int = 200) -> Optional[List[RuleResponse]]:
+        """
+        Persisted rolling-window rules, if they reflect the current data.
+
+        Returns:
+            Rules ordered by overall score, or None when no fresh rule set exists
+        """
+        if self._precomputed_version is None or self._precomputed_version != self.data_version():
+            return None
+        rows = self.db.execute_query(
+            "SELECT * FROM association_rules ORDER BY overall_score DESC LIMIT ?", (limit,)
+        )
+        responses = []
+        for row in rows:
+            rule = ContextualRule(
+                antecedent=frozenset(json.loads(row["antecedent"])),
+                consequent=frozenset(json.loads(row["consequent"])),
+                support=row["support"],
+                confidence=row["confidence"],
+                lift=row["lift"],
+                context=Context(
+                    store_id=row["context_store_id"],
+                    time_bin=row["context_time_bin"],
+                    weekday_weekend=row["context_weekday_weekend"],
+                    quarter=row["context_quarter"],
+                    festival_period=row["context_festival_period"],
+                ),
+                profit_score=row["profit_score"],
+                diversity_score=row["diversity_score"],
+                overall_score=row["overall_score"],
+            )
+            responses.append(_rule_to_response(rule, None))
         return responses
 
     # ------------------------------------------------------------------ #
@@ -381,37 +849,57 @@ class AnalyticsService:
     # ------------------------------------------------------------------ #
     def get_bundles(self, filters: RuleFilter) -> List[BundleResponse]:
         """Derive bundle recommendations from top scored rules."""
+        return self.get_bundles_result(filters).responses
+
+    def get_bundles_result(self, filters: RuleFilter) -> MiningResult:
+        """
+        Derive bundle recommendations and report how mining departed from the request.
+
+        Returns:
+            MiningResult with the bundles and the min_support / max_len the
+            budget applied if it changed them
+        """
         bundles: List[BundleResponse] = []
 
         # Mine contextual rules once for deriving bundle opportunities
-        transactions = self._load_transactions(filters)
+        with self._read_snapshot() as snapshot:
+            transactions = self._load_transactions(filters, snapshot)
         if transactions.empty:
-            return []
+            return MiningResult([])
+
+        # The mining budget guards against combinatorial blow-up on dense data,
+        # so the requested support and context depth are used as-is
+        itemset_mode = filters.itemset_mode or self.bundle_itemset_mode
 
-        # Enforce a higher min_support for bundles to avoid combinatorial explosion
-        # with dense datasets or multiple uploads.
-        safe_min_support = max(filters.min_support, 0.05)
-        
         # Use a distinct cache key for bundles since params are different
-        # Also limit max_depth to 1 (Overall + Single Dims) to speed up loading
-        cache_key = f"bundles_{safe_min_support}_{filters.min_confidence}_{filters.min_rows_per_context}"
+        cache_key = (
+            f"bundles_{filters.min_support}_{filters.min_confidence}_{filters.min_rows_per_context}"
+            f"_{filters.min_lift}_{filters.max_depth}_{filters.max_len}_{itemset_mode}"
+        )
 
         if cache_key in self._rules_cache:
             rules = self._rules_cache[cache_key]
         else:
             miner = ContextAwareMiner(
-                min_support=safe_min_support,
+                min_support=filters.min_support,
                 min_confidence=filters.min_confidence,
                 min_rows_per_context=filters.min_rows_per_context,
+                n_jobs=self._resolve_n_jobs(filters),
+                max_len=filters.max_len,
+                algorithms=self.mining_algorithms,
+                calibration=self.mining_calibration,
+                counting=self.mining_counting,
+                itemset_mode=itemset_mode,
+                min_lift=filters.min_lift,
+                max_consequent_size=self.max_consequent_size,
+                budget=self.mining_budget,
             )
-            # Limit depth to 0 (Overall only) for instant loading
-            # Context-specific rules can be explored in the Rules page
-            rules = miner.mine_all_contexts(transactions, max_depth=0)
-            self._rules_cache[cache_key] = rules
+            rules = miner.mine_all_contexts(transactions, max_depth=filters.max_depth)
+            self._cache_rules(cache_key, rules, miner)
+        adjusted = self._mining_adjustments.get(cache_key)
 
-        rules = [rule for rule in rules if rule.lift >= filters.min_lift]
-        if not rules:
-            return []
+        if not len(rules):
+            return MiningResult([], adjusted=adjusted)
 
         scored_rules = self.scorer.score_rules(rules, transactions)[: filters.limit]
 
@@ -440,7 +928,83 @@ class AnalyticsService:
             if len(bundles) >= filters.limit:
                 break
 
-        return bundles
+        return MiningResult(bundles, adjusted=adjusted)
+
+    # ------------------------------------------------------------------ #
+    # Contrast mining
+    # ------------------------------------------------------------------ #
+    def get_contrasts(self, filters: ContrastFilter) -> List[ContrastPatternResponse]:
+        """Find itemsets that spike in a context compared with its parent contexts."""
+        with self._read_snapshot() as snapshot:
+            transactions = self._load_transactions(filters, snapshot)
+        if transactions.empty:
+            return []
+
+        if "context_festival" not in transactions.columns:
+            # Festivals are not stored per transaction, so derive them from the calendar
+            days = transactions["timestamp"].dt.normalize()
+            festivals = {day: get_major_festival(day) for day in days.dropna().unique()}
+            transactions["context_festival"] = days.map(festivals)
+        if filters.festival_period:
+            transactions = transactions[transactions["context_festival"] == filters.festival_period]
+            if transactions.empty:
+                return []
+
+        cache_key = (
+            f"contrast_{filters.min_support}_{filters.min_growth}_{filters.max_depth}"
+            f"_{filters.max_len}_{filters.min_rows_per_context}_{filters.store_id}_{filters.time_bin}"
+            f"_{filters.weekday_weekend}_{filters.quarter}_{filters.festival_period}"
+        )
+        if cache_key in self._rules_cache:
+            patterns = self._rules_cache[cache_key]
+        else:
+            miner = ContextAwareMiner(
+                min_support=filters.min_support,
+                min_rows_per_context=filters.min_rows_per_context,
+                max_len=filters.max_len,
+                budget=self.mining_budget,
+            )
+            patterns = miner.mine_contrasts(
+                transactions, max_depth=filters.max_depth, min_growth=filters.min_growth
+            )
+            self._rules_cache[cache_key] = patterns
+
+        return [_contrast_to_response(pattern) for pattern in patterns[: filters.limit]]
+
+    # ------------------------------------------------------------------ #
+    # High-utility mining
+    # ------------------------------------------------------------------ #
+    def get_high_utility(self, filters: UtilityFilter) -> List[HighUtilityItemsetResponse]:
+        """Mine the itemsets that contribute the most margin in each context."""
+        with self._read_snapshot() as snapshot:
+            transactions = self._load_transactions(filters, snapshot)
+        if transactions.empty:
+            return []
+
+        cache_key = (
+            f"utility_{filters.min_utility}_{filters.max_len}_{filters.max_depth}"
+            f"_{filters.min_rows_per_context}_{filters.store_id}_{filters.time_bin}"
+            f"_{filters.weekday_weekend}_{filters.quarter}"
+        )
+        if cache_key in self._rules_cache:
+            itemsets = self._rules_cache[cache_key]
+        else:
+            miner = ContextAwareMiner(
+                min_rows_per_context=filters.min_rows_per_context,
+                max_len=filters.max_len,
+                budget=self.mining_budget,
+            )
+            itemsets = miner.mine_high_utility(
+                transactions, max_depth=filters.max_depth, min_utility=filters.min_utility
+            )
+            self._rules_cache[cache_key] = itemsets
+
+        ranked = sorted(
+            (itemset for itemset in itemsets if len(itemset.itemset) >= filters.min_len),
+            key=lambda itemset: itemset.utility_share,
+            reverse=True,
+        )
+        return [_high_utility_to_response(itemset) for itemset in ranked[: filters.limit]]
 
     # ------------------------------------------------------------------ #
     # What-if simulation
@@ -448,7 +1012,8 @@ class AnalyticsService:
     def simulate_what_if(self, request: WhatIfRequest) -> WhatIfResponse:
         """Run the what-if simulator for a custom scenario."""
         context_filter = request.context or ContextFilter()
-        transactions = self._load_transactions(context_filter)
+        with self._read_snapshot() as snapshot:
+            transactions = self._load_transactions(context_filter, snapshot)
 
         if transactions.empty:
             return WhatIfResponse(
@@ -535,8 +1100,9 @@ class AnalyticsService:
         """Calculate real dashboard statistics from the database."""
         # 1. Active Rules Count (approximate by running a quick mining pass or caching)
         # For speed, we'll do a quick count of high-lift rules on overall data
-        transactions = self._load_transactions()
-        if transactions.empty:
+        with self._read_snapshot() as snapshot:
+            has_data = snapshot.get_table_count("transactions") > 0
+        if not has_data:
             return {
                 "avg_lift": 0.0,
                 "profit_opportunity": 0.0,
@@ -544,10 +1110,11 @@ class AnalyticsService:
                 "top_opportunities": []
             }
 
-        # We can reuse get_rules with default filters to get a sense of "Active Rules"
-        # In a real prod system, this might be cached or stored in a 'rules' table
-        default_filter = RuleFilter(min_support=0.05, min_confidence=0.1, min_lift=1.2, limit=200, max_depth=0)
-        rules = self.get_rules(default_filter)
+        # Prefer the rule set the background refresher keeps over the rolling
+        # window; mine on request only when it is missing or stale
+        rules = self.get_precomputed_rules(DASHBOARD_RULE_FILTER["limit"]) if self.streaming_enabled else None
+        if rules is None:
+            rules = self.get_rules(RuleFilter(**DASHBOARD_RULE_FILTER))
         
         if not rules:
              return {
@@ -596,21 +1163,33 @@ class AnalyticsService:
             api_version="1.0.0",
         )
 
+    def get_db_metrics(self, reset: bool = False) -> DatabaseMetricsResponse:
+        """Return per-statement latency histograms and the slow-query log."""
+        snapshot = self.db.metrics.snapshot()
+        if reset:
+            self.db.metrics.reset()
+        return DatabaseMetricsResponse(**snapshot)
+
     def clear_data(self, request: MaintenanceActionRequest) -> MaintenanceActionResponse:
         """Clear cached rules/bundles and optionally uploaded transaction data."""
         tables_to_clear: List[str] = []
 
         if request.clear_rules or request.clear_bundles:
-            tables_to_clear.extend(["uplift_results", "association_rules"])
+            tables_to_clear.extend(["uplift_results", "association_rules",
+                                    "context_itemset_counts", "mining_state"])
 
         if request.clear_uploads:
-            tables_to_clear.extend(["transaction_items", "transactions", "items"])
+            # Incremental itemset counts are only valid for the data they were built on
+            tables_to_clear.extend(["context_itemset_counts", "mining_state",
+                                    "transaction_items", "transactions", "items"])
 
         ordered_unique = list(dict.fromkeys(tables_to_clear))
         counts_before = {table: self.db.get_table_count(table) for table in ordered_unique}
 
         if ordered_unique:
             self.db.clear_tables(ordered_unique)
+            if "association_rules" in ordered_unique:
+                self._precomputed_version = None
 
         if request.clear_cache:
             self.clear_cache()
@@ -1,26 +1,162 @@
+import os
 import sqlite3
 import sys
+import tempfile
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Callable, Tuple, TypeVar
+
+from .query_metrics import QueryMetrics, default_query_metrics
+
+T = TypeVar("T")
+
+
+def _is_lock_error(exc: sqlite3.OperationalError) -> bool:
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+def _explain_plan(conn: sqlite3.Connection, query: str, params: Optional[tuple]) -> List[str]:
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement."""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params or ()).fetchall()
+    return [str(row[-1]) for row in rows]
+
+
+class DatabaseSnapshot:
+    """Read-only view of the database pinned at the moment it was opened.
+
+    Holds an open read transaction on a private connection, so every query
+    issued through it sees the same committed state even while an import
+    keeps writing through another connection.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, owns_connection: bool = True,
+                 copy_path: Optional[str] = None,
+                 metrics: Optional[QueryMetrics] = None):
+        self._conn = conn
+        self._owns_connection = owns_connection
+        self._copy_path = copy_path
+        self.metrics = metrics or default_query_metrics
+
+    def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """Execute a SELECT query against the pinned snapshot."""
+        conn = self._conn
+        started = time.perf_counter()
+        cursor = conn.cursor()
+        cursor.execute(query, params or ())
+        rows = cursor.fetchall()
+        self.metrics.record(
+            "snapshot_query", query, (time.perf_counter() - started) * 1000, rows=len(rows),
+            plan_provider=lambda: _explain_plan(conn, query, params),
+        )
+        return [dict(row) for row in rows]
+
+    def iter_query(self, query: str, params: Optional[tuple] = None,
+                   batch_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """Execute a SELECT query against the snapshot and yield rows in fetchmany batches."""
+        conn = self._conn
+        cursor = conn.cursor()
+        started = time.perf_counter()
+        cursor.execute(query, params or ())
+        fetch_ms = (time.perf_counter() - started) * 1000
+        total = 0
+        try:
+            while True:
+                started = time.perf_counter()
+                rows = cursor.fetchmany(batch_size)
+                fetch_ms += (time.perf_counter() - started) * 1000
+                if not rows:
+                    break
+                total += len(rows)
+                yield [dict(row) for row in rows]
+        finally:
+            cursor.close()
+            # Only time spent in SQLite is counted, not the consumer's work between batches
+            self.metrics.record(
+                "snapshot_stream", query, fetch_ms, rows=total,
+                plan_provider=lambda: _explain_plan(conn, query, params),
+            )
+
+    def get_table_count(self, table: str) -> int:
+        """Get row count for a table as of the snapshot."""
+        result = self.execute_query(f"SELECT COUNT(*) as count FROM {table}")
+        return result[0]['count'] if result else 0
+
+    def release(self):
+        """End the read transaction and drop any private connection or copy."""
+        if self._conn is None:
+            return
+        if self._owns_connection:
+            try:
+                self._conn.rollback()
+            finally:
+                self._conn.close()
+        self._conn = None
+        if self._copy_path:
+            Path(self._copy_path).unlink(missing_ok=True)
+            self._copy_path = None
 
 
 class DatabaseManager:
     """SQLite database manager for ProfitLift."""
 
-    def __init__(self, db_path: str = "profitlift.db"):
+    BUSY_TIMEOUT_MS = 5000
+
+    # Columns added after a table first shipped: (table, column, type).
+    # CREATE TABLE IF NOT EXISTS leaves existing databases without them.
+    ADDED_COLUMNS = [
+        ("association_rules", "context_festival_period", "TEXT"),
+    ]
+
+    def __init__(self, db_path: str = "profitlift.db", metrics: Optional[QueryMetrics] = None):
         self.db_path = str(db_path)
         self._conn: Optional[sqlite3.Connection] = None
         self._initialized = False
+        self._transaction_depth = 0
+        # Shared, process-wide collector unless a dedicated one is injected
+        self.metrics = metrics or default_query_metrics
+
+    @property
+    def is_memory(self) -> bool:
+        """Whether the database lives in memory (no file to share between connections)."""
+        return self.db_path == ":memory:" or self.db_path.startswith("file::memory:")
 
     @property
     def conn(self) -> sqlite3.Connection:
         """Return a shared SQLite connection (lazy-initialized)."""
         if self._conn is None:
-            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            if not self.is_memory:
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
             self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
             self._conn.row_factory = sqlite3.Row
+            # Lock waits are retried in _run_locked so they can be measured
+            self._conn.execute("PRAGMA busy_timeout = 0")
+            if not self.is_memory:
+                # WAL lets readers keep a consistent snapshot while an import writes
+                self._run_locked(lambda: self._conn.execute("PRAGMA journal_mode = WAL"))
         return self._conn
 
+    def _run_locked(self, operation: Callable[[], T]) -> Tuple[T, float]:
+        """
+        Run a statement, retrying while another connection holds the lock.
+
+        Returns:
+            Tuple of (operation result, milliseconds spent waiting on locks)
+        """
+        waited_ms = 0.0
+        delay = 0.002
+        while True:
+            try:
+                return operation(), waited_ms
+            except sqlite3.OperationalError as exc:
+                if not _is_lock_error(exc) or waited_ms >= self.BUSY_TIMEOUT_MS:
+                    raise
+            started = time.perf_counter()
+            time.sleep(delay)
+            waited_ms += (time.perf_counter() - started) * 1000
+            delay = min(delay * 2, 0.1)
+
     def _schema_path(self) -> Path:
         """Locate schema file, supporting frozen (PyInstaller) builds."""
         base = Path(getattr(sys, "_MEIPASS", Path(__file__).parent))
@@ -40,47 +176,222 @@ class DatabaseManager:
             schema = f.read()
 
         # Use IF NOT EXISTS for tables to avoid errors
-        self.conn.executescript(schema)
+        self._run_locked(lambda: self.conn.executescript(schema))
+        self._add_missing_columns()
         self.conn.commit()
         self._initialized = True
 
+    def _add_missing_columns(self):
+        """Bring tables created by older schema versions up to date."""
+        for table, column, column_type in self.ADDED_COLUMNS:
+            existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                self._run_locked(
+                    lambda: self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+                )
+
     def execute_script(self, script: str):
         """Execute a raw SQL script (used by tests/maintenance)."""
         self._ensure_database()
-        self.conn.executescript(script)
-        self.conn.commit()
+        started = time.perf_counter()
+        _, lock_wait_ms = self._run_locked(lambda: self.conn.executescript(script))
+        lock_wait_ms += self._commit()
+        self.metrics.record("script", script, (time.perf_counter() - started) * 1000,
+                            lock_wait_ms=lock_wait_ms)
 
     def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
         """Execute a SELECT query and return results as list of dicts."""
         self._ensure_database()
+        started = time.perf_counter()
         cursor = self.conn.cursor()
-        cursor.execute(query, params or ())
+        _, lock_wait_ms = self._run_locked(lambda: cursor.execute(query, params or ()))
         rows = cursor.fetchall()
+        self._record("query", query, params, started, len(rows), lock_wait_ms)
         return [dict(row) for row in rows]
 
+    def iter_query(self, query: str, params: Optional[tuple] = None,
+                   batch_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Execute a SELECT query and yield its rows in batches, without fetching them all.
+
+        Args:
+            query: SELECT statement
+            params: Statement parameters
+            batch_size: Rows per fetchmany call (and per yielded batch)
+
+        Yields:
+            Lists of at most batch_size rows as dicts
+        """
+        self._ensure_database()
+        cursor = self.conn.cursor()
+        started = time.perf_counter()
+        _, lock_wait_ms = self._run_locked(lambda: cursor.execute(query, params or ()))
+        fetch_ms = (time.perf_counter() - started) * 1000
+        total = 0
+        try:
+            while True:
+                started = time.perf_counter()
+                rows = cursor.fetchmany(batch_size)
+                fetch_ms += (time.perf_counter() - started) * 1000
+                if not rows:
+                    break
+                total += len(rows)
+                yield [dict(row) for row in rows]
+        finally:
+            cursor.close()
+            conn = self.conn
+            # Only time spent in SQLite is counted, not the consumer's work between batches
+            self.metrics.record(
+                "stream", query, fetch_ms, rows=total, lock_wait_ms=lock_wait_ms,
+                plan_provider=lambda: _explain_plan(conn, query, params),
+            )
+
     def execute_insert(self, query: str, params: Optional[tuple] = None) -> int:
         """Execute an INSERT query and return the last row ID."""
         self._ensure_database()
+        started = time.perf_counter()
         cursor = self.conn.cursor()
-        cursor.execute(query, params or ())
-        self.conn.commit()
+        _, lock_wait_ms = self._run_locked(lambda: cursor.execute(query, params or ()))
+        lock_wait_ms += self._commit()
+        self._record("insert", query, params, started, cursor.rowcount, lock_wait_ms)
         return cursor.lastrowid
 
     def execute_many(self, query: str, params_list: List[tuple]):
         """Execute multiple INSERT/UPDATE queries."""
         self._ensure_database()
+        started = time.perf_counter()
         cursor = self.conn.cursor()
-        cursor.executemany(query, params_list)
-        self.conn.commit()
+        _, lock_wait_ms = self._run_locked(lambda: cursor.executemany(query, params_list))
+        lock_wait_ms += self._commit()
+        sample_params = params_list[0] if params_list else None
+        self._record("many", query, sample_params, started, cursor.rowcount, lock_wait_ms)
+
+    def _record(self, kind: str, query: str, params: Optional[tuple], started: float,
+                rows: int, lock_wait_ms: float):
+        """Report a finished statement to the metrics collector."""
+        conn = self.conn
+        self.metrics.record(
+            kind, query, (time.perf_counter() - started) * 1000, rows=rows,
+            lock_wait_ms=lock_wait_ms,
+            plan_provider=lambda: _explain_plan(conn, query, params),
+        )
+
+    def _commit(self) -> float:
+        """
+        Commit unless an enclosing transaction() block owns the commit.
+
+        Returns:
+            Milliseconds spent waiting on locks while committing
+        """
+        if self._transaction_depth == 0:
+            _, lock_wait_ms = self._run_locked(self.conn.commit)
+            return lock_wait_ms
+        return 0.0
+
+    @contextmanager
+    def transaction(self) -> Iterator["DatabaseManager"]:
+        """
+        Group writes into a single atomic commit.
+
+        Readers on other connections see either none or all of the writes made
+        inside the block. Nested blocks join the outermost transaction.
+        """
+        self._ensure_database()
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.conn.rollback()
+            raise
+        else:
+            self._transaction_depth -= 1
+            self._commit()
+
+    @contextmanager
+    def dedicated_writer(self) -> Iterator["DatabaseManager"]:
+        """
+        Separate connection for a write transaction made off the request path.
+
+        transaction() on this manager is shared by every thread using its
+        connection, so writes from background jobs or concurrent requests go
+        through their own connection and SQLite serializes the transactions.
+        In-memory databases cannot be opened twice and yield this manager.
+
+        Yields:
+            DatabaseManager on its own connection (closed afterwards)
+        """
+        if self.is_memory:
+            yield self
+            return
+        writer = DatabaseManager(self.db_path, metrics=self.metrics)
+        try:
+            yield writer
+        finally:
+            writer.close()
+
+    @contextmanager
+    def snapshot(self, copy: bool = False) -> Iterator[DatabaseSnapshot]:
+        """
+        Pin a consistent read snapshot for the duration of a job.
+
+        Args:
+            copy: Copy the database to a temporary file and read from the copy.
+                Use this for very long jobs so the WAL can still be checkpointed
+                while the job runs.
+
+        Yields:
+            DatabaseSnapshot exposing execute_query against the pinned state
+        """
+        self._ensure_database()
+        if self.is_memory:
+            # No second connection can see an in-memory database; share the
+            # main connection without isolation.
+            snap = DatabaseSnapshot(self.conn, owns_connection=False, metrics=self.metrics)
+        elif copy:
+            snap = self._open_copy_snapshot()
+        else:
+            snap = self._open_wal_snapshot()
+        try:
+            yield snap
+        finally:
+            snap.release()
+
+    def _open_wal_snapshot(self) -> DatabaseSnapshot:
+        """Open a private connection holding a WAL read transaction."""
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {self.BUSY_TIMEOUT_MS}")
+        conn.execute("BEGIN")
+        # The snapshot is only pinned once the transaction has read something
+        conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        return DatabaseSnapshot(conn, metrics=self.metrics)
+
+    def _open_copy_snapshot(self) -> DatabaseSnapshot:
+        """Copy the committed database to a temp file and read from the copy."""
+        fd, copy_path = tempfile.mkstemp(suffix=".snapshot.db")
+        os.close(fd)
+        source = sqlite3.connect(self.db_path, check_same_thread=False)
+        target = sqlite3.connect(copy_path, check_same_thread=False)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+        target.row_factory = sqlite3.Row
+        return DatabaseSnapshot(target, copy_path=copy_path, metrics=self.metrics)
 
     def clear_tables(self, tables: Optional[List[str]] = None):
         """Clear data from specified tables (or all known tables by default)."""
         self._ensure_database()
-        targets = tables or ["uplift_results", "association_rules", "transaction_items", "transactions", "items"]
+        targets = tables or ["context_itemset_counts", "mining_state", "uplift_results",
+                             "association_rules", "transaction_items", "transactions", "items"]
         cursor = self.conn.cursor()
         for table in targets:
-            cursor.execute(f"DELETE FROM {table}")
-        self.conn.commit()
+            self._run_locked(lambda: cursor.execute(f"DELETE FROM {table}"))
+        self._commit()
 
     def get_table_count(self, table: str) -> int:
         """Get row count for a table."""
@@ -100,3 +411,4 @@ class DatabaseManager:
             self._conn.close()
             self._conn = None
         self._initialized = False
+        self._transaction_depth = 0
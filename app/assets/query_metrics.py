@@ -0,0 +1,177 @@
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# Upper bounds (milliseconds) of the latency histogram buckets
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(sql: str, max_length: int = 300) -> str:
+    """Collapse whitespace so the same statement always maps to one key."""
+    statement = _WHITESPACE.sub(" ", sql).strip()
+    return statement[:max_length]
+
+
+@dataclass
+class StatementStats:
+    """Aggregated timings for a single normalized SQL statement."""
+    kind: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    lock_waits: int = 0
+    lock_wait_ms: float = 0.0
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+
+    def add(self, elapsed_ms: float, rows: int, lock_wait_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += max(rows, 0)
+        if lock_wait_ms > 0:
+            self.lock_waits += 1
+            self.lock_wait_ms += lock_wait_ms
+        for idx, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[idx] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Estimate a latency percentile as the upper bound of its bucket."""
+        if self.count == 0:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for idx, bucket_count in enumerate(self.buckets[:-1]):
+            seen += bucket_count
+            if seen >= target:
+                return float(LATENCY_BUCKETS_MS[idx])
+        return self.max_ms
+
+    def to_dict(self, statement: str) -> Dict[str, Any]:
+        labels = [f"<={bound:g}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]:g}ms"]
+        return {
+            "statement": statement,
+            "kind": self.kind,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "lock_waits": self.lock_waits,
+            "lock_wait_ms": round(self.lock_wait_ms, 3),
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+class QueryMetrics:
+    """Thread-safe per-statement latency histograms plus a slow-query log."""
+
+    def __init__(self, slow_query_ms: float = 250.0, slow_log_size: int = 50,
+                 enabled: bool = True):
+        """
+        Initialize query metrics.
+
+        Args:
+            slow_query_ms: Statements slower than this are written to the slow-query log
+            slow_log_size: Number of most recent slow queries kept in memory
+            enabled: Whether statements are recorded at all
+        """
+        self.slow_query_ms = slow_query_ms
+        self.enabled = enabled
+        self._stats: Dict[str, StatementStats] = {}
+        self._slow_log: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    def configure(self, slow_query_ms: Optional[float] = None,
+                  slow_log_size: Optional[int] = None,
+                  enabled: Optional[bool] = None):
+        """Update thresholds without dropping collected statistics."""
+        with self._lock:
+            if slow_query_ms is not None:
+                self.slow_query_ms = float(slow_query_ms)
+            if slow_log_size is not None:
+                self._slow_log = deque(self._slow_log, maxlen=int(slow_log_size))
+            if enabled is not None:
+                self.enabled = bool(enabled)
+
+    def record(self, kind: str, sql: str, elapsed_ms: float, rows: int = 0,
+               lock_wait_ms: float = 0.0,
+               plan_provider: Optional[Callable[[], List[str]]] = None):
+        """
+        Record one statement execution.
+
+        Args:
+            kind: Execution path (query, insert, many, script, stream)
+            sql: Raw SQL text
+            elapsed_ms: Wall-clock time including lock waits
+            rows: Rows returned or affected
+            lock_wait_ms: Time spent waiting on a locked database
+            plan_provider: Callable returning the query plan, only invoked for slow queries
+        """
+        if not self.enabled:
+            return
+        statement = normalize_statement(sql)
+        with self._lock:
+            stats = self._stats.get(statement)
+            if stats is None:
+                stats = self._stats[statement] = StatementStats(kind=kind)
+            stats.add(elapsed_ms, rows, lock_wait_ms)
+            is_slow = elapsed_ms >= self.slow_query_ms
+
+        if not is_slow:
+            return
+
+        plan: List[str] = []
+        if plan_provider is not None:
+            try:
+                plan = plan_provider()
+            except Exception as exc:  # pragma: no cover - plan is best effort
+                plan = [f"plan unavailable: {exc}"]
+
+        entry = {
+            "statement": statement,
+            "kind": kind,
+            "elapsed_ms": round(elapsed_ms, 3),
+            "rows": rows,
+            "lock_wait_ms": round(lock_wait_ms, 3),
+            "plan": plan,
+            "recorded_at": time.time(),
+        }
+        with self._lock:
+            self._slow_log.append(entry)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return collected statistics, slowest statements (by total time) first."""
+        with self._lock:
+            statements = [stats.to_dict(stmt) for stmt, stats in self._stats.items()]
+            slow_queries = list(self._slow_log)
+            slow_query_ms = self.slow_query_ms
+            enabled = self.enabled
+        statements.sort(key=lambda s: s["total_ms"], reverse=True)
+        return {
+            "enabled": enabled,
+            "slow_query_ms": slow_query_ms,
+            "statements": statements,
+            "slow_queries": list(reversed(slow_queries)),
+        }
+
+    def reset(self):
+        """Drop all collected statistics and slow-query entries."""
+        with self._lock:
+            self._stats.clear()
+            self._slow_log.clear()
+
+
+# Process-wide collector shared by every DatabaseManager unless one is injected,
+# so the importer's and the API's connections report into the same view.
+default_query_metrics = QueryMetrics()
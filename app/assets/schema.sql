@@ -46,6 +46,7 @@ CREATE TABLE IF NOT EXISTS association_rules (
     context_time_bin TEXT,
     context_weekday_weekend TEXT,
     context_quarter INTEGER,
+    context_festival_period TEXT,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -60,6 +61,23 @@ CREATE TABLE IF NOT EXISTS uplift_results (
     FOREIGN KEY (rule_id) REFERENCES association_rules(id)
 );
 
+-- Incremental mining state (one row per mining parameter set)
+CREATE TABLE IF NOT EXISTS mining_state (
+    state_key TEXT PRIMARY KEY,
+    params TEXT NOT NULL,  -- JSON mining parameters and context filters
+    watermark INTEGER NOT NULL,  -- Highest transaction_items.id covered by the counts
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Frequent itemset counts per context (itemset "[]" holds the context's basket count)
+CREATE TABLE IF NOT EXISTS context_itemset_counts (
+    state_key TEXT NOT NULL,
+    context TEXT NOT NULL,  -- JSON context fields
+    itemset TEXT NOT NULL,  -- JSON array of item ids
+    count INTEGER NOT NULL,
+    PRIMARY KEY (state_key, context, itemset)
+);
+
 -- Indexes
 CREATE INDEX IF NOT EXISTS idx_transactions_timestamp ON transactions(timestamp);
 CREATE INDEX IF NOT EXISTS idx_transactions_store ON transactions(store_id);
@@ -65,11 +65,11 @@ class CSVImporter:
             # 3. Enrich with context columns
             df = add_context_columns(df)
 
-            # 4. Populate items table (upsert unique items)
-            items_created = self._populate_items(df)
-
-            # 5. Populate transactions & transaction_items
-            transactions_created = self._populate_transactions(df)
+            # 4-5. Populate items, transactions & transaction_items in one
+            # commit so concurrent analytics never see half an import
+            with self.db.transaction():
+                items_created = self._populate_items(df)
+                transactions_created = self._populate_transactions(df)
 
             rows_imported = len(df) - rejected_rows
 
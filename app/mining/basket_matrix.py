@@ -0,0 +1,235 @@
+"""
+Sparse basket encoding for ProfitLift mining engines.
+
+Baskets are stored as a CSR incidence matrix (baskets × items) over integer
+item codes, so memory scales with the number of line items rather than with
+baskets × catalog size.
+"""
+
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+def min_support_count(min_support: float, n_baskets: int) -> int:
+    """
+    Smallest basket count whose support reaches min_support.
+
+    Uses the same float comparison as mlxtend (count / n >= min_support) so
+    every engine agrees on borderline itemsets.
+    """
+    if n_baskets <= 0:
+        return 1
+    count = max(int(np.ceil(min_support * n_baskets)), 0)
+    while count > 0 and (count - 1) / n_baskets >= min_support:
+        count -= 1
+    while count / n_baskets < min_support:
+        count += 1
+    return max(count, 1)
+
+
+def apriori_gen(frequent: Iterable[Tuple[int, ...]]) -> List[Tuple[int, ...]]:
+    """
+    Candidate (k+1)-itemsets from frequent k-itemsets of sorted item codes.
+
+    Itemsets sharing a k-1 prefix are joined; candidates with any infrequent
+    k-subset are pruned.
+    """
+    frequent = sorted(frequent)
+    if frequent and len(frequent[0]) == 1:
+        # Every pair of frequent items survives pruning
+        return list(combinations((itemset[0] for itemset in frequent), 2)) if len(frequent) > 1 else []
+    known = set(frequent)
+    by_prefix: Dict[Tuple[int, ...], List[int]] = {}
+    for itemset in frequent:
+        by_prefix.setdefault(itemset[:-1], []).append(itemset[-1])
+    candidates = []
+    for prefix, lasts in by_prefix.items():
+        for a_pos, a in enumerate(lasts):
+            for b in lasts[a_pos + 1:]:
+                candidate = prefix + (a, b)
+                if all(candidate[:i] + candidate[i + 1:] in known for i in range(len(candidate) - 2)):
+                    candidates.append(candidate)
+    return candidates
+
+
+class BasketMatrix:
+    """Boolean baskets × items matrix in CSR form with interned item labels."""
+
+    def __init__(self, matrix: sparse.csr_matrix, items: np.ndarray):
+        """
+        Initialize basket matrix.
+
+        Args:
+            matrix: CSR matrix of shape (n_baskets, n_items), True where a basket holds an item
+            items: Item labels indexed by item code (column position)
+        """
+        self.matrix = matrix
+        self.items = items
+
+    @classmethod
+    def from_transactions(cls, transactions: Sequence[Iterable[str]]) -> "BasketMatrix":
+        """
+        Encode a list of transactions without building a dense matrix.
+
+        Items are coded in sorted order, matching mlxtend's TransactionEncoder
+        column order. Duplicate items inside a basket are collapsed.
+
+        Args:
+            transactions: List of transactions, each transaction is a list of item strings
+
+        Returns:
+            BasketMatrix over the union of all items
+        """
+        baskets = [list(t) for t in transactions]
+        lengths = np.fromiter((len(b) for b in baskets), dtype=np.int64, count=len(baskets))
+        flat = [item for basket in baskets for item in basket]
+
+        if not flat:
+            return cls(sparse.csr_matrix((len(baskets), 0), dtype=bool), np.array([], dtype=object))
+
+        items, codes = np.unique(np.asarray(flat, dtype=object), return_inverse=True)
+        rows = np.repeat(np.arange(len(baskets), dtype=np.int64), lengths)
+        return cls.from_codes(rows, codes, n_baskets=len(baskets), items=items)
+
+    @classmethod
+    def from_line_items(cls, transaction_ids: pd.Series,
+                        item_ids: pd.Series) -> Tuple["BasketMatrix", pd.Index]:
+        """
+        Encode a line-item table once into a shared basket/item code space.
+
+        Args:
+            transaction_ids: Transaction identifier of each line item
+            item_ids: Item identifier of each line item (NaN items are ignored)
+
+        Returns:
+            Tuple of (BasketMatrix, Index of transaction ids by basket row)
+        """
+        valid = item_ids.notna().to_numpy()
+        tids = transaction_ids.to_numpy()[valid]
+        labels = item_ids[valid].astype(str).to_numpy()
+
+        basket_codes, basket_ids = pd.factorize(tids)
+        item_codes, items = pd.factorize(labels, sort=True)
+        basket = cls.from_codes(basket_codes, item_codes, n_baskets=len(basket_ids),
+                                items=np.asarray(items, dtype=object))
+        return basket, pd.Index(basket_ids)
+
+    @classmethod
+    def from_codes(cls, basket_codes: np.ndarray, item_codes: np.ndarray,
+                   n_baskets: int, items: np.ndarray) -> "BasketMatrix":
+        """
+        Build a basket matrix from parallel arrays of (basket, item) codes.
+
+        Args:
+            basket_codes: Basket row index for each line item
+            item_codes: Item column index for each line item
+            n_baskets: Total number of baskets (rows)
+            items: Item labels indexed by item code
+
+        Returns:
+            BasketMatrix with duplicate line items collapsed
+        """
+        data = np.ones(len(item_codes), dtype=np.int32)
+        matrix = sparse.csr_matrix(
+            (data, (np.asarray(basket_codes), np.asarray(item_codes))),
+            shape=(n_baskets, len(items)),
+        )
+        matrix.sum_duplicates()
+        matrix = matrix.astype(bool)
+        matrix.sort_indices()
+        return cls(matrix, np.asarray(items, dtype=object))
+
+    @property
+    def n_baskets(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def n_items(self) -> int:
+        return self.matrix.shape[1]
+
+    @property
+    def nnz(self) -> int:
+        """Number of (basket, item) entries, i.e. distinct line items."""
+        return self.matrix.nnz
+
+    def item_counts(self) -> np.ndarray:
+        """Number of baskets containing each item."""
+        return np.bincount(self.matrix.indices, minlength=self.n_items)
+
+    def count_itemsets(self, candidates: Sequence[Tuple[int, ...]]) -> np.ndarray:
+        """
+        Exact support counts of item-code itemsets (any mix of sizes).
+
+        Candidates of each size are grouped by their prefix (all but the last
+        item); one sparse product of the prefix indicators with the basket
+        matrix yields the count of every prefix + item extension at once.
+
+        Args:
+            candidates: Itemsets as sorted tuples of item codes
+
+        Returns:
+            Basket count per candidate, in input order
+        """
+        counts = np.zeros(len(candidates), dtype=np.int64)
+        if not candidates or self.n_baskets == 0:
+            return counts
+        X = self.matrix.astype(np.int32).tocsc()
+        sizes = np.fromiter((len(c) for c in candidates), dtype=np.int64, count=len(candidates))
+        for size in np.unique(sizes):
+            positions = np.flatnonzero(sizes == size)
+            lasts = np.fromiter((candidates[p][-1] for p in positions), dtype=np.int64, count=len(positions))
+            if size == 1:
+                counts[positions] = self.item_counts()[lasts]
+                continue
+            prefix_index: Dict[Tuple[int, ...], int] = {}
+            owners = np.fromiter(
+                (prefix_index.setdefault(candidates[p][:-1], len(prefix_index)) for p in positions),
+                dtype=np.int64, count=len(positions),
+            )
+            prefixes = list(prefix_index)
+            codes = np.array(prefixes, dtype=np.int64)
+            # A basket holds a prefix when it holds every one of its items
+            indicators = X[:, codes[:, 0]]
+            for j in range(1, size - 1):
+                indicators = indicators.multiply(X[:, codes[:, j]]).tocsc()
+            co_counts = (indicators.T.tocsr() @ X).tocsr()
+            counts[positions] = np.asarray(co_counts[owners, lasts]).ravel()
+        return counts
+
+    def take(self, rows: np.ndarray) -> "BasketMatrix":
+        """Select a subset of baskets, keeping the shared item code space."""
+        return BasketMatrix(self.matrix[np.asarray(rows)], self.items)
+
+    def frequent_columns(self, min_support: float) -> np.ndarray:
+        """Item codes whose support meets min_support (same comparison as mlxtend)."""
+        if self.n_baskets == 0:
+            return np.array([], dtype=np.int64)
+        support = self.item_counts() / float(self.n_baskets)
+        return np.nonzero(support >= min_support)[0]
+
+    def select_columns(self, columns: np.ndarray) -> "BasketMatrix":
+        """Restrict the matrix to a subset of item codes."""
+        columns = np.asarray(columns, dtype=np.int64)
+        return BasketMatrix(self.matrix[:, columns].tocsr(), self.items[columns])
+
+    def to_sparse_frame(self, columns: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Convert to a pandas sparse boolean DataFrame accepted by mlxtend.
+
+        Args:
+            columns: Optional item codes to keep (defaults to all items)
+
+        Returns:
+            DataFrame with SparseDtype(bool) columns named by item label
+        """
+        basket = self if columns is None else self.select_columns(columns)
+        labels: List[str] = [str(item) for item in basket.items]
+        # pandas only accepts a bool fill value once the frame exists, so
+        # build it over uint8 and cast
+        return pd.DataFrame.sparse.from_spmatrix(
+            basket.matrix.astype(np.uint8), columns=labels
+        ).astype(pd.SparseDtype(bool, False))
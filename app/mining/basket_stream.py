@@ -0,0 +1,53 @@
+"""
+Streaming basket reader.
+
+Walks line items ordered by transaction_id straight from a database cursor
+and regroups them into DataFrames of whole baskets, a fixed number of baskets
+at a time. A basket that straddles two fetches is carried over, so no basket
+is ever split. A BasketStream is a partition source for
+ContextAwareMiner.mine_partitioned: each call starts a fresh scan, and mining
+holds one batch plus the itemset counts instead of the whole history.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class BasketStream:
+    """Re-scannable source of whole-basket line-item batches."""
+
+    def __init__(self, fetch: Callable[[], Iterable[List[Dict[str, Any]]]], batch_baskets: int = 10000):
+        """
+        Initialize basket stream.
+
+        Args:
+            fetch: Callable starting a new scan; yields row batches (e.g.
+                DatabaseManager.iter_query) ordered by transaction_id
+            batch_baskets: Baskets per yielded DataFrame (the last may hold fewer)
+        """
+        if batch_baskets < 1:
+            raise ValueError(f"batch_baskets must be positive, got {batch_baskets}")
+        self.fetch = fetch
+        self.batch_baskets = batch_baskets
+
+    def __call__(self) -> Iterator[pd.DataFrame]:
+        """Scan the source once, yielding line items of batch_baskets baskets at a time."""
+        buffer: Optional[pd.DataFrame] = None
+        for rows in self.fetch():
+            if not rows:
+                continue
+            frame = pd.DataFrame(rows)
+            buffer = frame if buffer is None else pd.concat([buffer, frame], ignore_index=True)
+            while True:
+                ids = buffer['transaction_id'].to_numpy()
+                starts = np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1])))
+                # The buffer's last basket may continue in the next fetch
+                if len(starts) <= self.batch_baskets:
+                    break
+                cut = starts[self.batch_baskets]
+                yield buffer.iloc[:cut]
+                buffer = buffer.iloc[cut:].reset_index(drop=True)
+        if buffer is not None and len(buffer):
+            yield buffer
@@ -0,0 +1,115 @@
+"""
+Benchmark that calibrates the engine selector's cost model.
+
+Runs every registered engine on synthetic segments spanning basket count,
+catalog size, density and min_support, then fits non-negative per-feature
+coefficients. Usage:
+
+    python -m app.mining.calibration --output config/miner_calibration.yaml
+"""
+
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import yaml
+from scipy.optimize import nnls
+
+from .basket_matrix import BasketMatrix
+from .engine_selector import DEFAULT_CALIBRATION_PATH, ENGINE_FEATURES, MINER_REGISTRY, SegmentProfile
+
+
+# (baskets, catalog size, mean basket length, min_support, max_len)
+BENCHMARK_GRID = [
+    (n, catalog, length, support, max_len)
+    for n in (500, 4000)
+    for catalog in (40, 400)
+    for length in (3, 8)
+    for support in (0.02, 0.08)
+    for max_len in (None, 3)
+]
+
+
+def synthetic_basket(n_baskets: int, catalog: int, mean_length: float,
+                     seed: int = 0) -> BasketMatrix:
+    """Zipf-like baskets resembling grocery data (a few very popular SKUs)."""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, catalog + 1) ** 0.9
+    weights /= weights.sum()
+    lengths = np.clip(rng.poisson(mean_length, size=n_baskets), 1, catalog)
+    rows = np.repeat(np.arange(n_baskets), lengths)
+    items = rng.choice(catalog, size=int(lengths.sum()), p=weights)
+    labels = np.array([f"sku_{i:05d}" for i in range(catalog)], dtype=object)
+    return BasketMatrix.from_codes(rows, items, n_baskets=n_baskets, items=labels)
+
+
+def _time_engine(name: str, basket: BasketMatrix, min_support: float,
+                 max_len: Optional[int], repeats: int) -> float:
+    engine = MINER_REGISTRY[name]()
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        itemsets = engine.mine_matrix(basket, min_support, max_len=max_len)
+        engine.generate_rules(itemsets, min_confidence=0.1)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run_benchmark(repeats: int = 2) -> Dict[str, Dict[str, float]]:
+    """
+    Time each engine over the benchmark grid and fit cost coefficients.
+
+    Returns:
+        Mapping of engine name to {feature: seconds per unit}
+    """
+    logger = logging.getLogger(__name__)
+    samples: Dict[str, List] = {name: [] for name in ENGINE_FEATURES}
+
+    for seed, (n, catalog, length, support, max_len) in enumerate(BENCHMARK_GRID):
+        basket = synthetic_basket(n, catalog, length, seed=seed)
+        profile = SegmentProfile.from_basket(basket, support, max_len)
+        for name in ENGINE_FEATURES:
+            if name == "pairs" and max_len is None:
+                continue
+            seconds = _time_engine(name, basket, support, max_len, repeats)
+            features = profile.features(name)
+            samples[name].append(([features[f] for f in ENGINE_FEATURES[name]], seconds))
+            logger.info(f"{name:9s} n={n} catalog={catalog} len={length} "
+                        f"min_support={support} max_len={max_len}: {seconds * 1000:.1f}ms")
+
+    calibration = {}
+    for name, rows in samples.items():
+        X = np.array([r[0] for r in rows], dtype=np.float64)
+        y = np.array([r[1] for r in rows], dtype=np.float64)
+        # Scale columns so the NNLS fit is well conditioned
+        scale = np.maximum(X.max(axis=0), 1e-12)
+        coefs, _ = nnls(X / scale, y)
+        calibration[name] = {feature: float(c / s) for feature, c, s
+                             in zip(ENGINE_FEATURES[name], coefs, scale)}
+    return calibration
+
+
+def write_calibration(calibration: Dict[str, Dict[str, float]], path: Path):
+    """Persist calibrated coefficients in the format load_calibration reads."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as handle:
+        handle.write("# Generated by: python -m app.mining.calibration\n")
+        yaml.safe_dump({"engines": calibration}, handle, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the mining engine selector.")
+    parser.add_argument("--output", type=Path, default=DEFAULT_CALIBRATION_PATH)
+    parser.add_argument("--repeats", type=int, default=2)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    write_calibration(run_benchmark(repeats=args.repeats), args.output)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
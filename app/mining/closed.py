@@ -0,0 +1,325 @@
+"""
+Closed and maximal frequent itemset mining.
+
+Dense segments (festival weeks, breakfast baskets) have huge numbers of
+frequent itemsets that share the same baskets. A closed itemset has no
+superset with the same support; every frequent itemset's support equals that
+of its smallest closed superset, so the closed sets summarize the frequent
+ones losslessly. Maximal itemsets (no frequent superset at all) are the
+smallest summary.
+
+Closed itemsets are mined with CHARM over the same packed bitsets EclatMiner
+uses. Rules come from closed itemsets only, with minimal-generator
+antecedents (Zaki's non-redundant basis): any other rule has a more general
+rule with the same support and confidence.
+
+With max_len the lattice is cut at that length and closedness is taken
+within the cut: shorter closed itemsets are kept, and the max_len-item
+subsets of longer closed itemsets stand in for them, so no frequent itemset
+within the cut loses its summary.
+"""
+
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .basket_matrix import BasketMatrix, min_support_count
+from .eclat import EclatMiner
+from .rule_generator import RULE_COLUMNS
+
+
+ITEMSET_MODES = ('all', 'closed', 'maximal')
+
+
+class ClosedItemsetMiner:
+    """CHARM closed itemset miner with non-redundant rule generation."""
+
+    def __init__(self, mode: str = 'closed'):
+        """
+        Initialize closed itemset miner.
+
+        Args:
+            mode: "closed" generates rules from every closed itemset, "maximal"
+                only from maximal ones
+        """
+        if mode not in ('closed', 'maximal'):
+            raise ValueError(f"Unknown itemset mode: {mode}")
+        self.mode = mode
+
+    def mine(self, transactions: List[List[str]], min_support: float) -> pd.DataFrame:
+        """
+        Mine closed frequent itemsets.
+
+        Args:
+            transactions: List of transactions, each transaction is a list of item strings
+            min_support: Minimum support threshold (0.0 to 1.0)
+
+        Returns:
+            DataFrame with closed itemsets, their support and a maximal flag
+        """
+        return self.mine_matrix(BasketMatrix.from_transactions(transactions), min_support)
+
+    def mine_matrix(self, basket: BasketMatrix, min_support: float,
+                    max_len: Optional[int] = None) -> pd.DataFrame:
+        """
+        Mine closed frequent itemsets from a sparse basket matrix.
+
+        Args:
+            basket: Sparse baskets × items matrix
+            min_support: Minimum support threshold (0.0 to 1.0)
+            max_len: Maximum itemset length; itemsets are closed within the lattice cut
+                at this length (see _cut_at_length)
+
+        Returns:
+            DataFrame with support, itemsets and maximal columns, by descending support
+        """
+        total = basket.n_baskets
+        columns = basket.frequent_columns(min_support)
+        if total == 0 or len(columns) == 0:
+            return pd.DataFrame(columns=['support', 'itemsets', 'maximal'])
+
+        min_count = min_support_count(min_support, total)
+        bitsets = EclatMiner()._to_bitsets(basket, columns)
+        labels = [str(basket.items[c]) for c in columns]
+        members = sorted(
+            (((labels[k],), bitsets[k], bitsets[k].bit_count()) for k in range(len(columns))),
+            key=lambda m: (m[2], m[0]),
+        )
+
+        closed: Dict[Tuple[int, int], List[frozenset]] = {}
+        self._charm(frozenset(), members, min_count, closed)
+
+        itemsets = [(count, itemset) for (count, _), bucket in closed.items() for itemset in bucket]
+        if max_len is not None:
+            itemsets = self._cut_at_length(itemsets, max_len)
+        itemsets.sort(key=lambda entry: (-entry[0], len(entry[1]), sorted(entry[1])))
+        result = pd.DataFrame({
+            'support': [count / total for count, _ in itemsets],
+            'itemsets': [itemset for _, itemset in itemsets],
+        })
+        result['maximal'] = self._maximal_flags(result['itemsets'].tolist())
+        return result
+
+    @staticmethod
+    def _cut_at_length(itemsets: List[Tuple[int, frozenset]], max_len: int) -> List[Tuple[int, frozenset]]:
+        """
+        Closed itemsets of the lattice cut at max_len.
+
+        An itemset shorter than max_len is closed within the cut exactly when it
+        is closed (if some superset has equal support, so does one with a
+        single extra item). An itemset of max_len items has no superset within the cut, so
+        every frequent one is closed there; those that are not closed overall
+        are subsets of longer closed itemsets and take the support of the most
+        frequent one.
+
+        Args:
+            itemsets: (support count, itemset) of every closed itemset
+
+        Returns:
+            (support count, itemset) of every closed itemset within the cut
+        """
+        kept = {itemset: count for count, itemset in itemsets if len(itemset) <= max_len}
+        for count, itemset in itemsets:
+            if len(itemset) <= max_len:
+                continue
+            for subset in combinations(sorted(itemset), max_len):
+                subset = frozenset(subset)
+                if kept.get(subset, 0) < count:
+                    kept[subset] = count
+        return [(count, itemset) for itemset, count in kept.items()]
+
+    def _charm(self, prefix: frozenset, members: List[Tuple[Tuple[str, ...], int, int]],
+               min_count: int, closed: Dict[Tuple[int, int], List[frozenset]]):
+        """
+        CHARM over one equivalence class.
+
+        Args:
+            prefix: Items shared by every member of the class
+            members: (items extending the prefix, tidset bitset, support count), by ascending support
+            min_count: Minimum support count threshold
+            closed: Output of closed itemsets keyed by (support count, tidset hash)
+        """
+        removed = [False] * len(members)
+        for i, (items_i, tids_i, count_i) in enumerate(members):
+            if removed[i]:
+                continue
+            itemset = set(prefix) | set(items_i)
+            children = []
+            for j in range(i + 1, len(members)):
+                if removed[j]:
+                    continue
+                items_j, tids_j, count_j = members[j]
+                tids = tids_i & tids_j
+                count = tids.bit_count()
+                if count < min_count:
+                    continue
+                if count == count_i and count == count_j:
+                    # Same baskets: X_j always occurs with X_i
+                    removed[j] = True
+                    itemset.update(items_j)
+                elif count == count_i:
+                    # t(X_i) ⊂ t(X_j): X_j is in the closure of X_i
+                    itemset.update(items_j)
+                elif count == count_j:
+                    # t(X_i) ⊃ t(X_j): X_j only ever extends X_i
+                    removed[j] = True
+                    children.append((items_j, tids, count))
+                else:
+                    children.append((items_j, tids, count))
+
+            itemset = frozenset(itemset)
+            if children:
+                children.sort(key=lambda m: (m[2], m[0]))
+                self._charm(itemset, children, min_count, closed)
+            self._add_closed(itemset, tids_i, count_i, closed)
+
+    @staticmethod
+    def _add_closed(itemset: frozenset, tids: int, count: int,
+                    closed: Dict[Tuple[int, int], List[frozenset]]):
+        """Record a closed candidate unless a known superset has the same support."""
+        bucket = closed.setdefault((count, hash(tids)), [])
+        for k, existing in enumerate(bucket):
+            # Equal support plus containment means equal tidsets
+            if itemset <= existing:
+                return
+            if existing < itemset:
+                bucket[k] = itemset
+                return
+        bucket.append(itemset)
+
+    @staticmethod
+    def _closure_masks(itemsets: List[frozenset]) -> Dict[str, int]:
+        """Per item, a bitmask over itemset positions containing it."""
+        masks: Dict[str, int] = {}
+        for position, itemset in enumerate(itemsets):
+            bit = 1 << position
+            for item in itemset:
+                masks[item] = masks.get(item, 0) | bit
+        return masks
+
+    def _maximal_flags(self, itemsets: List[frozenset]) -> np.ndarray:
+        """Whether each closed itemset has no closed (hence no frequent) proper superset."""
+        masks = self._closure_masks(itemsets)
+        flags = np.zeros(len(itemsets), dtype=bool)
+        for position, itemset in enumerate(itemsets):
+            supersets = -1
+            for item in itemset:
+                supersets &= masks[item]
+            flags[position] = supersets == 1 << position
+        return flags
+
+    def generate_rules(self, itemsets: pd.DataFrame, min_confidence: float, min_lift: float = 0.0,
+                       max_consequent_size: Optional[int] = None) -> pd.DataFrame:
+        """
+        Generate non-redundant association rules from closed itemsets.
+
+        Each rule A → C \\ A has a closed itemset C (maximal in "maximal" mode)
+        and an antecedent A that is a minimal generator: no proper subset of A
+        has the same support. Supports of subsets are exact, looked up as the
+        support of their smallest closed superset. When C \\ A has more than
+        max_consequent_size items, A → S is generated for every subset S of
+        C \\ A up to that size instead, so capped rules are summarized rather
+        than lost.
+
+        Args:
+            itemsets: DataFrame from mine_matrix (closed itemsets by descending support)
+            min_confidence: Minimum confidence threshold (0.0 to 1.0)
+            min_lift: Minimum lift threshold
+            max_consequent_size: Largest consequent to generate (None for unlimited)
+
+        Returns:
+            DataFrame with association rules including support, confidence, and lift
+        """
+        if itemsets.empty:
+            return pd.DataFrame(columns=RULE_COLUMNS)
+
+        closed = itemsets['itemsets'].tolist()
+        supports = itemsets['support'].to_numpy(dtype=np.float64)
+        masks = self._closure_masks(closed)
+        cache: Dict[frozenset, float] = {}
+
+        def support_of(items: frozenset) -> float:
+            if items not in cache:
+                supersets = -1
+                for item in items:
+                    supersets &= masks[item]
+                # Rows are by descending support, so the lowest set bit is the closure
+                cache[items] = supports[(supersets & -supersets).bit_length() - 1]
+            return cache[items]
+
+        sources = range(len(closed))
+        if self.mode == 'maximal':
+            sources = np.flatnonzero(itemsets['maximal'].to_numpy(dtype=bool))
+
+        rules_data = []
+        seen = set()
+        for position in sources:
+            itemset = closed[position]
+            if len(itemset) < 2:
+                continue
+            for antecedent in self._generators(itemset, support_of):
+                antecedent_support = support_of(antecedent)
+                for consequent in self._consequents(itemset - antecedent, max_consequent_size):
+                    if (antecedent, consequent) in seen:
+                        continue
+                    seen.add((antecedent, consequent))
+                    support = support_of(antecedent | consequent)
+                    confidence = support / antecedent_support
+                    if confidence < min_confidence:
+                        continue
+                    consequent_support = support_of(consequent)
+                    lift = confidence / consequent_support
+                    if lift < min_lift:
+                        continue
+                    rules_data.append((antecedent, consequent, antecedent_support, consequent_support,
+                                       support, confidence, lift))
+
+        if not rules_data:
+            return pd.DataFrame(columns=RULE_COLUMNS)
+
+        rules_df = pd.DataFrame(rules_data, columns=RULE_COLUMNS)
+        return rules_df.sort_values('confidence', ascending=False, kind='mergesort').reset_index(drop=True)
+
+    @staticmethod
+    def _consequents(consequent: frozenset, max_consequent_size: Optional[int]) -> List[frozenset]:
+        """The consequent itself, or every subset of it up to max_consequent_size items."""
+        if max_consequent_size is None or len(consequent) <= max_consequent_size:
+            return [consequent]
+        items = sorted(consequent)
+        return [frozenset(subset) for size in range(1, max_consequent_size + 1)
+                for subset in combinations(items, size)]
+
+    @staticmethod
+    def _generators(itemset: frozenset, support_of) -> List[frozenset]:
+        """
+        Minimal generators among the proper subsets of a closed itemset.
+
+        Generators are downward closed, so they are grown level-wise from
+        single items with an Apriori prefix join, keeping a candidate only
+        when every subset is a generator with strictly higher support.
+        """
+        level = [(item,) for item in sorted(itemset)]
+        known = set(level)
+        generators = [frozenset(g) for g in level]
+        size = 1
+        while level and size + 1 < len(itemset):
+            size += 1
+            by_prefix: Dict[Tuple[str, ...], List[str]] = {}
+            for generator in level:
+                by_prefix.setdefault(generator[:-1], []).append(generator[-1])
+            level = []
+            for prefix, lasts in by_prefix.items():
+                for a_pos, a in enumerate(lasts):
+                    for b in lasts[a_pos + 1:]:
+                        candidate = prefix + (a, b)
+                        subsets = [candidate[:k] + candidate[k + 1:] for k in range(size)]
+                        if not all(subset in known for subset in subsets):
+                            continue
+                        support = support_of(frozenset(candidate))
+                        if all(support < support_of(frozenset(subset)) for subset in subsets):
+                            level.append(candidate)
+            known.update(level)
+            generators.extend(frozenset(g) for g in level)
+        return generators
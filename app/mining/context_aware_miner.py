@@ -1,17 +1,72 @@
+"""
+Context-aware rule mining across the context lattice.
+
+Transactions are segmented by context (store, time bin, weekday/weekend,
+quarter, festival and their combinations) and every basket is encoded once
+into a shared sparse matrix, so each segment is a row selection over it.
+ContextAwareMiner picks an engine per segment, mines segments sequentially,
+in a process pool or in one shared counting pass, and applies the mining
+budget, deadlines and cancellation; contrast, high-utility, multi-level and
+partitioned (SON) mining reuse the same segmentation.
+"""
+
+import numpy as np
 import pandas as pd
-from typing import List, Dict
+from scipy import sparse
+from dataclasses import replace
+from typing import Callable, List, Dict, Optional, Tuple
 import logging
+import threading
+import time
 
+from .basket_matrix import BasketMatrix
+from .closed import ITEMSET_MODES, ClosedItemsetMiner
 from .context_segmenter import ContextSegmenter
-from .context_types import Context, ContextualRule
-from .fpgrowth import FPGrowthMiner
+from .contrast import ContrastMiner, ContrastPattern
+from .cost_estimator import CostEstimator, MiningBudget, MiningPlan
+from .context_types import Context
+from .eclat import EclatMiner
+from .engine_selector import EngineSelector
+from .hierarchy import ItemHierarchy, MultiLevelMiner
+from .high_utility import HighUtilityItemset, HighUtilityMiner
+from .multi_context import MultiContextCounter
+from .rule_generator import RuleGenerator
+from .rule_set import RuleSet
+from .parallel import mine_segments_parallel, resolve_n_jobs
+from .partitioned import PartitionedMiner, PartitionSource
+from .sampling import SampledMiner, SamplingConfig, SamplingReport
+
+
+def context_priority(context: Context) -> Tuple[int, bool]:
+    """
+    Mining order under a deadline: Overall, then coarser before finer contexts,
+    festival contexts first within each depth (the segments merchandisers act on first).
+    """
+    depth = len(context.parents())
+    return depth, context.festival_period is None
+
+
+def _stop_check(deadline_ms: Optional[float], cancel: Optional[threading.Event],
+                started: float) -> Callable[[], bool]:
+    """Whether mining that began at started (time.monotonic) should stop before its next segment."""
+    def should_stop() -> bool:
+        if cancel is not None and cancel.is_set():
+            return True
+        return deadline_ms is not None and (time.monotonic() - started) * 1000 >= deadline_ms
+    return should_stop
 
 
 class ContextAwareMiner:
     """Mines association rules within different context segments."""
 
     def __init__(self, min_support: float = 0.01, min_confidence: float = 0.3,
-                 min_rows_per_context: int = 100):
+                 min_rows_per_context: int = 100, n_jobs: int = 1,
+                 max_len: Optional[int] = None, algorithms: Optional[List[str]] = None,
+                 calibration: Optional[Dict[str, Dict[str, float]]] = None,
+                 counting: str = "per_segment", sampling: Optional[SamplingConfig] = None,
+                 min_lift: float = 0.0, itemset_mode: str = "all",
+                 max_consequent_size: Optional[int] = None, budget: Optional[MiningBudget] = None,
+                 multi_level: bool = False):
         """
         Initialize context-aware miner.
 
@@ -19,75 +74,506 @@ class ContextAwareMiner:
             min_support: Minimum support threshold for mining
             min_confidence: Minimum confidence threshold for rules
             min_rows_per_context: Minimum rows per context segment
+            n_jobs: Worker processes for per-context mining (1 = sequential, -1 = all cores)
+            max_len: Maximum itemset length (None for unlimited)
+            algorithms: Mining engines the selector may choose from (defaults to all registered)
+            calibration: Engine cost coefficients (defaults to config/miner_calibration.yaml)
+            counting: "per_segment" mines each context separately; "single_pass" counts
+                every context's itemsets together in one scan per itemset length
+            sampling: Approximate mode: mine a sample of each segment and verify it exactly
+                (supports stay exact; see sampling_reports for the error bounds)
+            min_lift: Rules below this lift are pruned while rules are generated
+            itemset_mode: "all" mines every frequent itemset; "closed" / "maximal" mine
+                closed itemsets and emit only non-redundant rules (from maximal
+                itemsets only in "maximal" mode)
+            max_consequent_size: Largest rule consequent to generate (None for unlimited)
+            budget: Time / memory budget checked before mining; depending on the budget,
+                min_support / max_len are raised / lowered to fit or MiningBudgetExceeded
+                is raised (see cost_plan for what was decided)
+            multi_level: Also mine the item categories (the transactions' category
+                column): category, SKU and mixed itemsets are counted together and
+                rules implied by a more general rule are dropped
         """
+        if itemset_mode not in ITEMSET_MODES:
+            raise ValueError(f"Unknown itemset mode: {itemset_mode}")
         self.min_support = min_support
         self.min_confidence = min_confidence
+        self.min_lift = min_lift
+        self.min_rows_per_context = min_rows_per_context
+        self.n_jobs = n_jobs
+        self.max_len = max_len
         self.segmenter = ContextSegmenter(min_rows=min_rows_per_context)
-        self.fp_growth = FPGrowthMiner()
+        self.counting = counting
+        self.selector = EngineSelector(algorithms, calibration)
+        self.sampling = sampling
+        self.itemset_mode = itemset_mode
+        self.max_consequent_size = max_consequent_size
+        self.budget = budget
+        self.cost_plan: Optional[MiningPlan] = None
+        self.multi_level = multi_level
+        self.hierarchy: Optional[ItemHierarchy] = None
+        self.sampling_reports: Dict[Context, SamplingReport] = {}
+        self.partial = False  # Whether the last mine_all_contexts stopped before every context
+        self.skipped_contexts: List[Context] = []
         self.logger = logging.getLogger(__name__)
 
-    def mine_all_contexts(self, transactions: pd.DataFrame, max_depth: int = 2) -> List[ContextualRule]:
+    def mine_all_contexts(self, transactions: pd.DataFrame, max_depth: int = 2,
+                          basket_weights: Optional[pd.Series] = None,
+                          deadline_ms: Optional[float] = None,
+                          cancel: Optional[threading.Event] = None) -> RuleSet:
         """
         Mine association rules across all context segments.
 
+        All baskets are encoded once into a shared item code space; each
+        context segment is mined as a row selection over that matrix.
+
+        With a deadline or cancel event, segments are mined one at a time in
+        priority order (see context_priority) and mining stops between
+        segments once the deadline passes or the event is set; the rules of
+        the finished segments are returned and partial / skipped_contexts
+        record what was left out.
+
+        Args:
+            transactions: DataFrame with transaction data
+            max_depth: Context lattice depth
+            basket_weights: Optional weight per transaction_id (e.g. time decay); weighted
+                mining always uses single-pass counting
+            deadline_ms: Time budget for mining the segments, in milliseconds
+                (encoding and cost planning are not counted)
+            cancel: Event that aborts mining when set (e.g. the client went away)
+
+        Returns:
+            RuleSet with every (finished) context's rules (iterates as ContextualRule views)
+        """
+        self.partial = False
+        self.skipped_contexts = []
+        if basket_weights is not None and self.multi_level:
+            raise ValueError("Weighted mining counts SKU-level itemsets only; disable multi_level")
+        basket, basket_ids, tasks = self._segment_tasks(transactions, max_depth)
+
+        stoppable = deadline_ms is not None or cancel is not None
+        if stoppable:
+            tasks.sort(key=lambda task: context_priority(task[0]))
+        if cancel is not None and cancel.is_set():
+            # Abandoned before mining started: skip cost planning too
+            self.skipped_contexts = [context for context, _ in tasks]
+            self.partial = bool(tasks)
+            return RuleSet.empty()
+
+        if self.budget is not None and tasks:
+            self._apply_budget(basket, tasks)
+
+        # The deadline covers segment mining only, so its clock starts after planning
+        started = time.monotonic()
+        should_stop = _stop_check(deadline_ms, cancel, started) if stoppable else None
+
+        n_jobs = resolve_n_jobs(self.n_jobs, len(tasks))
+        if basket_weights is not None:
+            weights = basket_weights.reindex(basket_ids).fillna(0.0).to_numpy(dtype=np.float64)
+            # One counting pass covers every context, so it either runs or is skipped as a whole
+            if should_stop is not None and should_stop():
+                rules_per_task = [None] * len(tasks)
+            else:
+                rules_per_task = self._mine_single_pass(basket, tasks, weights)
+        elif self.sampling is not None or self.hierarchy is not None:
+            # Sampling reports and the item hierarchy live in-process, so segments are mined sequentially
+            rules_per_task = self._mine_sequential(basket, tasks, should_stop)
+        elif self.counting == "single_pass" and self.itemset_mode == "all" and should_stop is None:
+            rules_per_task = self._mine_single_pass(basket, tasks)
+        elif n_jobs > 1 and len(tasks) > 1:
+            rules_per_task = self._mine_parallel(basket, tasks, n_jobs, should_stop)
+        else:
+            rules_per_task = self._mine_sequential(basket, tasks, should_stop)
+
+        if should_stop is not None:
+            self.skipped_contexts = [context for (context, _), rules in zip(tasks, rules_per_task) if rules is None]
+            self.partial = bool(self.skipped_contexts)
+            rules_per_task = [rules for rules in rules_per_task if rules is not None]
+            if self.partial:
+                self.logger.warning(
+                    f"Mining stopped after {(time.monotonic() - started) * 1000:.0f} ms: "
+                    f"{len(tasks) - len(self.skipped_contexts)}/{len(tasks)} contexts finished"
+                )
+
+        # Merge in segment order so output does not depend on scheduling
+        all_rules = RuleSet.concat(rules_per_task)
+
+        self.logger.info(f"Total rules found across all contexts: {len(all_rules)}")
+        return all_rules
+
+    def mine_contrasts(self, transactions: pd.DataFrame, max_depth: int = 1,
+                       min_growth: float = 2.0) -> List[ContrastPattern]:
+        """
+        Find itemsets whose support in a context is a multiple of their support in its parents.
+
+        Uses one shared counting pass over every segment instead of mining
+        each segment, so it is much cheaper than comparing mine_all_contexts
+        results. The pass still counts every segment's frequent itemsets, so
+        with a budget it is planned like mine_all_contexts first, which may
+        adjust min_support / max_len or raise MiningBudgetExceeded.
+
         Args:
             transactions: DataFrame with transaction data
+            max_depth: Context lattice depth (1 compares single dimensions with Overall)
+            min_growth: Minimum support ratio against every parent context
+
+        Returns:
+            Contrast patterns by descending growth rate
+        """
+        basket, _, tasks = self._segment_tasks(transactions, max_depth)
+        if self.budget is not None and tasks:
+            self._apply_budget(basket, tasks, rules=False)
+        miner = ContrastMiner(self.min_support, min_growth=min_growth, max_len=self.max_len)
+        return miner.mine(basket, tasks)
+
+    def mine_high_utility(self, transactions: pd.DataFrame, max_depth: int = 0,
+                          min_utility: float = 0.01) -> List[HighUtilityItemset]:
+        """
+        Find the itemsets that earn the most margin in each context.
+
+        Utility replaces support as the mining threshold, so high-margin
+        combinations are found even when they are too rare for min_support.
+        With a budget, the request is planned first (see
+        _apply_utility_budget), which may raise min_utility / lower max_len or
+        raise MiningBudgetExceeded.
+
+        Args:
+            transactions: DataFrame with transaction_id, item_id, price and
+                (optionally) quantity and margin_pct columns
+            max_depth: Context lattice depth
+            min_utility: Minimum share of a context's total margin (0.0 to 1.0)
 
         Returns:
-            List of ContextualRule objects with context metadata
+            High-utility itemsets per context (segment order), by descending utility
         """
+        basket, basket_ids, tasks = self._segment_tasks(transactions, max_depth)
+        utility = self._utility_matrix(transactions, basket, basket_ids)
+        if self.budget is not None and tasks:
+            min_utility = self._apply_utility_budget(basket, tasks, utility, min_utility)
+        miner = HighUtilityMiner(min_utility=min_utility, max_len=self.max_len)
+
+        results: List[HighUtilityItemset] = []
+        for context, rows in tasks:
+            itemsets = miner.mine_matrix(utility[rows], basket.items)
+            results.extend(
+                HighUtilityItemset(itemset=itemset, context=context, utility=float(value),
+                                   utility_share=float(share), support=float(support),
+                                   n_baskets=len(rows))
+                for itemset, value, share, support in zip(
+                    itemsets['itemsets'], itemsets['utility'], itemsets['utility_share'], itemsets['support'])
+            )
+        self.logger.info(f"Found {len(results)} high-utility itemsets across {len(tasks)} contexts")
+        return results
+
+    def _utility_matrix(self, transactions: pd.DataFrame, basket: BasketMatrix, basket_ids: pd.Index):
+        """Margin per (basket, item) in the basket matrix's row and column order."""
+        valid = transactions['item_id'].notna().to_numpy()
+        lines = transactions[valid]
+        rows = basket_ids.get_indexer(lines['transaction_id'])
+        columns = pd.Index(basket.items).get_indexer(lines['item_id'].astype(str))
+        values = HighUtilityMiner.line_utilities(lines)
+        # Duplicate lines of an item in one basket are summed
+        return sparse.csr_matrix((values, (rows, columns)), shape=(basket.n_baskets, basket.n_items))
+
+    def _segment_tasks(self, transactions: pd.DataFrame, max_depth: int):
+        """Encode baskets once and map every context segment to its basket rows."""
         # Segment transactions by context
         segments = self.segmenter.segment(transactions, max_depth=max_depth)
         self.logger.info(f"Created {len(segments)} context segments")
 
-        all_rules = []
-
-        for context, segment_df in segments.items():
-            self.logger.debug(f"Mining context: {context} ({len(segment_df)} transactions)")
+        basket, basket_ids = self.encode_baskets(transactions)
+        # Basket row of every line item, so segments map to baskets without copying
+        line_rows = basket_ids.get_indexer(transactions['transaction_id'])
 
-            # Convert segment to transaction list
-            trans_list = self._df_to_transactions(segment_df)
+        tasks = []
+        for context, positions in segments.items():
+            rows = self._segment_rows(positions, line_rows)
 
-            if len(trans_list) < 5:  # Skip segments with too few transactions
-                self.logger.debug(f"Skipping context {context}: only {len(trans_list)} transactions")
+            if len(rows) < 5:  # Skip segments with too few transactions
+                self.logger.debug(f"Skipping context {context}: only {len(rows)} transactions")
                 continue
 
-            try:
-                # Mine frequent itemsets
-                itemsets = self.fp_growth.mine(trans_list, min_support=self.min_support)
-
-                if itemsets.empty:
-                    self.logger.debug(f"No frequent itemsets found for context {context}")
-                    continue
-
-                # Generate association rules
-                rules_df = self.fp_growth.generate_rules(itemsets, min_confidence=self.min_confidence)
-
-                if rules_df.empty:
-                    self.logger.debug(f"No association rules found for context {context}")
-                    continue
-
-                # Convert to ContextualRule objects
-                for _, rule in rules_df.iterrows():
-                    contextual_rule = ContextualRule(
-                        antecedent=frozenset(rule['antecedents']),
-                        consequent=frozenset(rule['consequents']),
-                        support=rule['support'],
-                        confidence=rule['confidence'],
-                        lift=rule['lift'],
-                        context=context
-                    )
-                    all_rules.append(contextual_rule)
-
-                self.logger.debug(f"Found {len(rules_df)} rules for context {context}")
-
-            except Exception as e:
-                self.logger.warning(f"Error mining context {context}: {e}")
+            tasks.append((context, rows))
+        return basket, basket_ids, tasks
+
+    def mine_partitioned(self, partitions: PartitionSource, max_depth: int = 2,
+                         total_baskets: Optional[int] = None, deadline_ms: Optional[float] = None,
+                         cancel: Optional[threading.Event] = None) -> RuleSet:
+        """
+        Mine every context of a history too large to load at once (SON).
+
+        Each partition is mined locally in worker processes and the union of
+        local results is counted exactly in a second scan, so rules are the
+        same as mine_all_contexts over the concatenated partitions while only
+        one partition per worker is in memory.
+
+        With a budget, the cost is planned from the first partition before
+        mining (see _plan_partitioned), which may adjust min_support / max_len
+        or raise MiningBudgetExceeded like mine_all_contexts.
+
+        With a deadline or cancel event, mining stops between partitions.
+        Every context needs both full scans, so a stopped run returns no rules
+        and sets partial.
+
+        Args:
+            partitions: Callable returning an iterable of line-item DataFrames
+                (scanned twice), each holding whole baskets
+            max_depth: Context lattice depth
+            total_baskets: Baskets across all partitions, for scaling the
+                planned runtime (None plans as if the first partition were all)
+            deadline_ms: Time budget for the two scans, in milliseconds
+            cancel: Event that aborts mining when set
+
+        Returns:
+            RuleSet with every context's rules (empty when stopped)
+        """
+        self.partial = False
+        self.skipped_contexts = []
+        if cancel is not None and cancel.is_set():
+            self.partial = True
+            return RuleSet.empty()
+        if self.budget is not None:
+            self._plan_partitioned(partitions, max_depth, total_baskets)
+        should_stop = None
+        if deadline_ms is not None or cancel is not None:
+            should_stop = _stop_check(deadline_ms, cancel, time.monotonic())
+
+        miner_kwargs = {
+            'min_support': self.min_support,
+            'max_len': self.max_len,
+            'algorithms': self.selector.algorithms,
+            'calibration': self.selector.calibration,
+        }
+        son = PartitionedMiner(miner_kwargs, max_depth=max_depth, n_jobs=resolve_n_jobs(self.n_jobs))
+        itemsets_per_context, sizes = son.mine(partitions, should_stop)
+        if son.stopped:
+            self.partial = True
+            return RuleSet.empty()
+
+        generator = RuleGenerator(self.min_confidence, self.min_lift, self.max_consequent_size)
+        rules_per_context = []
+        for context, itemsets in itemsets_per_context.items():
+            lines, baskets = sizes[context]
+            if lines < self.segmenter.min_rows_for_context(context) or baskets < 5:
+                self.logger.debug(f"Skipping context {context}: only {baskets} transactions")
                 continue
+            rules_per_context.append(self._to_contextual_rules(context, generator.generate(itemsets)))
 
+        all_rules = RuleSet.concat(rules_per_context)
         self.logger.info(f"Total rules found across all contexts: {len(all_rules)}")
         return all_rules
 
+    def _plan_partitioned(self, partitions: PartitionSource, max_depth: int, total_baskets: Optional[int]):
+        """
+        Plan SON mining from the first partition as the estimate sample.
+
+        Itemset counts follow relative support, so one partition predicts the
+        candidates (and the memory of a worker holding one partition); the time
+        budget is scaled down by the partition's share of all baskets, since
+        both scans touch every basket.
+        """
+        scan = iter(partitions())
+        sample = next(scan, None)
+        if hasattr(scan, 'close'):
+            scan.close()
+        if sample is None or sample.empty:
+            return
+
+        basket, basket_ids = self.encode_baskets(sample)
+        line_rows = basket_ids.get_indexer(sample['transaction_id'])
+        tasks = []
+        # As in scan 1, every context is mined locally whatever its row threshold
+        for context, positions in ContextSegmenter(min_rows=0).iter_segments(sample, max_depth=max_depth):
+            rows = self._segment_rows(positions, line_rows)
+            if len(rows):
+                tasks.append((context, rows))
+        budget = self.budget
+        if total_baskets and total_baskets > basket.n_baskets:
+            budget = replace(budget, time_budget_ms=budget.time_budget_ms * basket.n_baskets / total_baskets)
+        self._apply_budget(basket, tasks, budget)
+
+    def _apply_budget(self, basket: BasketMatrix, tasks, budget: Optional[MiningBudget] = None,
+                      rules: bool = True):
+        """
+        Predict the cost of mining every segment and fit the parameters to the budget.
+
+        With rules=False only the itemsets are priced (contrast mining
+        generates no rules).
+        """
+        estimator = CostEstimator(budget or self.budget, selector=self.selector,
+                                  max_consequent_size=self.max_consequent_size if rules else 0)
+        self.cost_plan = estimator.plan(basket, tasks, self.min_support, self.max_len)
+        self.logger.info(f"Mining cost estimate: {self.cost_plan.estimate.describe()}")
+        if self.cost_plan.adjusted:
+            self.min_support = self.cost_plan.min_support
+            self.max_len = self.cost_plan.max_len
+
+    def _apply_utility_budget(self, basket: BasketMatrix, tasks, utility: sparse.csr_matrix,
+                              min_utility: float) -> float:
+        """
+        Predict the cost of high-utility mining and fit min_utility / max_len to the budget.
+
+        Baskets are weighted by their margin, so the predicted frequent itemsets
+        are those whose TWU share reaches min_utility: the utility lists
+        HUI-Miner may build, priced like Eclat's tidset joins.
+        """
+        estimator = CostEstimator(self.budget, selector=self.selector, max_consequent_size=0,
+                                  threshold="min_utility")
+        weights = np.asarray(utility.sum(axis=1)).ravel()
+        self.cost_plan = estimator.plan(basket, tasks, min_utility, self.max_len, weights=weights)
+        self.logger.info(f"High-utility cost estimate: {self.cost_plan.estimate.describe()}")
+        if not self.cost_plan.adjusted:
+            return min_utility
+        self.max_len = self.cost_plan.max_len
+        return self.cost_plan.min_support
+
+    def _mine_task(self, basket: BasketMatrix, context: Context, rows: np.ndarray) -> RuleSet:
+        """Mine a single segment in-process."""
+        self.logger.debug(f"Mining context: {context} ({len(rows)} baskets)")
+        segment_basket = basket if len(rows) == basket.n_baskets else basket.take(rows)
+        return self._mine_segment(context, segment_basket)
+
+    def _mine_sequential(self, basket: BasketMatrix, tasks,
+                         should_stop: Optional[Callable[[], bool]] = None) -> List[Optional[RuleSet]]:
+        """Mine segments in order, leaving None for those not started before should_stop fired."""
+        rules_per_task: List[Optional[RuleSet]] = [None] * len(tasks)
+        for position, (context, rows) in enumerate(tasks):
+            if should_stop is not None and should_stop():
+                break
+            rules_per_task[position] = self._mine_task(basket, context, rows)
+        return rules_per_task
+
+    def _mine_parallel(self, basket: BasketMatrix, tasks, n_jobs: int,
+                       should_stop: Optional[Callable[[], bool]] = None) -> List[Optional[RuleSet]]:
+        """Fan segments out to a process pool, falling back to sequential mining."""
+        miner_kwargs = {
+            'min_support': self.min_support,
+            'min_confidence': self.min_confidence,
+            'min_lift': self.min_lift,
+            'itemset_mode': self.itemset_mode,
+            'max_consequent_size': self.max_consequent_size,
+            'min_rows_per_context': self.min_rows_per_context,
+            'max_len': self.max_len,
+            'algorithms': self.selector.algorithms,
+            'calibration': self.selector.calibration,
+        }
+        try:
+            self.logger.info(f"Mining {len(tasks)} contexts across {n_jobs} processes")
+            return mine_segments_parallel(basket, tasks, miner_kwargs, n_jobs, should_stop)
+        except Exception as e:
+            self.logger.warning(f"Parallel mining failed ({e}); falling back to sequential mining")
+            return self._mine_sequential(basket, tasks, should_stop)
+
+    def _mine_single_pass(self, basket: BasketMatrix, tasks,
+                          weights: Optional[np.ndarray] = None) -> List[RuleSet]:
+        """Count itemsets for all contexts in one scan, then derive rules per context."""
+        self.logger.info(f"Counting itemsets for {len(tasks)} contexts in a single pass")
+        counter = MultiContextCounter(self.min_support, max_len=self.max_len)
+        rule_engine = EclatMiner()
+        rules_per_task = []
+        for (context, _), itemsets in zip(tasks, counter.mine(basket, tasks, weights)):
+            if itemsets.empty:
+                rules_per_task.append(RuleSet.empty())
+                continue
+            rules_df = rule_engine.generate_rules(itemsets, min_confidence=self.min_confidence,
+                                                  min_lift=self.min_lift,
+                                                  max_consequent_size=self.max_consequent_size)
+            rules_per_task.append(self._to_contextual_rules(context, rules_df))
+        return rules_per_task
+
+    def encode_baskets(self, transactions: pd.DataFrame):
+        """
+        Encode all baskets once into a sparse item-coded matrix.
+
+        With multi_level, one column per category is appended (see
+        ItemHierarchy.extend) and the hierarchy is kept for mining.
+
+        Args:
+            transactions: DataFrame with transaction_id and item_id (and, for
+                multi-level mining, category) columns
+
+        Returns:
+            Tuple of (BasketMatrix, Index of transaction ids by basket row)
+        """
+        basket, basket_ids = BasketMatrix.from_line_items(transactions['transaction_id'], transactions['item_id'])
+        self.hierarchy = None
+        if self.multi_level and 'category' in transactions.columns:
+            lines = transactions[transactions['item_id'].notna()]
+            categories = lines.groupby(lines['item_id'].astype(str))['category'].first()
+            basket, self.hierarchy = ItemHierarchy.extend(basket, categories)
+        return basket, basket_ids
+
+    def _segment_rows(self, positions: np.ndarray, line_rows: np.ndarray) -> np.ndarray:
+        """Map a segment's line-item positions to basket rows of the shared matrix."""
+        rows = np.unique(line_rows[positions])
+        return rows[rows >= 0]
+
+    def _mine_segment(self, context: Context, basket: BasketMatrix) -> RuleSet:
+        """Mine one context segment into a columnar RuleSet."""
+        rules = RuleSet.empty()
+        if self.hierarchy is not None:
+            engine = MultiLevelMiner(self.hierarchy)
+        elif self.itemset_mode != "all":
+            engine = ClosedItemsetMiner(self.itemset_mode)
+            self.logger.info(f"Context {context}: mining {self.itemset_mode} itemsets")
+        else:
+            engine = self._engine_for(context, basket)
+        try:
+            # Mine frequent itemsets
+            if self.sampling is not None and self.itemset_mode == "all" and self.hierarchy is None:
+                itemsets = self._mine_sampled(context, basket)
+            else:
+                itemsets = engine.mine_matrix(basket, min_support=self.min_support, max_len=self.max_len)
+
+            if itemsets.empty:
+                self.logger.debug(f"No frequent itemsets found for context {context}")
+                return rules
+
+            # Generate association rules
+            rules_df = engine.generate_rules(itemsets, min_confidence=self.min_confidence,
+                                             min_lift=self.min_lift,
+                                             max_consequent_size=self.max_consequent_size)
+
+            if rules_df.empty:
+                self.logger.debug(f"No association rules found for context {context}")
+                return rules
+
+            rules = self._to_contextual_rules(context, rules_df)
+            self.logger.debug(f"Found {len(rules_df)} rules for context {context}")
+
+        except Exception as e:
+            self.logger.warning(f"Error mining context {context}: {e}")
+
+        return rules
+
+    def _mine_sampled(self, context: Context, basket: BasketMatrix) -> pd.DataFrame:
+        """Mine one segment from a verified sample and record its error bounds."""
+        sampler = SampledMiner(self.min_support, max_len=self.max_len,
+                               selector=self.selector, config=self.sampling)
+        itemsets, report = sampler.mine(basket)
+        self.sampling_reports[context] = report
+        if report.sampled:
+            self.logger.info(
+                f"Context {context}: sampled {report.sample_size}/{report.n_baskets} baskets "
+                f"(epsilon={report.epsilon:.4f}, delta={report.delta}, "
+                f"{report.border_frequent}/{report.border_size} border itemsets frequent, "
+                f"complete={report.complete})"
+            )
+        return itemsets
+
+    def _to_contextual_rules(self, context: Context, rules_df: pd.DataFrame) -> RuleSet:
+        """Convert a rules DataFrame to a columnar RuleSet for one context."""
+        if self.min_lift > 0 and not rules_df.empty:
+            # Filter on the frame so dropped rules are never converted
+            rules_df = rules_df[rules_df['lift'].to_numpy() >= self.min_lift]
+        return RuleSet.from_frame(context, rules_df)
+
+    def _engine_for(self, context: Context, basket: BasketMatrix):
+        """Pick the cheapest configured mining engine for a segment."""
+        choice = self.selector.select(basket, self.min_support, self.max_len)
+        self.logger.info(f"Context {context}: using {choice.name} ({choice.reason})")
+        return choice.engine
+
     def _df_to_transactions(self, df: pd.DataFrame) -> List[List[str]]:
         """
         Convert DataFrame segment to list of transactions.
@@ -114,4 +600,4 @@ class ContextAwareMiner:
     def get_context_stats(self, transactions: pd.DataFrame) -> pd.DataFrame:
         """Get statistics about context segments."""
         segments = self.segmenter.segment(transactions)
-        return self.segmenter.get_segment_stats(segments)
+        return self.segmenter.get_segment_stats(segments, transactions)
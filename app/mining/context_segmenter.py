@@ -5,13 +5,29 @@ Segments transactions by context dimensions with auto-backoff for sparse data.
 India-aware: Supports festival periods as a first-class context.
 """
 
+import numpy as np
 import pandas as pd
-from typing import Dict, List
-from collections import defaultdict
+from typing import Dict, Iterator, Optional, Sequence, Tuple
 
 from .context_types import Context
 
 
+# Context column -> (Context field, value cast)
+DIMENSIONS = {
+    'store_id': ('store_id', str),
+    'context_time_bin': ('time_bin', str),
+    'context_weekday_weekend': ('weekday_weekend', str),
+    'context_quarter': ('quarter', int),
+    'context_festival': ('festival_period', str),
+}
+
+# Enumeration order of the context lattice
+CONTEXT_DIMENSIONS = ['store_id', 'context_time_bin', 'context_weekday_weekend',
+                      'context_quarter', 'context_festival']
+
+MAX_CONTEXT_DEPTH = len(CONTEXT_DIMENSIONS)
+
+
 class ContextSegmenter:
     """Segments transactions by different context dimensions."""
 
@@ -21,150 +37,133 @@ class ContextSegmenter:
 
         Args:
             min_rows: Minimum rows per segment, auto-backoff to broader context if below
+                (0 keeps every segment, festival ones included)
         """
         self.min_rows = min_rows
 
-    def segment(self, transactions: pd.DataFrame, max_depth: int = 2) -> Dict[Context, pd.DataFrame]:
+    def segment(self, transactions: pd.DataFrame, max_depth: int = 2,
+                dimensions: Optional[Sequence[str]] = None) -> Dict[Context, np.ndarray]:
         """
         Segment transactions by context dimensions with auto-backoff.
 
+        Segments are row-position arrays into the shared transactions frame
+        rather than filtered copies.
+
         Args:
             transactions: DataFrame with transaction data including context columns
-            max_depth: Maximum depth of context combinations (0=Overall, 1=Single, 2=Double)
+            max_depth: Number of context dimensions combined (0=Overall, 1=Single, 2=Double, ...)
+            dimensions: Context columns to combine (defaults to every known dimension)
 
         Returns:
-            Dictionary mapping Context objects to filtered DataFrames
+            Dictionary mapping Context objects to ascending row positions in transactions
+        """
+        return dict(self.iter_segments(transactions, max_depth=max_depth, dimensions=dimensions))
+
+    def iter_segments(self, transactions: pd.DataFrame, max_depth: int = 2,
+                      dimensions: Optional[Sequence[str]] = None) -> Iterator[Tuple[Context, np.ndarray]]:
+        """
+        Lazily walk the context lattice breadth-first.
+
+        Each child refines its parent by one more dimension (taken in
+        CONTEXT_DIMENSIONS order, so every combination is visited once) and is
+        grouped within the parent's rows only. A segment's rows bound all of
+        its descendants', so parents too small for any descendant threshold
+        are never expanded.
+
+        Args:
+            transactions: DataFrame with transaction data including context columns
+            max_depth: Number of context dimensions combined
+            dimensions: Context columns to combine (defaults to every known dimension)
+
+        Yields:
+            (Context, ascending row positions) for every segment above its row threshold
         """
-        segments = {}
+        columns = [c for c in (dimensions or CONTEXT_DIMENSIONS) if c in transactions.columns]
+        codes: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
 
         # Level 0: Overall (always included)
-        segments[Context()] = transactions
-
-        if max_depth >= 1:
-            # Level 1: Single dimensions
-            self._add_single_dimension_segments(transactions, segments)
-
-        if max_depth >= 2:
-            # Level 2: Two-dimension combinations
-            self._add_two_dimension_segments(transactions, segments)
-
-        return segments
-
-    def _add_single_dimension_segments(self, transactions: pd.DataFrame,
-                                     segments: Dict[Context, pd.DataFrame]):
-        """Add segments for single context dimensions."""
-
-        # Store segments
-        if 'store_id' in transactions.columns:
-            for store in transactions['store_id'].unique():
-                if pd.notna(store):
-                    ctx = Context(store_id=str(store))
-                    df = transactions[transactions['store_id'] == store]
-                    if len(df) >= self.min_rows:
-                        segments[ctx] = df
-
-        # Time bin segments
-        if 'context_time_bin' in transactions.columns:
-            for time_bin in transactions['context_time_bin'].unique():
-                if pd.notna(time_bin):
-                    ctx = Context(time_bin=str(time_bin))
-                    df = transactions[transactions['context_time_bin'] == time_bin]
-                    if len(df) >= self.min_rows:
-                        segments[ctx] = df
-
-        # Weekday/Weekend segments
-        if 'context_weekday_weekend' in transactions.columns:
-            for weekday_type in transactions['context_weekday_weekend'].unique():
-                if pd.notna(weekday_type):
-                    ctx = Context(weekday_weekend=str(weekday_type))
-                    df = transactions[transactions['context_weekday_weekend'] == weekday_type]
-                    if len(df) >= self.min_rows:
-                        segments[ctx] = df
-
-        # Quarter segments
-        if 'context_quarter' in transactions.columns:
-            for quarter in transactions['context_quarter'].unique():
-                if pd.notna(quarter):
-                    ctx = Context(quarter=int(quarter))
-                    df = transactions[transactions['context_quarter'] == quarter]
-                    if len(df) >= self.min_rows:
-                        segments[ctx] = df
-
-        # Festival segments (India-specific, HIGH PRIORITY)
-        if 'context_festival' in transactions.columns:
-            for festival in transactions['context_festival'].unique():
-                if pd.notna(festival) and festival:  # Non-empty festival
-                    ctx = Context(festival_period=str(festival))
-                    df = transactions[transactions['context_festival'] == festival]
-                    # Lower threshold for festivals (they're important but short)
-                    if len(df) >= max(self.min_rows // 2, 20):
-                        segments[ctx] = df
-
-    def _add_two_dimension_segments(self, transactions: pd.DataFrame,
-                                  segments: Dict[Context, pd.DataFrame]):
-        """Add segments for two-dimension combinations."""
-
-        # Store × Time (key combination)
-        if 'store_id' in transactions.columns and 'context_time_bin' in transactions.columns:
-            for store in transactions['store_id'].unique():
-                if pd.notna(store):
-                    for time_bin in transactions['context_time_bin'].unique():
-                        if pd.notna(time_bin):
-                            ctx = Context(store_id=str(store), time_bin=str(time_bin))
-                            df = transactions[
-                                (transactions['store_id'] == store) &
-                                (transactions['context_time_bin'] == time_bin)
-                            ]
-                            if len(df) >= self.min_rows:
-                                segments[ctx] = df
-
-        # Weekday/Weekend × Time
-        if 'context_weekday_weekend' in transactions.columns and 'context_time_bin' in transactions.columns:
-            for weekday_type in transactions['context_weekday_weekend'].unique():
-                if pd.notna(weekday_type):
-                    for time_bin in transactions['context_time_bin'].unique():
-                        if pd.notna(time_bin):
-                            ctx = Context(weekday_weekend=str(weekday_type), time_bin=str(time_bin))
-                            df = transactions[
-                                (transactions['context_weekday_weekend'] == weekday_type) &
-                                (transactions['context_time_bin'] == time_bin)
-                            ]
-                            if len(df) >= self.min_rows:
-                                segments[ctx] = df
-
-        # Festival × Time (India-specific: e.g., "Diwali Morning")
-        if 'context_festival' in transactions.columns and 'context_time_bin' in transactions.columns:
-            for festival in transactions['context_festival'].unique():
-                if pd.notna(festival) and festival:
-                    for time_bin in transactions['context_time_bin'].unique():
-                        if pd.notna(time_bin):
-                            ctx = Context(festival_period=str(festival), time_bin=str(time_bin))
-                            df = transactions[
-                                (transactions['context_festival'] == festival) &
-                                (transactions['context_time_bin'] == time_bin)
-                            ]
-                            # Lower threshold for festival combinations
-                            if len(df) >= max(self.min_rows // 3, 15):
-                                segments[ctx] = df
-
-        # Store × Quarter
-        if 'store_id' in transactions.columns and 'context_quarter' in transactions.columns:
-            for store in transactions['store_id'].unique():
-                if pd.notna(store):
-                    for quarter in transactions['context_quarter'].unique():
-                        if pd.notna(quarter):
-                            ctx = Context(store_id=str(store), quarter=int(quarter))
-                            df = transactions[
-                                (transactions['store_id'] == store) &
-                                (transactions['context_quarter'] == quarter)
-                            ]
-                            if len(df) >= self.min_rows:
-                                segments[ctx] = df
-
-    def get_segment_stats(self, segments: Dict[Context, pd.DataFrame]) -> pd.DataFrame:
+        root = ((), {}, np.arange(len(transactions)))
+        yield Context(), root[2]
+
+        frontier = [root]
+        for depth in range(1, max_depth + 1):
+            children = []
+            for node_columns, fields, positions in frontier:
+                first = columns.index(node_columns[-1]) + 1 if node_columns else 0
+                for index in range(first, len(columns)):
+                    column = columns[index]
+                    field, cast = DIMENSIONS[column]
+                    child_columns = node_columns + (column,)
+                    threshold = self._min_rows_for(child_columns)
+                    addable = columns[index + 1:] if depth < max_depth else []
+                    floor = min([self._min_rows_for(child_columns + (c,)) for c in addable], default=None)
+
+                    for value, child_positions in self._split(positions, self._codes(transactions, column, codes)):
+                        child_fields = {**fields, field: cast(value)}
+                        if len(child_positions) >= threshold:
+                            yield Context(**child_fields), child_positions
+                        if floor is not None and len(child_positions) >= floor:
+                            children.append((child_columns, child_fields, child_positions))
+            frontier = children
+            if not frontier:
+                break
+
+    def take(self, transactions: pd.DataFrame, positions: np.ndarray) -> pd.DataFrame:
+        """Materialize one segment's rows from the shared frame."""
+        return transactions.iloc[positions]
+
+    def min_rows_for_context(self, context: Context) -> int:
+        """Row threshold a context's segment must reach."""
+        fields = context.to_dict()
+        return self._min_rows_for([column for column, (field, _) in DIMENSIONS.items()
+                                   if fields.get(field) is not None])
+
+    def _min_rows_for(self, columns: Sequence[str]) -> int:
+        """Row threshold for a dimension combination."""
+        if self.min_rows <= 0:
+            return 0
+        if 'context_festival' in columns:
+            # Lower threshold for festivals (they're important but short)
+            if len(columns) == 1:
+                return max(self.min_rows // 2, 20)
+            return max(self.min_rows // 3, 15)
+        return self.min_rows
+
+    def _codes(self, transactions: pd.DataFrame, column: str,
+               cache: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Factorize a context column once (first-appearance order, missing = -1)."""
+        if column not in cache:
+            codes, uniques = pd.factorize(transactions[column], use_na_sentinel=True)
+            uniques = np.asarray(uniques, dtype=object)
+            if column == 'context_festival':
+                # Empty festival means "no festival"
+                empty = np.flatnonzero([not value for value in uniques])
+                codes = np.where(np.isin(codes, empty), -1, codes)
+            cache[column] = (codes, uniques)
+        return cache[column]
+
+    def _split(self, positions: np.ndarray,
+               factorized: Tuple[np.ndarray, np.ndarray]) -> Iterator[Tuple[object, np.ndarray]]:
+        """Group row positions by one column's codes with a single stable sort."""
+        codes, uniques = factorized
+        segment_codes = codes[positions]
+        order = np.argsort(segment_codes, kind='stable')
+        sorted_codes = segment_codes[order]
+        boundaries = np.flatnonzero(np.diff(sorted_codes)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(sorted_codes)]))
+        for start, end in zip(starts, ends):
+            code = sorted_codes[start] if end > start else -1
+            if code < 0:
+                continue
+            yield uniques[code], positions[order[start:end]]
+
+    def get_segment_stats(self, segments: Dict[Context, np.ndarray],
+                          transactions: pd.DataFrame) -> pd.DataFrame:
         """Get statistics about created segments."""
         stats_data = []
-        for context, df in segments.items():
+        for context, positions in segments.items():
+            df = self.take(transactions, positions)
             stats_data.append({
                 'context': str(context),
                 'transaction_count': len(df),
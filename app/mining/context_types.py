@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Optional, Set, Dict, Any
+from dataclasses import dataclass, fields, replace
+from typing import Optional, Set, Dict, Any, List
 
 
 @dataclass(frozen=True)
@@ -33,6 +33,10 @@ class Context:
 
         return " + ".join(parts) if parts else "Overall"
 
+    def parents(self) -> List["Context"]:
+        """Contexts one level up the lattice (this context with one dimension dropped)."""
+        return [replace(self, **{f.name: None}) for f in fields(self) if getattr(self, f.name) is not None]
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for API responses."""
         return {
@@ -0,0 +1,129 @@
+"""
+Contrast (emerging pattern) mining across the context lattice.
+
+An itemset is emerging in a context when its support there is a multiple of
+its support in the broader contexts the segment refines (its lattice
+parents: Diwali → Overall, weekend evenings → weekend and evening). Every
+context's counts come from one shared MultiContextCounter pass, which counts
+an itemset in all contexts as soon as it is frequent in any, so parent
+supports are exact even where the itemset is rare. No per-segment mining or
+rule generation is needed.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .basket_matrix import BasketMatrix
+from .context_types import Context
+from .multi_context import MultiContextCounter
+
+
+@dataclass
+class ContrastPattern:
+    """Itemset whose support grows from a parent context to a child context."""
+    itemset: frozenset
+    context: Context
+    parent: Context          # Parent with the smallest growth (the strongest baseline)
+    support: float
+    parent_support: float
+    growth_rate: float       # support / parent_support
+    lift: float              # support / product of item supports, within the context
+    parent_lift: float
+    lift_delta: float        # lift - parent_lift
+
+
+class ContrastMiner:
+    """Finds itemsets that spike in a context relative to its lattice parents."""
+
+    def __init__(self, min_support: float = 0.01, min_growth: float = 2.0,
+                 max_len: Optional[int] = 3, min_len: int = 2):
+        """
+        Initialize contrast miner.
+
+        Args:
+            min_support: Minimum support of a pattern within its own context
+            min_growth: Minimum support ratio against every parent context
+            max_len: Maximum itemset length (None for unlimited)
+            min_len: Minimum itemset length (2 reports combinations only)
+        """
+        self.min_support = min_support
+        self.min_growth = min_growth
+        self.max_len = max_len
+        self.min_len = min_len
+        self.logger = logging.getLogger(__name__)
+
+    def mine(self, basket: BasketMatrix, tasks: Sequence[Tuple[Context, np.ndarray]]) -> List[ContrastPattern]:
+        """
+        Mine emerging patterns of every context against its parents.
+
+        Contexts whose parents are not among the tasks (e.g. a parent below its
+        row threshold) are compared with the parents that are; contexts with no
+        parent at all (Overall) only serve as baselines.
+
+        Args:
+            basket: Shared basket matrix covering every context
+            tasks: (context, basket row positions) per segment
+
+        Returns:
+            Patterns by descending growth rate
+        """
+        if not tasks:
+            return []
+
+        shared = MultiContextCounter(self.min_support, max_len=self.max_len).count(basket, tasks)
+        sizes = np.asarray(shared.context_sizes, dtype=np.float64)
+        position_of = {context: k for k, (context, _) in enumerate(tasks)}
+        parents = {
+            k: [position_of[parent] for parent in context.parents() if parent in position_of]
+            for k, (context, _) in enumerate(tasks)
+        }
+
+        # Single-item supports per context, for itemset lift
+        singles, single_counts, _ = shared.levels[0]
+        single_position = {itemset[0]: j for j, itemset in enumerate(singles)}
+        single_support = single_counts / sizes[:, None]
+
+        patterns: List[ContrastPattern] = []
+        for size, (itemsets, counts, frequent) in enumerate(shared.levels, start=1):
+            if size < self.min_len:
+                continue
+            items = np.array([[single_position[c] for c in itemset] for itemset in itemsets], dtype=np.int64)
+            supports = counts / sizes[:, None]
+            # Independence baseline per context: product of the item supports
+            expected = np.prod(single_support[:, items], axis=2)
+            # An item absent from a context leaves the itemset at zero support and zero lift there
+            lifts = np.divide(supports, expected, out=np.zeros_like(supports), where=expected > 0)
+
+            for k, (context, _) in enumerate(tasks):
+                if not parents[k]:
+                    continue
+                hits = np.flatnonzero(frequent[k])
+                if not len(hits):
+                    continue
+                parent_ids = np.array(parents[k])
+                # Child baskets are a subset of each parent's, so parent support is positive
+                growth = supports[k, hits][None, :] / supports[parent_ids[:, None], hits[None, :]]
+                weakest = np.argmin(growth, axis=0)
+                min_growth = growth[weakest, np.arange(len(hits))]
+                emerging = np.flatnonzero(min_growth >= self.min_growth)
+
+                for e in emerging:
+                    j, p = hits[e], parent_ids[weakest[e]]
+                    patterns.append(ContrastPattern(
+                        itemset=frozenset(shared.labels[list(itemsets[j])]),
+                        context=context,
+                        parent=tasks[p][0],
+                        support=float(supports[k, j]),
+                        parent_support=float(supports[p, j]),
+                        growth_rate=float(min_growth[e]),
+                        lift=float(lifts[k, j]),
+                        parent_lift=float(lifts[p, j]),
+                        lift_delta=float(lifts[k, j] - lifts[p, j]),
+                    ))
+
+        patterns.sort(key=lambda pattern: (-pattern.growth_rate, -pattern.support))
+        self.logger.info(f"Found {len(patterns)} emerging patterns across {len(tasks)} contexts")
+        return patterns
@@ -0,0 +1,369 @@
+"""
+Pre-mining cost estimation with time and memory guardrails.
+
+Before a request is mined, every segment's frequent itemsets are predicted
+from two cheap statistics: the item frequency distribution and the
+basket-size histogram. Each item's chance of being in a basket grows with
+the basket's size, and itemsets are assumed independent only *within* a
+basket size, so the long baskets that make dense segments explode are
+accounted for. Predicted counts feed the engine selector's calibrated cost
+model (runtime) and per-itemset / per-rule footprints (memory).
+
+When the prediction is over budget the planner either raises min_support /
+lowers max_len to the least restrictive setting that fits, or rejects the
+request with an explanation.
+
+Baskets can carry weights (their margin, for high-utility mining): support
+then becomes each basket's weighted share, which is what a transaction-
+weighted utility threshold prunes on, so the same prediction bounds the
+utility lists HUI-Miner may build.
+"""
+
+import logging
+from dataclasses import dataclass
+from math import comb
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .basket_matrix import BasketMatrix, min_support_count
+from .context_types import Context
+from .engine_selector import EngineSelector, SegmentProfile
+
+
+# Peak bytes per frequent itemset while mining (frame row, frozenset, Eclat bitsets)
+ITEMSET_BYTES = 1000
+# Peak bytes per rule candidate (rules frame while generating plus the columnar RuleSet)
+RULE_BYTES = 330
+# Basket sizes are grouped into this many bins for the prediction
+SIZE_BINS = 16
+# Support thresholds tried when adjusting, as multiples of the requested one
+SUPPORT_STEP = 1.5
+# Smallest max_len the planner will fall back to
+MIN_MAX_LEN = 2
+
+ON_EXCEED_MODES = ('adjust', 'reject')
+
+# (CSR matrix, item counts, basket weights) of one segment
+Segment = Tuple[sparse.csr_matrix, np.ndarray, np.ndarray]
+
+
+@dataclass
+class MiningBudget:
+    """Limits a mining request must fit into."""
+    time_budget_ms: float = 30000.0
+    memory_budget_mb: float = 1024.0
+    on_exceed: str = "adjust"   # "adjust" min_support / max_len, or "reject" the request
+
+
+@dataclass
+class CostEstimate:
+    """Predicted size and cost of mining every segment of a request."""
+    min_support: float
+    max_len: Optional[int]
+    segments: int
+    itemsets: float           # Predicted frequent itemsets across segments
+    rules: float              # Rule candidates those itemsets allow (before confidence)
+    seconds: float
+    memory_mb: float
+    truncated: bool           # Prediction stopped at its itemset cap; true counts are larger
+    threshold: str = "min_support"  # Name of the threshold min_support stands for
+
+    def fits(self, budget: MiningBudget) -> bool:
+        """Whether this estimate is within a budget."""
+        return (not self.truncated and self.seconds * 1000.0 <= budget.time_budget_ms
+                and self.memory_mb <= budget.memory_budget_mb)
+
+    def describe(self) -> str:
+        """Short human-readable summary."""
+        prefix = "over " if self.truncated else "~"
+        return (f"{prefix}{self.itemsets:,.0f} itemsets / {self.rules:,.0f} rule candidates "
+                f"(~{self.seconds:.1f}s, ~{self.memory_mb:,.0f}MB) at {self.threshold} {self.min_support:g}, "
+                f"max_len {self.max_len}")
+
+
+@dataclass
+class MiningPlan:
+    """Parameters a request will actually be mined with."""
+    min_support: float
+    max_len: Optional[int]
+    requested: CostEstimate
+    estimate: CostEstimate
+    adjusted: bool
+    reason: str
+
+
+class MiningBudgetExceeded(ValueError):
+    """Raised when a request cannot be mined within its budget and may not be adjusted."""
+
+    def __init__(self, message: str, estimate: CostEstimate, suggestion: Optional[CostEstimate] = None):
+        super().__init__(message)
+        self.estimate = estimate
+        self.suggestion = suggestion
+
+
+class CostEstimator:
+    """Predicts mining cost per request and plans parameters that fit a budget."""
+
+    def __init__(self, budget: Optional[MiningBudget] = None, selector: Optional[EngineSelector] = None,
+                 max_consequent_size: Optional[int] = None, itemset_limit: int = 200_000,
+                 threshold: str = "min_support"):
+        """
+        Initialize cost estimator.
+
+        Args:
+            budget: Time / memory limits and what to do when they are exceeded
+            selector: Engine selector whose calibrated cost model prices the itemsets
+            max_consequent_size: Largest rule consequent (bounds the rule count; 0 for no rules)
+            itemset_limit: Per-segment cap on predicted itemsets; predictions stop there
+            threshold: Name of the planned threshold in estimates and messages
+        """
+        self.budget = budget or MiningBudget()
+        if self.budget.on_exceed not in ON_EXCEED_MODES:
+            raise ValueError(f"Unknown budget action: {self.budget.on_exceed}")
+        self.selector = selector or EngineSelector()
+        self.max_consequent_size = max_consequent_size
+        self.itemset_limit = itemset_limit
+        self.threshold = threshold
+        self.logger = logging.getLogger(__name__)
+
+    def predict_itemsets(self, basket: BasketMatrix, min_support: float,
+                         max_len: Optional[int] = None) -> Tuple[List[int], bool]:
+        """
+        Predict the number of frequent itemsets of each length in one segment.
+
+        Args:
+            basket: Segment basket matrix
+            min_support: Minimum support threshold (0.0 to 1.0)
+            max_len: Maximum itemset length (None for unlimited)
+
+        Returns:
+            Tuple of (predicted count per length starting at 1, whether the
+            prediction was cut off at itemset_limit)
+        """
+        levels, truncated, _ = self._predict(self._segment(basket), min_support, max_len)
+        return levels, truncated
+
+    @staticmethod
+    def _segment(basket: BasketMatrix, weights: Optional[np.ndarray] = None) -> Segment:
+        """
+        A segment's CSR matrix, item counts and basket weights, computed once per plan.
+
+        Weights are rescaled to average one, so item counts stay on the basket
+        scale (a count of n means every basket's weight).
+        """
+        matrix = basket.matrix.tocsr()
+        n = matrix.shape[0]
+        if weights is None:
+            scaled = np.ones(n)
+        else:
+            total = float(np.sum(weights))
+            scaled = np.asarray(weights, dtype=np.float64) * (n / total) if total > 0 else np.zeros(n)
+        return matrix, np.asarray(matrix.T @ scaled, dtype=np.float64).ravel(), scaled
+
+    def _predict(self, segment: Segment, min_support: float,
+                 max_len: Optional[int]) -> Tuple[List[int], bool, np.ndarray]:
+        """Predicted itemsets per length, truncation flag and basket lengths over frequent items."""
+        matrix, counts, basket_weights = segment
+        n = matrix.shape[0]
+        if n == 0:
+            return [], False, np.zeros(0)
+        frequent = counts >= min_support_count(min_support, n)
+        lengths = matrix @ frequent.astype(np.float64)
+        if not frequent.any():
+            return [], False, lengths
+        item_counts = counts[frequent]
+        k = len(item_counts)
+
+        # Basket-size histogram over frequent items, in quantile bins
+        present = lengths[lengths > 0]
+        present_weights = basket_weights[lengths > 0]
+        edges = np.unique(np.quantile(present, np.linspace(0, 1, SIZE_BINS + 1)))
+        n_bins = max(len(edges) - 1, 1)
+        bins = np.clip(np.searchsorted(edges, present, side='right') - 1, 0, n_bins - 1)
+        baskets_per_bin = np.bincount(bins, weights=present_weights, minlength=n_bins)
+        weights = baskets_per_bin / n
+        sizes = (np.bincount(bins, weights=present * present_weights, minlength=n_bins)
+                 / np.where(baskets_per_bin > 0, baskets_per_bin, 1))
+
+        # Inclusion probability per item and basket size, proportional to size
+        # and rescaled so each item's marginal matches its observed support
+        share = item_counts / item_counts.sum()
+        inclusion = np.minimum(1.0, np.outer(share, sizes))
+        inclusion = np.minimum(1.0, inclusion * (item_counts / n / (inclusion @ weights))[:, None])
+
+        # Level-wise over item-ordered prefixes: rows sorted by their last item,
+        # so the prefixes an item can extend form a leading slice
+        levels = [k]
+        last = np.arange(k)
+        prob = inclusion
+        threshold = min_support - 1e-12
+        while (max_len is None or len(levels) < max_len) and len(last) > 1:
+            starts = np.searchsorted(last, np.arange(k), side='left')
+            next_last, next_prob = [], []
+            total = 0
+            for item in range(1, k):
+                extended = prob[:starts[item]] * inclusion[item]
+                keep = extended @ weights >= threshold
+                kept = int(keep.sum())
+                if kept:
+                    next_last.append(np.full(kept, item))
+                    next_prob.append(extended[keep])
+                    total += kept
+                    if sum(levels) + total > self.itemset_limit:
+                        return levels + [total], True, lengths
+            if not total:
+                break
+            levels.append(total)
+            last, prob = np.concatenate(next_last), np.concatenate(next_prob)
+        return levels, False, lengths
+
+    def estimate(self, basket: BasketMatrix, tasks: Sequence[Tuple[Context, np.ndarray]],
+                 min_support: float, max_len: Optional[int] = None,
+                 weights: Optional[np.ndarray] = None) -> CostEstimate:
+        """
+        Predict itemsets, rules, runtime and memory for mining every segment.
+
+        Args:
+            basket: Shared basket matrix
+            tasks: (context, basket rows) per segment
+            min_support: Minimum support threshold (0.0 to 1.0)
+            max_len: Maximum itemset length (None for unlimited)
+            weights: Weight per basket row (None weighs baskets equally)
+
+        Returns:
+            CostEstimate summed over segments (memory is the largest segment's peak
+            plus every segment's rules, which are all kept)
+        """
+        return self._estimate(self._segments(basket, tasks, weights), min_support, max_len)
+
+    def _segments(self, basket: BasketMatrix, tasks: Sequence[Tuple[Context, np.ndarray]],
+                  weights: Optional[np.ndarray] = None) -> List[Segment]:
+        segments = []
+        for _, rows in tasks:
+            whole = len(rows) == basket.n_baskets
+            segment_weights = None if weights is None else (weights if whole else weights[rows])
+            segments.append(self._segment(basket if whole else basket.take(rows), segment_weights))
+        return segments
+
+    def _estimate(self, segments, min_support: float, max_len: Optional[int]) -> CostEstimate:
+        itemsets = rules = seconds = 0.0
+        peak_bytes = kept_bytes = 0.0
+        truncated = False
+        for segment in segments:
+            levels, cut, lengths = self._predict(segment, min_support, max_len)
+            truncated = truncated or cut
+            segment_itemsets = float(sum(levels))
+            segment_rules = float(sum(
+                count * sum(comb(size, c) for c in range(1, self._max_consequent(size) + 1))
+                for size, count in enumerate(levels, start=1)
+            ))
+            seconds += self._seconds(segment, lengths, min_support, max_len, segment_itemsets)
+            itemsets += segment_itemsets
+            rules += segment_rules
+            peak_bytes = max(peak_bytes, segment_itemsets * ITEMSET_BYTES + segment_rules * RULE_BYTES)
+            kept_bytes += segment_rules * RULE_BYTES
+
+        return CostEstimate(min_support=min_support, max_len=max_len, segments=len(segments),
+                            itemsets=itemsets, rules=rules, seconds=seconds,
+                            memory_mb=(peak_bytes + kept_bytes) / 2 ** 20, truncated=truncated,
+                            threshold=self.threshold)
+
+    def _seconds(self, segment, lengths: np.ndarray, min_support: float, max_len: Optional[int],
+                 itemsets: float) -> float:
+        """Cheapest eligible engine's calibrated runtime for the predicted itemsets."""
+        matrix, counts, _ = segment
+        n, n_items = matrix.shape
+        k = int((counts >= min_support_count(min_support, n)).sum()) if n else 0
+        line_items = float(lengths.sum())
+        profile = SegmentProfile(
+            n_baskets=n, n_items=n_items, frequent_items=k, line_items=int(line_items),
+            density=line_items / (n * k) if n and k else 0.0, min_support=min_support, max_len=max_len,
+            estimated_itemsets=itemsets, pair_products=float((lengths * (lengths - 1) / 2).sum()),
+        )
+        return min(self.selector.estimate(name, profile) for name in self.selector.eligible(profile))
+
+    def _max_consequent(self, size: int) -> int:
+        if self.max_consequent_size is None:
+            return size - 1
+        return min(size - 1, self.max_consequent_size)
+
+    def plan(self, basket: BasketMatrix, tasks: Sequence[Tuple[Context, np.ndarray]],
+             min_support: float, max_len: Optional[int] = None,
+             weights: Optional[np.ndarray] = None) -> MiningPlan:
+        """
+        Check a request against the budget and pick the parameters to mine with.
+
+        Cost falls as min_support rises or max_len falls, so the planner finds
+        the lowest support at which the cheapest setting (max_len 2) fits, then
+        the longest max_len that still fits at that support.
+
+        Args:
+            basket: Shared basket matrix
+            tasks: (context, basket rows) per segment
+            min_support: Requested minimum support threshold
+            max_len: Requested maximum itemset length (None for unlimited)
+            weights: Weight per basket row (None weighs baskets equally)
+
+        Returns:
+            MiningPlan with the (possibly adjusted) min_support and max_len
+
+        Raises:
+            MiningBudgetExceeded: The request is over budget and the budget says
+                reject, or no setting fits
+        """
+        segments = self._segments(basket, tasks, weights)
+        requested = self._estimate(segments, min_support, max_len)
+        if requested.fits(self.budget):
+            return MiningPlan(min_support, max_len, requested, requested, False, "within budget")
+
+        suggestion = self._cheapest_fit(segments, basket.n_baskets, min_support, max_len)
+        limits = f"{self.budget.time_budget_ms / 1000:g}s / {self.budget.memory_budget_mb:g}MB"
+        if suggestion is None:
+            raise MiningBudgetExceeded(
+                f"Mining would need {requested.describe()}, over the budget of {limits}, "
+                f"and no min_support / max_len setting fits", requested)
+        if self.budget.on_exceed == "reject":
+            raise MiningBudgetExceeded(
+                f"Mining would need {requested.describe()}, over the budget of {limits}. "
+                f"Try {self.threshold} >= {suggestion.min_support:g}"
+                + (f" with max_len <= {suggestion.max_len}" if suggestion.max_len != max_len else ""),
+                requested, suggestion)
+
+        reason = (f"requested {requested.describe()} is over the budget of {limits}; "
+                  f"mining with {suggestion.describe()} instead")
+        self.logger.warning(f"Adjusting mining parameters: {reason}")
+        return MiningPlan(suggestion.min_support, suggestion.max_len, requested, suggestion, True, reason)
+
+    def _cheapest_fit(self, segments, n_baskets: int, min_support: float,
+                      max_len: Optional[int]) -> Optional[CostEstimate]:
+        """Least restrictive (min_support, max_len) within budget, or None."""
+        ladder = [min_support]
+        while ladder[-1] < 1.0:
+            # A zero threshold still climbs: one basket is the smallest meaningful step
+            ladder.append(min(max(ladder[-1] * SUPPORT_STEP, 1.0 / max(n_baskets, 1)), 1.0))
+        lengths = [max_len] + [length for length in range(4, MIN_MAX_LEN - 1, -1)
+                               if max_len is None or length < max_len]
+        floor = lengths[-1]
+
+        def fits(support: float, length: Optional[int]) -> Optional[CostEstimate]:
+            estimate = self._estimate(segments, support, length)
+            return estimate if estimate.fits(self.budget) else None
+
+        # Lowest support on the ladder where even the shortest max_len fits
+        low, high = 0, len(ladder) - 1
+        if fits(ladder[high], floor) is None:
+            return None
+        while low < high:
+            middle = (low + high) // 2
+            if fits(ladder[middle], floor) is not None:
+                high = middle
+            else:
+                low = middle + 1
+        support = ladder[low]
+        for length in lengths:
+            estimate = fits(support, length)
+            if estimate is not None:
+                return estimate
+        return None
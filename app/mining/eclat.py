@@ -1,10 +1,32 @@
 import pandas as pd
-from typing import List, Dict, Set, Tuple
+import numpy as np
+from typing import List, Dict, Set, Tuple, Optional, Union
 from collections import defaultdict
 
+from .basket_matrix import BasketMatrix, min_support_count
+from .rule_generator import RuleGenerator
+
 
 class EclatMiner:
-    """Eclat implementation using vertical database format (tid-lists)."""
+    """
+    Eclat implementation using a vertical database of packed bitsets.
+
+    Each item's tid-list is a Python int used as a bitset (bit t set when
+    basket t holds the item), so intersections are single big-int ANDs and
+    supports are popcounts. Dense equivalence classes switch to diffsets
+    (dEclat), which store the baskets a child *loses* relative to its prefix.
+    """
+
+    def __init__(self, use_diffsets: Union[bool, str] = "auto", dense_threshold: float = 0.5):
+        """
+        Initialize Eclat miner.
+
+        Args:
+            use_diffsets: True/False to force diffsets on/off, "auto" to switch per class
+            dense_threshold: Average child/prefix support ratio above which "auto" uses diffsets
+        """
+        self.use_diffsets = use_diffsets
+        self.dense_threshold = dense_threshold
 
     def mine(self, transactions: List[List[str]], min_support: float) -> pd.DataFrame:
         """
@@ -17,102 +39,66 @@ class EclatMiner:
         Returns:
             DataFrame with frequent itemsets and their support values
         """
-        # Convert to vertical database: {item: {tid1, tid2, ...}}
-        vertical_db = self._to_vertical_format(transactions)
-        total_transactions = len(transactions)
-
-        # Calculate minimum support count
-        min_support_count = int(min_support * total_transactions)
-
-        # Find frequent single items
-        frequent_items = {
-            item: tid_set for item, tid_set in vertical_db.items()
-            if len(tid_set) >= min_support_count
-        }
-
-        # Mine frequent itemsets using Eclat
-        frequent_itemsets = self._eclat(frequent_items, min_support_count)
-
-        # Convert to DataFrame format consistent with FP-Growth
-        itemsets_data = []
-        for itemset, support_count in frequent_itemsets.items():
-            if isinstance(itemset, tuple):
-                itemsets_data.append({
-                    'support': support_count / total_transactions,
-                    'itemsets': frozenset(itemset)
-                })
-            else:
-                itemsets_data.append({
-                    'support': support_count / total_transactions,
-                    'itemsets': frozenset([itemset])
-                })
-
-        if not itemsets_data:
-            return pd.DataFrame(columns=['support', 'itemsets'])
-
-        result_df = pd.DataFrame(itemsets_data)
-        result_df = result_df.sort_values('support', ascending=False).reset_index(drop=True)
-
-        return result_df
+        return self.mine_matrix(BasketMatrix.from_transactions(transactions), min_support)
 
-    def generate_rules(self, itemsets: pd.DataFrame, min_confidence: float) -> pd.DataFrame:
+    def mine_matrix(self, basket: BasketMatrix, min_support: float,
+                    max_len: Optional[int] = None) -> pd.DataFrame:
         """
-        Generate association rules from frequent itemsets.
+        Mine frequent itemsets from a sparse basket matrix.
 
         Args:
-            itemsets: DataFrame with frequent itemsets (from mine method)
-            min_confidence: Minimum confidence threshold (0.0 to 1.0)
+            basket: Sparse baskets × items matrix
+            min_support: Minimum support threshold (0.0 to 1.0)
+            max_len: Maximum itemset length (None for unlimited)
 
         Returns:
-            DataFrame with association rules including support, confidence, and lift
+            DataFrame with frequent itemsets and their support values
         """
-        if itemsets.empty:
-            return pd.DataFrame(columns=['antecedents', 'consequents', 'support', 'confidence', 'lift'])
-
-        rules_data = []
+        total_transactions = basket.n_baskets
+        columns = basket.frequent_columns(min_support)
+        if total_transactions == 0 or len(columns) == 0:
+            return pd.DataFrame(columns=['support', 'itemsets'])
 
-        for _, itemset_row in itemsets.iterrows():
-            itemset = itemset_row['itemsets']
-            support = itemset_row['support']
+        min_count = min_support_count(min_support, total_transactions)
+        bitsets = self._to_bitsets(basket, columns)
+        labels = [str(basket.items[c]) for c in columns]
 
-            if isinstance(itemset, frozenset):
-                itemset = set(itemset)
+        # Ascending support order keeps equivalence classes small
+        members = sorted(
+            ((labels[k], bitsets[k], bitsets[k].bit_count()) for k in range(len(columns))),
+            key=lambda m: (m[2], m[0]),
+        )
+        frequent: Dict[Tuple[str, ...], int] = {}
+        self._eclat((), total_transactions, members, min_count, max_len, False, frequent)
 
-            # Only generate rules for itemsets with 2+ items
-            if len(itemset) < 2:
-                continue
+        itemsets_data = [
+            {'support': count / total_transactions, 'itemsets': frozenset(itemset)}
+            for itemset, count in frequent.items()
+        ]
 
-            # Generate all possible non-empty proper subsets as antecedents
-            items_list = list(itemset)
-            for i in range(1, len(items_list)):  # antecedent size from 1 to n-1
-                antecedents_list = self._combinations(items_list, i)
-
-                for antecedent_items in antecedents_list:
-                    antecedent = set(antecedent_items)
-                    consequent = itemset - antecedent
+        result_df = pd.DataFrame(itemsets_data)
+        result_df = result_df.sort_values('support', ascending=False, kind='mergesort').reset_index(drop=True)
 
-                    # For this simplified implementation, use basic confidence calculation
-                    # In a full implementation, we'd need support of individual itemsets
-                    confidence = support  # Approximation
-                    lift = 1.0  # Approximation
+        return result_df
 
-                    rules_data.append({
-                        'antecedents': frozenset(antecedent),
-                        'consequents': frozenset(consequent),
-                        'support': support,
-                        'confidence': confidence,
-                        'lift': lift
-                    })
+    def generate_rules(self, itemsets: pd.DataFrame, min_confidence: float, min_lift: float = 0.0,
+                       max_consequent_size: Optional[int] = None) -> pd.DataFrame:
+        """
+        Generate association rules from frequent itemsets.
 
-        if not rules_data:
-            return pd.DataFrame(columns=['antecedents', 'consequents', 'support', 'confidence', 'lift'])
+        Confidence and lift are exact: every subset of a frequent itemset is
+        itself frequent, so its support is looked up from the mined itemsets.
 
-        rules_df = pd.DataFrame(rules_data)
-        # Filter by confidence
-        rules_df = rules_df[rules_df['confidence'] >= min_confidence]
-        rules_df = rules_df.sort_values('confidence', ascending=False).reset_index(drop=True)
+        Args:
+            itemsets: DataFrame with frequent itemsets (from mine method)
+            min_confidence: Minimum confidence threshold (0.0 to 1.0)
+            min_lift: Minimum lift threshold, pruned during enumeration
+            max_consequent_size: Largest consequent to generate (None for unlimited)
 
-        return rules_df
+        Returns:
+            DataFrame with association rules including support, confidence, and lift
+        """
+        return RuleGenerator(min_confidence, min_lift, max_consequent_size).generate(itemsets)
 
     def _to_vertical_format(self, transactions: List[List[str]]) -> Dict[str, Set[int]]:
         """Convert transactions to vertical format: {item: set of transaction_ids}."""
@@ -124,89 +110,72 @@ class EclatMiner:
 
         return dict(vertical_db)
 
-    def _eclat(self, current_itemsets: Dict[str, Set[int]], min_support_count: int) -> Dict[Tuple[str, ...], int]:
+    def _to_bitsets(self, basket: BasketMatrix, columns: np.ndarray) -> List[int]:
+        """Pack each selected item column into a Python int bitset over basket rows."""
+        csc = basket.matrix[:, columns].tocsc()
+        bitsets = []
+        for k in range(len(columns)):
+            bits = np.zeros(basket.n_baskets, dtype=bool)
+            bits[csc.indices[csc.indptr[k]:csc.indptr[k + 1]]] = True
+            packed = np.packbits(bits, bitorder='little').tobytes()
+            bitsets.append(int.from_bytes(packed, 'little'))
+        return bitsets
+
+    def _eclat(self, prefix: Tuple[str, ...], prefix_count: int,
+               members: List[Tuple[str, int, int]], min_support_count: int,
+               max_len: Optional[int], diff_mode: bool,
+               frequent: Dict[Tuple[str, ...], int]):
         """
-        Recursive Eclat algorithm to find frequent itemsets.
+        Depth-first Eclat over one equivalence class.
 
         Args:
-            current_itemsets: Current level itemsets {item: tid_set}
+            prefix: Items shared by every member of the class
+            prefix_count: Support count of the prefix
+            members: (item, tidset or diffset, support count) extending the prefix
             min_support_count: Minimum support count threshold
-
-        Returns:
-            Dict of frequent itemsets and their support counts
+            max_len: Maximum itemset length (None for unlimited)
+            diff_mode: Whether member sets are diffsets relative to the prefix
+            frequent: Output dict of itemset tuple -> support count
         """
-        frequent_itemsets = {}
+        for i, (item, item_set, count) in enumerate(members):
+            itemset = prefix + (item,)
+            frequent[itemset] = count
+
+            if max_len is not None and len(itemset) >= max_len:
+                continue
 
-        # Add current level itemsets (single items or combinations)
-        for item, tid_set in current_itemsets.items():
-            if len(tid_set) >= min_support_count:
-                if isinstance(item, tuple):
-                    frequent_itemsets[item] = len(tid_set)
+            children = []
+            child_diff_mode = diff_mode
+            if not diff_mode and self._class_is_dense(item_set, count, members[i + 1:]):
+                child_diff_mode = True
+
+            for other, other_set, _ in members[i + 1:]:
+                if diff_mode:
+                    # d(PXY) = d(PY) \ d(PX)
+                    child_set = other_set & ~item_set
+                    child_count = count - child_set.bit_count()
+                elif child_diff_mode:
+                    # First switch to diffsets: d(PXY) = t(PX) \ t(PY)
+                    child_set = item_set & ~other_set
+                    child_count = count - child_set.bit_count()
                 else:
-                    frequent_itemsets[(item,)] = len(tid_set)
-
-        # Generate candidates for next level
-        if len(current_itemsets) > 1:
-            items = list(current_itemsets.keys())
-
-            for i in range(len(items)):
-                for j in range(i + 1, len(items)):
-                    item1, item2 = items[i], items[j]
-
-                    # Intersect tid sets
-                    intersection = current_itemsets[item1] & current_itemsets[item2]
-
-                    if len(intersection) >= min_support_count:
-                        # Create new itemset
-                        if isinstance(item1, tuple) and isinstance(item2, tuple):
-                            # Both are already combinations
-                            new_itemset = tuple(sorted(set(item1) | set(item2)))
-                        elif isinstance(item1, tuple):
-                            new_itemset = tuple(sorted(item1 + (item2,)))
-                        elif isinstance(item2, tuple):
-                            new_itemset = tuple(sorted((item1,) + item2))
-                        else:
-                            new_itemset = tuple(sorted([item1, item2]))
-
-                        # Recurse to next level
-                        sub_itemsets = {new_itemset: intersection}
-                        sub_frequent = self._eclat(sub_itemsets, min_support_count)
-                        frequent_itemsets.update(sub_frequent)
-
-        return frequent_itemsets
-
-    def _combinations(self, items: List[str], r: int) -> List[List[str]]:
-        """Generate combinations of size r from items list."""
-        if r == 0:
-            return [[]]
-        if r > len(items):
-            return []
-
-        if r == 1:
-            return [[item] for item in items]
-
-        combinations = []
-        for i in range(len(items)):
-            remaining = items[i + 1:]
-            for combo in self._combinations(remaining, r - 1):
-                combinations.append([items[i]] + combo)
-
-        return combinations
-
-    def _get_subsets(self, itemset: Set[str], size: int) -> List[Set[str]]:
-        """Get all subsets of given size from itemset."""
-        items = list(itemset)
-        subsets = []
-
-        def backtrack(start: int, current: Set[str]):
-            if len(current) == size:
-                subsets.append(current.copy())
-                return
-
-            for i in range(start, len(items)):
-                current.add(items[i])
-                backtrack(i + 1, current)
-                current.remove(items[i])
-
-        backtrack(0, set())
-        return subsets
+                    child_set = item_set & other_set
+                    child_count = child_set.bit_count()
+
+                if child_count >= min_support_count:
+                    children.append((other, child_set, child_count))
+
+            if children:
+                self._eclat(itemset, count, children, min_support_count, max_len,
+                            child_diff_mode, frequent)
+
+    def _class_is_dense(self, item_set: int, count: int,
+                        siblings: List[Tuple[str, int, int]]) -> bool:
+        """Decide whether the class rooted at this member should use diffsets."""
+        if self.use_diffsets is True:
+            return True
+        if not self.use_diffsets or not siblings or count == 0:
+            return False
+        sample = siblings[:8]
+        ratio = sum((item_set & other).bit_count() for _, other, _ in sample) / (len(sample) * count)
+        return ratio > self.dense_threshold
@@ -0,0 +1,184 @@
+"""
+Mining engine registry and cost-based engine selection.
+
+Each segment is profiled (baskets, frequent items, density, line items) and
+every eligible engine gets a predicted cost from a linear model whose
+coefficients come from the bundled benchmark in app.mining.calibration.
+"""
+
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Type
+
+import numpy as np
+import yaml
+
+from .basket_matrix import BasketMatrix, min_support_count
+from .eclat import EclatMiner
+from .fpgrowth import FPGrowthMiner
+from .pair_miner import PairMatrixMiner
+
+
+MINER_REGISTRY: Dict[str, Type] = {
+    "fpgrowth": FPGrowthMiner,
+    "eclat": EclatMiner,
+    "pairs": PairMatrixMiner,
+}
+
+# Names of the features each engine's cost model is linear in
+ENGINE_FEATURES: Dict[str, List[str]] = {
+    "fpgrowth": ["intercept", "line_items", "itemsets"],
+    "eclat": ["intercept", "bitset_words", "itemset_words"],
+    "pairs": ["intercept", "line_items", "pair_products", "itemsets"],
+}
+
+# Fallback coefficients (seconds per feature unit) used when no calibration file exists
+DEFAULT_CALIBRATION: Dict[str, Dict[str, float]] = {
+    "fpgrowth": {"intercept": 5e-3, "line_items": 2e-6, "itemsets": 2e-4},
+    "eclat": {"intercept": 1e-3, "bitset_words": 2e-8, "itemset_words": 2e-8},
+    "pairs": {"intercept": 5e-3, "line_items": 2e-7, "pair_products": 5e-8, "itemsets": 2e-5},
+}
+
+DEFAULT_CALIBRATION_PATH = Path(__file__).resolve().parents[2] / "config" / "miner_calibration.yaml"
+
+
+def register_miner(name: str, miner_cls: Type):
+    """Register an additional mining engine under a config name."""
+    MINER_REGISTRY[name] = miner_cls
+
+
+def load_calibration(path: Optional[Path] = None) -> Dict[str, Dict[str, float]]:
+    """Load benchmark-calibrated coefficients, falling back to built-in defaults."""
+    path = Path(path) if path else DEFAULT_CALIBRATION_PATH
+    calibration = {name: dict(coefs) for name, coefs in DEFAULT_CALIBRATION.items()}
+    if path.exists():
+        with path.open("r", encoding="utf-8") as handle:
+            data = yaml.safe_load(handle) or {}
+        for name, coefs in (data.get("engines") or {}).items():
+            calibration.setdefault(name, {}).update({k: float(v) for k, v in coefs.items()})
+    return calibration
+
+
+@dataclass
+class SegmentProfile:
+    """Shape statistics of one segment that drive engine cost."""
+    n_baskets: int
+    n_items: int
+    frequent_items: int
+    line_items: int
+    density: float
+    min_support: float
+    max_len: Optional[int]
+    estimated_itemsets: float
+    pair_products: float
+
+    @classmethod
+    def from_basket(cls, basket: BasketMatrix, min_support: float,
+                    max_len: Optional[int] = None) -> "SegmentProfile":
+        """Profile a segment using only its frequent columns."""
+        n = basket.n_baskets
+        columns = basket.frequent_columns(min_support)
+        k = len(columns)
+        if n == 0 or k == 0:
+            return cls(n, basket.n_items, 0, 0, 0.0, min_support, max_len, 0.0, 0.0)
+
+        frequent = basket.matrix[:, columns]
+        basket_lengths = np.diff(frequent.tocsr().indptr).astype(np.float64)
+        line_items = float(basket_lengths.sum())
+        pair_products = float((basket_lengths * (basket_lengths - 1) / 2).sum())
+
+        # Every frequent pair needs min_count co-occurrences, which bounds how
+        # many pairs can be frequent; deeper levels scale with density
+        min_count = min_support_count(min_support, n)
+        pair_bound = min(k * (k - 1) / 2, pair_products / min_count)
+        density = line_items / (n * k)
+        depth_factor = 1.0 if max_len is not None and max_len <= 2 else 1.0 + 4.0 * density ** 2
+        estimated = k + pair_bound * depth_factor
+
+        return cls(n, basket.n_items, k, int(line_items), density, min_support, max_len,
+                   estimated, pair_products)
+
+    def features(self, engine: str) -> Dict[str, float]:
+        """Feature values for an engine's linear cost model."""
+        words = max(self.n_baskets / 64.0, 1.0)
+        values = {
+            "intercept": 1.0,
+            "line_items": float(self.line_items),
+            "itemsets": self.estimated_itemsets,
+            "bitset_words": self.frequent_items * words,
+            "itemset_words": self.estimated_itemsets * words,
+            "pair_products": self.pair_products,
+        }
+        return {name: values[name] for name in ENGINE_FEATURES[engine]}
+
+
+@dataclass
+class EngineChoice:
+    """Selected engine for one segment and the reason it won."""
+    name: str
+    engine: object
+    estimated_seconds: float
+    reason: str
+
+
+class EngineSelector:
+    """Chooses the cheapest configured mining engine per segment."""
+
+    def __init__(self, algorithms: Optional[Iterable[str]] = None,
+                 calibration: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        Initialize selector.
+
+        Args:
+            algorithms: Engine names allowed by config (defaults to every registered engine)
+            calibration: Cost coefficients per engine (defaults to the bundled calibration file)
+        """
+        self.logger = logging.getLogger(__name__)
+        names = list(algorithms) if algorithms else list(MINER_REGISTRY)
+        unknown = [name for name in names if name not in MINER_REGISTRY]
+        for name in unknown:
+            self.logger.warning(f"Ignoring unknown mining algorithm '{name}'")
+        self.algorithms = [name for name in names if name in MINER_REGISTRY] or ["fpgrowth"]
+        self.calibration = calibration or load_calibration()
+        self._engines = {name: MINER_REGISTRY[name]() for name in self.algorithms}
+
+    def estimate(self, name: str, profile: SegmentProfile) -> float:
+        """Predicted seconds for an engine on a profiled segment."""
+        coefs = self.calibration.get(name, DEFAULT_CALIBRATION.get(name, {}))
+        return sum(coefs.get(feature, 0.0) * value for feature, value in profile.features(name).items())
+
+    def eligible(self, profile: SegmentProfile) -> List[str]:
+        """Engines able to produce complete results for this segment."""
+        names = []
+        for name in self.algorithms:
+            if name == "pairs" and (profile.max_len is None
+                                    or profile.max_len > PairMatrixMiner.MAX_SUPPORTED_LEN):
+                continue
+            names.append(name)
+        return names or ["fpgrowth"]
+
+    def select(self, basket: BasketMatrix, min_support: float,
+               max_len: Optional[int] = None) -> EngineChoice:
+        """
+        Pick the engine with the lowest predicted cost for a segment.
+
+        Args:
+            basket: Segment basket matrix
+            min_support: Minimum support threshold for the segment
+            max_len: Maximum itemset length (None for unlimited)
+
+        Returns:
+            EngineChoice with the engine instance and a human-readable reason
+        """
+        profile = SegmentProfile.from_basket(basket, min_support, max_len)
+        costs = {name: self.estimate(name, profile) for name in self.eligible(profile)}
+        name = min(costs, key=costs.get)
+        ranked = ", ".join(f"{n}={c * 1000:.1f}ms" for n, c in sorted(costs.items(), key=lambda kv: kv[1]))
+        reason = (
+            f"{profile.n_baskets} baskets, {profile.frequent_items}/{profile.n_items} frequent items, "
+            f"density {profile.density:.3f}, min_support {min_support}, max_len {max_len}; "
+            f"predicted {ranked}"
+        )
+        engine = self._engines.get(name) or MINER_REGISTRY[name]()
+        return EngineChoice(name=name, engine=engine, estimated_seconds=costs[name], reason=reason)
@@ -1,6 +1,9 @@
-from mlxtend.frequent_patterns import fpgrowth, association_rules
+from mlxtend.frequent_patterns import fpgrowth
 import pandas as pd
-from typing import List
+from typing import List, Optional
+
+from .basket_matrix import BasketMatrix
+from .rule_generator import RuleGenerator
 
 
 class FPGrowthMiner:
@@ -17,46 +20,55 @@ class FPGrowthMiner:
         Returns:
             DataFrame with frequent itemsets and their support values
         """
-        # Convert transactions to basket matrix format
-        basket = self._to_basket_matrix(transactions)
+        return self.mine_matrix(BasketMatrix.from_transactions(transactions), min_support)
 
-        # Mine frequent itemsets
-        itemsets = fpgrowth(basket, min_support=min_support, use_colnames=True)
+    def mine_matrix(self, basket: BasketMatrix, min_support: float,
+                    max_len: Optional[int] = None) -> pd.DataFrame:
+        """
+        Mine frequent itemsets from a sparse basket matrix.
 
-        return itemsets
+        Infrequent items are dropped on the CSR matrix before mlxtend sees the
+        data, so only frequent columns are ever handed to the FP-tree builder.
 
-    def generate_rules(self, itemsets: pd.DataFrame, min_confidence: float) -> pd.DataFrame:
+        Args:
+            basket: Sparse baskets × items matrix
+            min_support: Minimum support threshold (0.0 to 1.0)
+            max_len: Maximum itemset length (None for unlimited)
+
+        Returns:
+            DataFrame with frequent itemsets and their support values
+        """
+        columns = basket.frequent_columns(min_support)
+        if basket.n_baskets == 0 or len(columns) == 0:
+            return pd.DataFrame(columns=['support', 'itemsets'])
+
+        frame = basket.to_sparse_frame(columns)
+        return fpgrowth(frame, min_support=min_support, use_colnames=True, max_len=max_len)
+
+    def generate_rules(self, itemsets: pd.DataFrame, min_confidence: float, min_lift: float = 0.0,
+                       max_consequent_size: Optional[int] = None) -> pd.DataFrame:
         """
         Generate association rules from frequent itemsets.
 
         Args:
             itemsets: DataFrame with frequent itemsets (from mine method)
             min_confidence: Minimum confidence threshold (0.0 to 1.0)
+            min_lift: Minimum lift threshold, pruned during enumeration
+            max_consequent_size: Largest consequent to generate (None for unlimited)
 
         Returns:
             DataFrame with association rules including support, confidence, and lift
         """
-        if itemsets.empty:
-            return pd.DataFrame(columns=['antecedents', 'consequents', 'support', 'confidence', 'lift'])
-
-        # Generate association rules
-        rules = association_rules(itemsets, metric="confidence", min_threshold=min_confidence)
-
-        return rules
+        return RuleGenerator(min_confidence, min_lift, max_consequent_size).generate(itemsets)
 
     def _to_basket_matrix(self, transactions: List[List[str]]) -> pd.DataFrame:
         """
-        Convert transaction list to basket matrix format required by mlxtend.
+        Convert transaction list to the sparse basket matrix format accepted by mlxtend.
 
         Args:
             transactions: List of transactions, each transaction is a list of item strings
 
         Returns:
-            DataFrame where rows are transactions, columns are items, values are True/False (bool type)
+            DataFrame where rows are transactions, columns are items, values are sparse booleans
         """
-        from mlxtend.preprocessing import TransactionEncoder
-
-        te = TransactionEncoder()
-        te_ary = te.fit(transactions).transform(transactions)
-        basket_df = pd.DataFrame(te_ary, columns=te.columns_)
-        return basket_df
+        return BasketMatrix.from_transactions(transactions).to_sparse_frame()
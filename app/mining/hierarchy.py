@@ -0,0 +1,217 @@
+"""
+Multi-level mining over the item → category hierarchy.
+
+SKU-level signals such as "any dairy → any bakery" are split across many
+SKU rules that each fall below support. Following Srikant & Agrawal's
+Cumulate, every basket is extended with the categories of its items, so
+category and SKU itemsets (and mixed ones) are counted together in the same
+level-wise passes over one encoded matrix instead of mining each level
+separately. Itemsets holding an item together with its own category are
+never generated: their support equals the item's.
+
+Cross-level rules that only restate a more general rule are dropped: a rule
+is kept when its support or confidence is at least min_interest times the
+value expected from each of its ancestor rules (the rule with some items
+replaced by their categories) and the items' share of their categories.
+"""
+
+import logging
+from itertools import combinations
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .basket_matrix import BasketMatrix, apriori_gen, min_support_count
+from .rule_generator import RuleGenerator
+
+
+CATEGORY_PREFIX = "category:"
+
+
+class ItemHierarchy:
+    """Item → category mapping aligned with a category-extended basket matrix."""
+
+    def __init__(self, parents: np.ndarray, items: np.ndarray):
+        """
+        Initialize item hierarchy.
+
+        Args:
+            parents: Per basket matrix column, the column of its category (-1 for none)
+            items: Label per basket matrix column
+        """
+        self.parents = np.asarray(parents, dtype=np.int64)
+        self.items = items
+
+    def category_of(self) -> Dict[str, str]:
+        """Category label of every item label that has one."""
+        return {str(self.items[c]): str(self.items[self.parents[c]]) for c in np.flatnonzero(self.parents >= 0)}
+
+    @classmethod
+    def extend(cls, basket: BasketMatrix, categories: pd.Series) -> Tuple[BasketMatrix, "ItemHierarchy"]:
+        """
+        Append one column per category, set wherever a basket holds any item of it.
+
+        Args:
+            basket: SKU-level basket matrix
+            categories: Category per item label (items without one stay top-level)
+
+        Returns:
+            Tuple of (extended BasketMatrix, ItemHierarchy over its columns)
+        """
+        item_categories = categories.reindex(basket.items.astype(str)).to_numpy(dtype=object)
+        known = pd.notna(item_categories)
+        codes, names = pd.factorize(item_categories[known], sort=True)
+        if not len(names):
+            return basket, cls(np.full(basket.n_items, -1), basket.items)
+
+        membership = sparse.csr_matrix(
+            (np.ones(len(codes), dtype=np.int32), (np.flatnonzero(known), codes)),
+            shape=(basket.n_items, len(names)),
+        )
+        category_matrix = (basket.matrix.astype(np.int32) @ membership).astype(bool)
+        matrix = sparse.hstack([basket.matrix, category_matrix], format='csr')
+        matrix.sort_indices()
+        labels = np.concatenate([basket.items, np.array([CATEGORY_PREFIX + str(n) for n in names], dtype=object)])
+
+        parents = np.full(len(labels), -1, dtype=np.int64)
+        parents[np.flatnonzero(known)] = basket.n_items + codes
+        return BasketMatrix(matrix, labels), cls(parents, labels)
+
+
+class MultiLevelMiner:
+    """Counts SKU and category itemsets together and filters redundant cross-level rules."""
+
+    def __init__(self, hierarchy: ItemHierarchy, min_interest: float = 1.1):
+        """
+        Initialize multi-level miner.
+
+        Args:
+            hierarchy: Category column of every column of the extended basket matrix
+            min_interest: How far (as a ratio) a rule must beat the support or
+                confidence expected from each ancestor rule to be kept
+        """
+        self.hierarchy = hierarchy
+        self.min_interest = min_interest
+        self.logger = logging.getLogger(__name__)
+
+    def mine_matrix(self, basket: BasketMatrix, min_support: float,
+                    max_len: Optional[int] = None) -> pd.DataFrame:
+        """
+        Mine frequent SKU, category and mixed itemsets level-wise.
+
+        Args:
+            basket: Category-extended basket matrix (see ItemHierarchy.extend)
+            min_support: Minimum support threshold (0.0 to 1.0)
+            max_len: Maximum itemset length (None for unlimited)
+
+        Returns:
+            DataFrame with frequent itemsets and their support values
+        """
+        total = basket.n_baskets
+        if total == 0:
+            return pd.DataFrame(columns=['support', 'itemsets'])
+        min_count = min_support_count(min_support, total)
+        parents = self.hierarchy.parents
+
+        item_counts = basket.item_counts()
+        level = [(int(c),) for c in np.flatnonzero(item_counts >= min_count)]
+        found: Dict[Tuple[int, ...], int] = {itemset: int(item_counts[itemset[0]]) for itemset in level}
+        size = 1
+        while level and (max_len is None or size < max_len):
+            candidates = apriori_gen(level)
+            if size == 1:
+                # Only pairs can join an item with its own category; larger
+                # candidates inherit the exclusion through their subsets
+                candidates = [(a, b) for a, b in candidates if parents[a] != b and parents[b] != a]
+            counts = basket.count_itemsets(candidates)
+            level = [candidate for candidate, count in zip(candidates, counts) if count >= min_count]
+            found.update((candidate, int(count)) for candidate, count in zip(candidates, counts)
+                         if count >= min_count)
+            size += 1
+
+        labels = basket.items
+        result = pd.DataFrame({
+            'support': [count / total for count in found.values()],
+            'itemsets': [frozenset(str(labels[c]) for c in itemset) for itemset in found],
+        })
+        self.logger.debug(f"Found {len(result)} multi-level itemsets over {basket.n_items} items and categories")
+        return result.sort_values('support', ascending=False, kind='mergesort').reset_index(drop=True)
+
+    def generate_rules(self, itemsets: pd.DataFrame, min_confidence: float, min_lift: float = 0.0,
+                       max_consequent_size: Optional[int] = None) -> pd.DataFrame:
+        """
+        Generate cross-level rules and drop those implied by an ancestor rule.
+
+        Args:
+            itemsets: DataFrame from mine_matrix
+            min_confidence: Minimum confidence threshold (0.0 to 1.0)
+            min_lift: Minimum lift threshold
+            max_consequent_size: Largest consequent to generate (None for unlimited)
+
+        Returns:
+            DataFrame with the non-redundant association rules
+        """
+        rules = RuleGenerator(min_confidence, min_lift, max_consequent_size).generate(itemsets)
+        if rules.empty:
+            return rules
+        return self.filter_redundant(rules, itemsets)
+
+    def filter_redundant(self, rules: pd.DataFrame, itemsets: pd.DataFrame) -> pd.DataFrame:
+        """
+        Keep rules that are min_interest-interesting against every ancestor rule.
+
+        An ancestor replaces some items by their categories. From it, the rule's
+        expected support is the ancestor's support scaled by s(item) / s(category)
+        for every replaced item, and its expected confidence the ancestor's
+        confidence scaled by the same ratios of the replaced consequent items.
+
+        Args:
+            rules: DataFrame with association rules
+            itemsets: Frequent itemsets the rules were generated from
+
+        Returns:
+            Rules without the redundant ones (same column layout and order)
+        """
+        category_of = self.hierarchy.category_of()
+        singles = {next(iter(s)): support for s, support in zip(itemsets['itemsets'], itemsets['support'])
+                   if len(s) == 1}
+        index = {(a, c): (s, conf) for a, c, s, conf in zip(
+            rules['antecedents'], rules['consequents'], rules['support'], rules['confidence'])}
+
+        keep = np.ones(len(rules), dtype=bool)
+        for position, (antecedent, consequent, support, confidence) in enumerate(zip(
+                rules['antecedents'], rules['consequents'], rules['support'], rules['confidence'])):
+            specific = [item for item in antecedent | consequent if item in category_of]
+            for k in range(1, len(specific) + 1):
+                for replaced in combinations(specific, k):
+                    ancestor = self._ancestor(antecedent, consequent, replaced, category_of)
+                    if ancestor not in index:
+                        continue
+                    ratio = float(np.prod([singles[i] / singles[category_of[i]] for i in replaced]))
+                    consequent_ratio = float(np.prod([singles[i] / singles[category_of[i]]
+                                                      for i in replaced if i in consequent]))
+                    ancestor_support, ancestor_confidence = index[ancestor]
+                    if (support < self.min_interest * ancestor_support * ratio
+                            and confidence < self.min_interest * ancestor_confidence * consequent_ratio):
+                        keep[position] = False
+                        break
+                if not keep[position]:
+                    break
+
+        if not keep.all():
+            self.logger.debug(f"Dropped {int((~keep).sum())} of {len(rules)} rules implied by an ancestor rule")
+        return rules[keep].reset_index(drop=True)
+
+    @staticmethod
+    def _ancestor(antecedent: frozenset, consequent: frozenset, replaced: Tuple[str, ...],
+                  category_of: Dict[str, str]) -> Optional[Tuple[frozenset, frozenset]]:
+        """The rule with the replaced items swapped for their categories (None if items merge)."""
+        swap = {item: category_of[item] for item in replaced}
+        general_antecedent = frozenset(swap.get(item, item) for item in antecedent)
+        general_consequent = frozenset(swap.get(item, item) for item in consequent)
+        if (len(general_antecedent) != len(antecedent) or len(general_consequent) != len(consequent)
+                or general_antecedent & general_consequent):
+            return None
+        return general_antecedent, general_consequent
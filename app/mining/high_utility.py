@@ -0,0 +1,210 @@
+"""
+High-utility itemset mining.
+
+Frequency mining prunes by support before profit is ever considered, so a
+high-margin combination bought in few baskets never reaches the scorer. Here
+the mined measure is utility: the margin an itemset earns, summed over the
+line items of every basket that contains all of its items (price × quantity ×
+margin_pct per line).
+
+Utility is not anti-monotone, so the search is HUI-Miner (Liu & Qu, 2012)
+over utility lists: per itemset, the baskets containing it with the
+itemset's utility and the remaining utility of the items after it in a fixed
+order. Items whose transaction-weighted utility (TWU, the total utility of
+the baskets containing them) is below the threshold are dropped up front,
+item pairs with too little co-occurring TWU are never joined (FHM's EUCS),
+and an itemset is extended only while its utility plus remaining utility can
+still reach the threshold.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .context_types import Context
+
+
+# (basket rows, itemset utility per basket, remaining utility per basket)
+UtilityList = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+@dataclass
+class HighUtilityItemset:
+    """Itemset ranked by the margin it earns within a context."""
+    itemset: frozenset
+    context: Context
+    utility: float          # Margin of the itemset's items, summed over baskets containing all of them
+    utility_share: float    # utility / total margin of the context
+    support: float
+    n_baskets: int          # Baskets in the context
+
+
+class HighUtilityMiner:
+    """HUI-Miner over a sparse baskets × items utility matrix."""
+
+    def __init__(self, min_utility: float = 0.01, max_len: Optional[int] = None):
+        """
+        Initialize high-utility miner.
+
+        Args:
+            min_utility: Minimum share of the segment's total utility (0.0 to 1.0)
+            max_len: Maximum itemset length (None for unlimited)
+        """
+        if not 0.0 <= min_utility <= 1.0:
+            raise ValueError(f"min_utility must be a share between 0 and 1, got {min_utility}")
+        self.min_utility = min_utility
+        self.max_len = max_len
+        self.explored = 0  # Utility lists built by the last mine_matrix call
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def line_utilities(transactions: pd.DataFrame, default_margin_pct: float = 0.25) -> np.ndarray:
+        """
+        Margin earned by each line item: price × quantity × margin_pct.
+
+        Args:
+            transactions: Line items with price and optional quantity / margin_pct columns
+            default_margin_pct: Margin used where margin_pct is missing (as ProfitCalculator)
+
+        Returns:
+            Utility per line item (missing prices count as zero, missing quantities as one)
+        """
+        price = transactions['price'].astype(float).fillna(0.0).to_numpy()
+        quantity = (transactions['quantity'].astype(float).fillna(1.0).to_numpy()
+                    if 'quantity' in transactions.columns else 1.0)
+        margin = (transactions['margin_pct'].astype(float).fillna(default_margin_pct).to_numpy()
+                  if 'margin_pct' in transactions.columns else default_margin_pct)
+        return np.clip(price * quantity * margin, 0.0, None)
+
+    def mine_matrix(self, utility: sparse.csr_matrix, items: np.ndarray) -> pd.DataFrame:
+        """
+        Mine high-utility itemsets from a baskets × items utility matrix.
+
+        Args:
+            utility: Utility of each item in each basket (duplicate lines summed)
+            items: Item labels indexed by column
+
+        Returns:
+            DataFrame with utility, utility_share, support and itemsets columns,
+            by descending utility
+        """
+        columns = ['utility', 'utility_share', 'support', 'itemsets']
+        utility = sparse.csr_matrix(utility, dtype=np.float64)
+        utility.eliminate_zeros()
+        n_baskets = utility.shape[0]
+        total = float(utility.sum())
+        if n_baskets == 0 or total <= 0:
+            return pd.DataFrame(columns=columns)
+
+        # Relative tolerance keeps itemsets whose utility equals the threshold
+        min_util = self.min_utility * total * (1 - 1e-9)
+        basket_utility = np.asarray(utility.sum(axis=1)).ravel()
+        present = utility.copy()
+        present.data[:] = 1.0
+        twu = present.T @ basket_utility
+
+        promising = np.flatnonzero(twu >= min_util)
+        if not len(promising):
+            return pd.DataFrame(columns=columns)
+        # Ascending TWU order keeps the remaining utility (and the search) small
+        order = promising[np.lexsort((promising, twu[promising]))]
+        revised = utility[:, order].tocsr()
+        revised.sort_indices()
+
+        lists = self._item_lists(revised)
+        # EUCS: TWU of the co-occurring item pairs in the revised baskets, kept
+        # sparse and cut to the pairs that can reach the threshold
+        indicator = revised.copy()
+        indicator.data[:] = 1.0
+        revised_utility = np.asarray(revised.sum(axis=1)).ravel()
+        pair_twu = (indicator.T @ sparse.diags(revised_utility) @ indicator).tocsr()
+        pair_twu.data[pair_twu.data < min_util] = 0.0
+        pair_twu.eliminate_zeros()
+
+        found: Dict[Tuple[int, ...], Tuple[float, int]] = {}
+        self.explored = 0
+        self._search((), None, list(range(len(order))), lists, pair_twu, min_util, found)
+        self.logger.debug(
+            f"Built {self.explored} utility lists for {len(order)} of {len(twu)} items; "
+            f"{len(found)} high-utility itemsets"
+        )
+
+        ranked = sorted(found.items(), key=lambda entry: (-entry[1][0], len(entry[0]), entry[0]))
+        return pd.DataFrame({
+            'utility': [value for _, (value, _) in ranked],
+            'utility_share': [value / total for _, (value, _) in ranked],
+            'support': [count / n_baskets for _, (_, count) in ranked],
+            'itemsets': [frozenset(str(items[order[k]]) for k in key) for key, _ in ranked],
+        }, columns=columns)
+
+    @staticmethod
+    def _item_lists(revised: sparse.csr_matrix) -> List[UtilityList]:
+        """Single-item utility lists; remaining utility follows the revised column order."""
+        rows = np.repeat(np.arange(revised.shape[0]), np.diff(revised.indptr))
+        # Utility of the items after each entry in its basket: row total minus inclusive prefix sum
+        prefix = np.cumsum(revised.data)
+        row_start = np.concatenate(([0.0], prefix))[revised.indptr[:-1]]
+        row_total = np.asarray(revised.sum(axis=1)).ravel()
+        remaining = row_total[rows] - (prefix - row_start[rows])
+
+        by_item = np.lexsort((rows, revised.indices))
+        bounds = np.searchsorted(revised.indices[by_item], np.arange(revised.shape[1] + 1))
+        return [
+            (rows[by_item[a:b]], revised.data[by_item[a:b]], np.clip(remaining[by_item[a:b]], 0.0, None))
+            for a, b in zip(bounds[:-1], bounds[1:])
+        ]
+
+    def _search(self, prefix: Tuple[int, ...], prefix_list: Optional[UtilityList],
+                members: List[int], lists: List[UtilityList], pair_twu: sparse.csr_matrix,
+                min_util: float, found: Dict[Tuple[int, ...], Tuple[float, int]]):
+        """
+        Depth-first HUI-Miner over one prefix class.
+
+        Args:
+            prefix: Item positions (in TWU order) shared by every member
+            prefix_list: Utility list of the prefix (None for the empty prefix)
+            members: Extension item positions, ascending
+            lists: Utility list per member of this class, indexed by item position
+            pair_twu: Item pairs whose co-occurring TWU reaches the threshold, for pruning joins
+            min_util: Absolute utility threshold
+            found: Output of itemset positions -> (utility, basket count)
+        """
+        for i, x in enumerate(members):
+            rows, iutil, rutil = lists[x]
+            itemset = prefix + (x,)
+            value = float(iutil.sum())
+            if value >= min_util:
+                found[itemset] = (value, len(rows))
+            if self.max_len is not None and len(itemset) >= self.max_len:
+                continue
+            if value + float(rutil.sum()) < min_util:
+                continue
+
+            linked = set(pair_twu.indices[pair_twu.indptr[x]:pair_twu.indptr[x + 1]].tolist())
+            extensions = []
+            extension_lists: Dict[int, UtilityList] = {}
+            for y in members[i + 1:]:
+                if y not in linked:
+                    continue
+                joined = self._join(prefix_list, lists[x], lists[y])
+                self.explored += 1
+                if len(joined[0]):
+                    extensions.append(y)
+                    extension_lists[y] = joined
+            if extensions:
+                self._search(itemset, lists[x], extensions, extension_lists, pair_twu, min_util, found)
+
+    @staticmethod
+    def _join(prefix_list: Optional[UtilityList], px: UtilityList, py: UtilityList) -> UtilityList:
+        """Utility list of P ∪ {x, y} from those of P ∪ {x} and P ∪ {y}."""
+        rows, at_x, at_y = np.intersect1d(px[0], py[0], assume_unique=True, return_indices=True)
+        iutil = px[1][at_x] + py[1][at_y]
+        if prefix_list is not None:
+            # The prefix's utility is counted in both lists
+            at_p = np.searchsorted(prefix_list[0], rows)
+            iutil = iutil - prefix_list[1][at_p]
+        return rows, iutil, py[2][at_y]
@@ -0,0 +1,338 @@
+"""
+Incremental (FUP-style) maintenance of per-context frequent itemsets.
+
+Frequent itemset counts are persisted per context with a watermark on
+transaction_items.id. When baskets are appended, each previously frequent
+itemset only needs counting over the new baskets; an itemset that was not
+frequent before can only become frequent if it is frequent enough within the
+new baskets alone, and only those survivors are re-counted over the old data.
+"""
+
+import json
+import logging
+import threading
+import time
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.assets.database import DatabaseManager
+from .basket_matrix import BasketMatrix, apriori_gen, min_support_count
+from .context_aware_miner import ContextAwareMiner, _stop_check, context_priority
+from .context_types import Context
+from .eclat import EclatMiner
+from .rule_set import RuleSet
+
+
+Itemset = Tuple[str, ...]
+
+# Contexts with fewer baskets are not mined (same cut-off as ContextAwareMiner)
+MIN_CONTEXT_BASKETS = 5
+
+
+class IncrementalMiner:
+    """Keeps per-context itemset counts current as transactions are appended."""
+
+    def __init__(self, db: DatabaseManager, min_support: float = 0.01,
+                 min_confidence: float = 0.3, min_rows_per_context: int = 100,
+                 max_depth: int = 2, max_len: Optional[int] = None,
+                 scope: Optional[Dict[str, object]] = None, **miner_kwargs):
+        """
+        Initialize incremental miner.
+
+        Args:
+            db: Database holding transactions and the persisted itemset counts
+            min_support: Minimum support threshold for mining
+            min_confidence: Minimum confidence threshold for rules
+            min_rows_per_context: Minimum rows per context segment
+            max_depth: Context lattice depth
+            max_len: Maximum itemset length (None for unlimited)
+            scope: Context filters the transactions were loaded with (part of the state key)
+            **miner_kwargs: Extra ContextAwareMiner options (algorithms, calibration, n_jobs,
+                min_lift, max_consequent_size, budget); with a budget, full mines are
+                planned and the state keeps the min_support / max_len actually used
+        """
+        self.db = db
+        self.min_support = min_support
+        self.min_confidence = min_confidence
+        self.max_depth = max_depth
+        self.max_len = max_len
+        self.params = {
+            'min_support': min_support,
+            'min_confidence': min_confidence,
+            'min_rows_per_context': min_rows_per_context,
+            'max_depth': max_depth,
+            'max_len': max_len,
+            'scope': {k: v for k, v in sorted((scope or {}).items()) if v is not None},
+        }
+        # Counts do not depend on min_confidence, but the state is keyed on
+        # everything that shapes the frequent itemsets
+        key_params = {k: v for k, v in self.params.items() if k != 'min_confidence'}
+        self.state_key = json.dumps(key_params, sort_keys=True)
+        self.miner = ContextAwareMiner(min_support=min_support, min_confidence=min_confidence,
+                                       min_rows_per_context=min_rows_per_context,
+                                       max_len=max_len, **miner_kwargs)
+        self.rule_engine = EclatMiner()
+        self.partial = False  # Whether the last update stopped before every context
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def adjusted(self) -> Optional[Tuple[float, Optional[int]]]:
+        """(min_support, max_len) the budget replaced the requested ones with (None if unchanged)."""
+        applied = (self.min_support, self.max_len)
+        return None if applied == (self.params['min_support'], self.params['max_len']) else applied
+
+    def update(self, transactions: pd.DataFrame, deadline_ms: Optional[float] = None,
+               cancel: Optional[threading.Event] = None) -> RuleSet:
+        """
+        Bring persisted counts up to date with transactions and return rules.
+
+        With a deadline or cancel event, contexts are updated in priority order
+        (see context_priority) and the update stops between contexts. A
+        stopped update returns the finished contexts' rules, sets partial and
+        saves nothing, so the next update starts from the same watermark.
+
+        Args:
+            transactions: All line items in scope, with a line_id column (transaction_items.id)
+            deadline_ms: Time budget for the update, in milliseconds
+            cancel: Event that aborts the update when set
+
+        Returns:
+            RuleSet with every (finished) context's rules
+        """
+        self.partial = False
+        if transactions.empty:
+            return RuleSet.empty()
+        should_stop = None
+        if deadline_ms is not None or cancel is not None:
+            should_stop = _stop_check(deadline_ms, cancel, time.monotonic())
+
+        watermark, state = self._load_state()
+        latest = int(transactions['line_id'].max())
+        is_new = transactions['line_id'].to_numpy() > (watermark if watermark is not None else -1)
+
+        if watermark is None:
+            self.logger.info("No incremental state yet; mining all contexts")
+            state = self._full_mine(transactions, should_stop)
+        elif not is_new.any():
+            self.logger.debug("No transactions since last incremental update")
+            return self._rules_from_state(state)
+        else:
+            tids = transactions['transaction_id']
+            touched = set(tids[is_new]) & set(tids[~is_new])
+            if touched:
+                # Items appended to existing baskets change old counts; FUP only covers new baskets
+                self.logger.info(f"{len(touched)} existing baskets changed; mining all contexts")
+                state = self._full_mine(transactions, should_stop)
+            else:
+                state = self._incremental_mine(transactions, is_new, state, should_stop)
+
+        if self.partial:
+            self.logger.warning(f"Incremental update stopped after {len(state)} contexts; state not saved")
+            return self._rules_from_state(state)
+        self._save_state(latest, state)
+        return self._rules_from_state(state)
+
+    # ------------------------------------------------------------------ #
+    # Mining
+    # ------------------------------------------------------------------ #
+    def _segments(self, transactions: pd.DataFrame, prioritized: bool = False):
+        """Shared basket matrix plus (context, basket rows) for every minable context."""
+        segments = self.miner.segmenter.segment(transactions, max_depth=self.max_depth)
+        basket, basket_ids = self.miner.encode_baskets(transactions)
+        line_rows = basket_ids.get_indexer(transactions['transaction_id'])
+        tasks = []
+        for context, positions in segments.items():
+            rows = self.miner._segment_rows(positions, line_rows)
+            if len(rows) >= MIN_CONTEXT_BASKETS:
+                tasks.append((context, rows))
+        if prioritized:
+            tasks.sort(key=lambda task: context_priority(task[0]))
+        return basket, basket_ids, line_rows, tasks
+
+    def _stopped(self, should_stop: Optional[Callable[[], bool]]) -> bool:
+        """Check should_stop between contexts and record a stop in partial."""
+        if should_stop is not None and should_stop():
+            self.partial = True
+        return self.partial
+
+    def _full_mine(self, transactions: pd.DataFrame,
+                   should_stop: Optional[Callable[[], bool]] = None) -> Dict[Context, Dict[Itemset, int]]:
+        """Mine every context from scratch (until should_stop fires) and keep its itemset counts."""
+        basket, _, _, tasks = self._segments(transactions, prioritized=should_stop is not None)
+        if self.miner.budget is not None and tasks:
+            # Plan from the requested thresholds, not those applied to earlier data
+            self.miner.min_support, self.miner.max_len = self.params['min_support'], self.params['max_len']
+            self.miner._apply_budget(basket, tasks)
+            self.min_support, self.max_len = self.miner.min_support, self.miner.max_len
+        state: Dict[Context, Dict[Itemset, int]] = {}
+        for context, rows in tasks:
+            if self._stopped(should_stop):
+                break
+            state[context] = self._mine_counts(context, basket.take(rows))
+        return state
+
+    def _mine_counts(self, context: Context, basket: BasketMatrix) -> Dict[Itemset, int]:
+        """Frequent itemset counts for one context using the selected engine."""
+        engine = self.miner._engine_for(context, basket)
+        itemsets = engine.mine_matrix(basket, min_support=self.min_support, max_len=self.max_len)
+        counts: Dict[Itemset, int] = {(): basket.n_baskets}
+        for support, itemset in zip(itemsets['support'], itemsets['itemsets']):
+            counts[tuple(sorted(itemset))] = int(round(support * basket.n_baskets))
+        return counts
+
+    def _incremental_mine(self, transactions: pd.DataFrame, is_new: np.ndarray,
+                          state: Dict[Context, Dict[Itemset, int]],
+                          should_stop: Optional[Callable[[], bool]] = None) -> Dict[Context, Dict[Itemset, int]]:
+        """Apply the appended baskets to every affected context (until should_stop fires)."""
+        basket, basket_ids, line_rows, tasks = self._segments(transactions, prioritized=should_stop is not None)
+        new_rows = np.zeros(basket.n_baskets, dtype=bool)
+        new_rows[np.unique(line_rows[is_new & (line_rows >= 0)])] = True
+        labels = [str(item) for item in basket.items]
+        column_of = {label: k for k, label in enumerate(labels)}
+
+        updated: Dict[Context, Dict[Itemset, int]] = {}
+        rescanned = 0
+        for context, rows in tasks:
+            if self._stopped(should_stop):
+                break
+            fresh = new_rows[rows]
+            old_counts = state.get(context)
+            if old_counts is None:
+                # Context just crossed its row threshold: nothing to maintain yet
+                updated[context] = self._mine_counts(context, basket.take(rows))
+            elif not fresh.any():
+                updated[context] = old_counts
+            else:
+                counts, n_rescanned = self._fup(basket.take(rows[~fresh]), basket.take(rows[fresh]),
+                                                old_counts, labels, column_of)
+                updated[context] = counts
+                rescanned += n_rescanned
+
+        self.logger.info(
+            f"Incremental update: {int(new_rows.sum())} new baskets, {len(updated)} contexts, "
+            f"{rescanned} itemsets re-counted over old baskets"
+        )
+        return updated
+
+    def _fup(self, old: BasketMatrix, new: BasketMatrix, old_counts: Dict[Itemset, int],
+             labels: Sequence[str], column_of: Dict[str, int]) -> Tuple[Dict[Itemset, int], int]:
+        """
+        FUP update of one context's frequent itemsets.
+
+        Args:
+            old: Baskets already reflected in old_counts
+            new: Appended baskets
+            old_counts: Frequent itemset counts over old baskets ('()' = basket count)
+            labels: Item label per basket matrix column
+            column_of: Column index per item label
+
+        Returns:
+            Tuple of (updated counts, number of itemsets re-counted over old baskets)
+        """
+        n_old, n_new = old.n_baskets, new.n_baskets
+        min_total = min_support_count(self.min_support, n_old + n_new)
+        # An itemset infrequent in the old baskets has at most min_old - 1 of them,
+        # so it needs this many occurrences among the new baskets to become frequent
+        min_new = min_total - (min_support_count(self.min_support, n_old) - 1)
+
+        old_frequent = {tuple(sorted(column_of[label] for label in itemset)): count
+                        for itemset, count in old_counts.items() if itemset}
+        counts: Dict[Itemset, int] = {(): n_old + n_new}
+        rescanned = 0
+
+        candidates = [(k,) for k in range(len(labels))]
+        size = 1
+        while candidates:
+            new_counts = new.count_itemsets(candidates)
+            totals = np.zeros(len(candidates), dtype=np.int64)
+            rescan = []
+            for j, candidate in enumerate(candidates):
+                if candidate in old_frequent:
+                    totals[j] = old_frequent[candidate] + new_counts[j]
+                elif new_counts[j] >= min_new:
+                    rescan.append(j)
+            if rescan:
+                totals[rescan] = old.count_itemsets([candidates[j] for j in rescan]) + new_counts[rescan]
+                rescanned += len(rescan)
+
+            frequent = [candidates[j] for j in np.flatnonzero(totals >= min_total)]
+            for j in np.flatnonzero(totals >= min_total):
+                counts[tuple(sorted(labels[k] for k in candidates[j]))] = int(totals[j])
+
+            if self.max_len is not None and size >= self.max_len:
+                break
+            candidates = apriori_gen(frequent)
+            size += 1
+
+        return counts, rescanned
+
+    def _rules_from_state(self, state: Dict[Context, Dict[Itemset, int]]) -> RuleSet:
+        """Derive rules for every context from its frequent itemset counts."""
+        rules = []
+        for context, counts in state.items():
+            n = counts.get((), 0)
+            itemsets = [(count / n, frozenset(itemset)) for itemset, count in counts.items() if itemset]
+            if not n or not itemsets:
+                continue
+            frame = pd.DataFrame(itemsets, columns=['support', 'itemsets'])
+            rules_df = self.rule_engine.generate_rules(frame, min_confidence=self.min_confidence,
+                                                       min_lift=self.miner.min_lift,
+                                                       max_consequent_size=self.miner.max_consequent_size)
+            rules.append(self.miner._to_contextual_rules(context, rules_df))
+        return RuleSet.concat(rules)
+
+    # ------------------------------------------------------------------ #
+    # Persistence
+    # ------------------------------------------------------------------ #
+    def _load_state(self) -> Tuple[Optional[int], Dict[Context, Dict[Itemset, int]]]:
+        """Read the watermark and per-context counts for this parameter set."""
+        rows = self.db.execute_query(
+            "SELECT watermark, params FROM mining_state WHERE state_key = ?", (self.state_key,)
+        )
+        if not rows:
+            return None, {}
+        # FUP must keep counting at the thresholds the stored counts were mined with
+        applied = json.loads(rows[0]['params']).get('applied')
+        if applied:
+            self.min_support, self.max_len = applied['min_support'], applied['max_len']
+        state: Dict[Context, Dict[Itemset, int]] = {}
+        for row in self.db.execute_query(
+            "SELECT context, itemset, count FROM context_itemset_counts WHERE state_key = ?",
+            (self.state_key,),
+        ):
+            context = Context(**json.loads(row['context']))
+            state.setdefault(context, {})[tuple(json.loads(row['itemset']))] = row['count']
+        return rows[0]['watermark'], state
+
+    def _save_state(self, watermark: int, state: Dict[Context, Dict[Itemset, int]]):
+        """Replace this parameter set's counts and advance the watermark atomically."""
+        records = [
+            (self.state_key, json.dumps(asdict(context), sort_keys=True), json.dumps(list(itemset)), count)
+            for context, counts in state.items()
+            for itemset, count in counts.items()
+        ]
+        # Request threads and the post-import refresh share self.db; a dedicated
+        # connection keeps this transaction from joining (or being rolled back with) theirs
+        with self.db.dedicated_writer() as writer, writer.transaction():
+            writer.execute_insert("DELETE FROM context_itemset_counts WHERE state_key = ?", (self.state_key,))
+            if records:
+                writer.execute_many("""
+                    INSERT INTO context_itemset_counts (state_key, context, itemset, count)
+                    VALUES (?, ?, ?, ?)
+                """, records)
+            writer.execute_insert("""
+                INSERT OR REPLACE INTO mining_state (state_key, params, watermark, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            """, (self.state_key, json.dumps(self._stored_params(), sort_keys=True), watermark))
+
+    def _stored_params(self) -> Dict[str, object]:
+        """Requested parameters plus the thresholds the counts were mined with."""
+        return {**self.params, 'applied': {'min_support': self.min_support, 'max_len': self.max_len}}
+
+    @staticmethod
+    def stored_params(db: DatabaseManager) -> List[Dict[str, object]]:
+        """Parameter sets that have incremental state, for refreshing after imports."""
+        return [json.loads(row['params']) for row in db.execute_query("SELECT params FROM mining_state")]
@@ -0,0 +1,199 @@
+"""
+Single-pass frequent itemset counting across the whole context lattice.
+
+Context segments overlap heavily (Overall contains every store, every store
+contains its store × time_bin cells), so instead of mining each segment on
+its own, candidates are generated level-wise over the union of contexts and
+counted once: a sparse contexts × baskets membership matrix times the
+baskets × candidates indicator matrix yields every context's support counts
+in one product per level.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .basket_matrix import BasketMatrix, min_support_count
+from .context_types import Context
+
+
+@dataclass
+class SharedCounts:
+    """Per-context support counts shared across the lattice, one entry per itemset length."""
+    levels: List[Tuple[List[Tuple[int, ...]], np.ndarray, np.ndarray]]  # (column tuples, counts, frequent)
+    context_sizes: np.ndarray   # Baskets (or total weight) per context
+    labels: np.ndarray          # Item label per basket matrix column
+
+
+class MultiContextCounter:
+    """Apriori-style level-wise counting shared by many overlapping segments."""
+
+    def __init__(self, min_support: float, max_len: Optional[int] = None):
+        """
+        Initialize counter.
+
+        Args:
+            min_support: Minimum support threshold, applied relative to each context's basket count
+            max_len: Maximum itemset length (None for unlimited)
+        """
+        self.min_support = min_support
+        self.max_len = max_len
+        self.logger = logging.getLogger(__name__)
+
+    def mine(self, basket: BasketMatrix, tasks: Sequence[Tuple[Context, np.ndarray]],
+             weights: Optional[np.ndarray] = None) -> List[pd.DataFrame]:
+        """
+        Mine frequent itemsets for every context in one pass per level.
+
+        Args:
+            basket: Shared basket matrix covering every context
+            tasks: (context, basket row positions) per segment
+            weights: Optional per-basket weights (e.g. time decay); support is then
+                the weighted share of baskets containing the itemset
+
+        Returns:
+            Frequent itemsets DataFrame (support, itemsets) per task, in task order
+        """
+        if not tasks:
+            return []
+
+        counts = self.count(basket, tasks, weights)
+        return [self._context_frame(k, counts.levels, counts.labels, counts.context_sizes[k])
+                for k in range(len(tasks))]
+
+    def count(self, basket: BasketMatrix, tasks: Sequence[Tuple[Context, np.ndarray]],
+              weights: Optional[np.ndarray] = None) -> SharedCounts:
+        """
+        Count every context's support for all itemsets frequent in any context.
+
+        Counts are exact in every context, including those where an itemset
+        is not frequent, so contexts can be compared itemset by itemset.
+
+        Args:
+            basket: Shared basket matrix covering every context
+            tasks: (context, basket row positions) per segment
+            weights: Optional per-basket weights (see mine)
+
+        Returns:
+            SharedCounts with one (itemsets, counts, frequent) entry per level
+        """
+        n_contexts = len(tasks)
+        membership = self._membership(basket.n_baskets, tasks, weights)
+        if weights is None:
+            context_sizes = np.array([len(rows) for _, rows in tasks], dtype=np.int64)
+            min_counts = np.array([min_support_count(self.min_support, n) for n in context_sizes])[:, None]
+        else:
+            context_sizes = np.asarray(membership.sum(axis=1)).ravel()
+            # Tolerance keeps float sums that equal the threshold frequent;
+            # contexts with no weight at all have nothing frequent
+            min_counts = np.where(context_sizes > 0, self.min_support * context_sizes - 1e-9, np.inf)[:, None]
+
+        X = basket.matrix.astype(np.int32).tocsc()
+        item_counts = np.asarray((membership @ X).todense())
+        item_frequent = item_counts >= min_counts
+        columns = np.flatnonzero(item_frequent.any(axis=0))
+
+        labels = np.array([str(item) for item in basket.items], dtype=object)
+        levels = []
+        # Level state: itemsets as column tuples, their basket indicators,
+        # per-context counts and per-context frequency mask
+        itemsets = [(c,) for c in columns]
+        indicators = X[:, columns].tocsc()
+        counts = item_counts[:, columns]
+        frequent = item_frequent[:, columns]
+        levels.append((itemsets, counts, frequent))
+
+        size = 1
+        while itemsets and (self.max_len is None or size < self.max_len):
+            itemsets, indicators, counts, frequent = self._next_level(
+                itemsets, indicators, frequent, X, membership, min_counts
+            )
+            size += 1
+            if itemsets:
+                levels.append((itemsets, counts, frequent))
+            self.logger.debug(f"Level {size}: {len(itemsets)} itemsets frequent in some context")
+
+        self.logger.info(
+            f"Counted {sum(len(level[0]) for level in levels)} itemsets across "
+            f"{n_contexts} contexts in {len(levels)} passes"
+        )
+        return SharedCounts(levels=levels, context_sizes=context_sizes, labels=labels)
+
+    def _membership(self, n_baskets: int, tasks: Sequence[Tuple[Context, np.ndarray]],
+                    weights: Optional[np.ndarray] = None) -> sparse.csr_matrix:
+        """Sparse contexts × baskets matrix holding each member basket's weight (1 if unweighted)."""
+        rows = np.concatenate([np.full(len(r), k, dtype=np.int64) for k, (_, r) in enumerate(tasks)])
+        cols = np.concatenate([np.asarray(r, dtype=np.int64) for _, r in tasks])
+        data = np.ones(len(cols), dtype=np.int32) if weights is None else np.asarray(weights, dtype=np.float64)[cols]
+        return sparse.csr_matrix((data, (rows, cols)), shape=(len(tasks), n_baskets))
+
+    def _next_level(self, itemsets: List[Tuple[int, ...]], indicators: sparse.csc_matrix,
+                    frequent: np.ndarray, X: sparse.csc_matrix, membership: sparse.csr_matrix,
+                    min_counts: np.ndarray):
+        """Join, prune and count the next candidate level."""
+        index_of: Dict[Tuple[int, ...], int] = {itemset: i for i, itemset in enumerate(itemsets)}
+
+        # Prefix join: itemsets sharing all but their last item extend each other
+        by_prefix: Dict[Tuple[int, ...], List[int]] = {}
+        for i, itemset in enumerate(itemsets):
+            by_prefix.setdefault(itemset[:-1], []).append(i)
+
+        parents, extensions, candidates = [], [], []
+        for members in by_prefix.values():
+            for a_pos, a in enumerate(members):
+                for b in members[a_pos + 1:]:
+                    parents.append(a)
+                    extensions.append(itemsets[b][-1])
+                    candidates.append(itemsets[a] + (itemsets[b][-1],))
+
+        if not candidates:
+            return [], None, None, None
+
+        # A candidate can only be frequent in contexts where every subset is
+        survives = np.ones((frequent.shape[0], len(candidates)), dtype=bool)
+        keep = np.ones(len(candidates), dtype=bool)
+        for drop in range(len(candidates[0])):
+            subset_index = np.empty(len(candidates), dtype=np.int64)
+            for j, candidate in enumerate(candidates):
+                idx = index_of.get(candidate[:drop] + candidate[drop + 1:])
+                if idx is None:
+                    keep[j] = False
+                    idx = 0
+                subset_index[j] = idx
+            survives &= frequent[:, subset_index]
+        keep &= survives.any(axis=0)
+
+        selected = np.flatnonzero(keep)
+        if len(selected) == 0:
+            return [], None, None, None
+
+        parents = np.asarray(parents)[selected]
+        extensions = np.asarray(extensions)[selected]
+        candidates = [candidates[j] for j in selected]
+        survives = survives[:, selected]
+
+        new_indicators = indicators[:, parents].multiply(X[:, extensions]).tocsc()
+        counts = np.asarray((membership @ new_indicators).todense())
+        new_frequent = (counts >= min_counts) & survives
+
+        retained = np.flatnonzero(new_frequent.any(axis=0))
+        return ([candidates[j] for j in retained], new_indicators[:, retained],
+                counts[:, retained], new_frequent[:, retained])
+
+    def _context_frame(self, k: int, levels, labels: np.ndarray, n_baskets: float) -> pd.DataFrame:
+        """Collect one context's frequent itemsets from every level."""
+        supports, itemsets = [], []
+        for level_itemsets, counts, frequent in levels:
+            hits = np.flatnonzero(frequent[k])
+            supports.append(counts[k, hits] / n_baskets)
+            itemsets.extend(frozenset(labels[list(level_itemsets[j])]) for j in hits)
+
+        if not itemsets:
+            return pd.DataFrame(columns=['support', 'itemsets'])
+
+        result = pd.DataFrame({'support': np.concatenate(supports), 'itemsets': itemsets})
+        return result.sort_values('support', ascending=False, kind='mergesort').reset_index(drop=True)
@@ -0,0 +1,110 @@
+"""
+Sparse co-occurrence engine for short rules.
+
+Counts every item pair in one sparse Xᵀ·X product over the basket matrix and,
+optionally, every triple extending a frequent pair in one more product.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .basket_matrix import BasketMatrix, min_support_count
+from .rule_generator import RuleGenerator
+
+
+class PairMatrixMiner:
+    """Frequent itemsets of size ≤ 3 via sparse matrix products."""
+
+    MAX_SUPPORTED_LEN = 3
+
+    def mine(self, transactions: List[List[str]], min_support: float,
+             max_len: Optional[int] = MAX_SUPPORTED_LEN) -> pd.DataFrame:
+        """
+        Mine frequent itemsets of up to three items.
+
+        Args:
+            transactions: List of transactions, each transaction is a list of item strings
+            min_support: Minimum support threshold (0.0 to 1.0)
+            max_len: Maximum itemset length (1-3)
+
+        Returns:
+            DataFrame with frequent itemsets and their support values
+        """
+        return self.mine_matrix(BasketMatrix.from_transactions(transactions), min_support, max_len)
+
+    def mine_matrix(self, basket: BasketMatrix, min_support: float,
+                    max_len: Optional[int] = MAX_SUPPORTED_LEN) -> pd.DataFrame:
+        """
+        Mine frequent itemsets of up to three items from a sparse basket matrix.
+
+        Args:
+            basket: Sparse baskets × items matrix
+            min_support: Minimum support threshold (0.0 to 1.0)
+            max_len: Maximum itemset length (1-3); None means 3
+
+        Returns:
+            DataFrame with frequent itemsets and their support values
+        """
+        max_len = self.MAX_SUPPORTED_LEN if max_len is None else max_len
+        if max_len > self.MAX_SUPPORTED_LEN:
+            raise ValueError(f"PairMatrixMiner supports max_len <= {self.MAX_SUPPORTED_LEN}, got {max_len}")
+
+        n = basket.n_baskets
+        columns = basket.frequent_columns(min_support)
+        if n == 0 or len(columns) == 0:
+            return pd.DataFrame(columns=['support', 'itemsets'])
+
+        min_count = min_support_count(min_support, n)
+        labels = np.array([str(item) for item in basket.items[columns]], dtype=object)
+        X = basket.matrix[:, columns].astype(np.int32).tocsc()
+
+        item_counts = np.asarray(X.sum(axis=0)).ravel()
+        supports = [item_counts / n]
+        itemsets = [[frozenset((label,)) for label in labels]]
+
+        if max_len >= 2:
+            # Upper triangle of Xᵀ·X holds every pair count exactly once
+            co = sparse.triu(X.T @ X, k=1).tocoo()
+            keep = co.data >= min_count
+            pair_a, pair_b, pair_counts = co.row[keep], co.col[keep], co.data[keep]
+            supports.append(pair_counts / n)
+            itemsets.append([frozenset((labels[a], labels[b])) for a, b in zip(pair_a, pair_b)])
+
+            if max_len >= 3 and len(pair_a):
+                # Indicator of each frequent pair per basket, then one product
+                # counts every (pair, third item) combination
+                pair_hits = X[:, pair_a].multiply(X[:, pair_b]).tocsc()
+                triple = (pair_hits.T @ X).tocoo()
+                # Each triple a<b<c is counted once, as pair (a, b) extended by c > b
+                valid = (triple.col > pair_b[triple.row]) & (triple.data >= min_count)
+                t_pair, t_c, t_counts = triple.row[valid], triple.col[valid], triple.data[valid]
+                supports.append(t_counts / n)
+                itemsets.append([
+                    frozenset((labels[pair_a[p]], labels[pair_b[p]], labels[c]))
+                    for p, c in zip(t_pair, t_c)
+                ])
+
+        result = pd.DataFrame({
+            'support': np.concatenate(supports),
+            'itemsets': [itemset for level in itemsets for itemset in level],
+        })
+        return result.sort_values('support', ascending=False, kind='mergesort').reset_index(drop=True)
+
+    def generate_rules(self, itemsets: pd.DataFrame, min_confidence: float, min_lift: float = 0.0,
+                       max_consequent_size: Optional[int] = None) -> pd.DataFrame:
+        """
+        Generate every rule from frequent pairs and triples.
+
+        Args:
+            itemsets: DataFrame with frequent itemsets (from mine method)
+            min_confidence: Minimum confidence threshold (0.0 to 1.0)
+            min_lift: Minimum lift threshold, pruned during enumeration
+            max_consequent_size: Largest consequent to generate (None for unlimited)
+
+        Returns:
+            DataFrame with association rules including support, confidence, and lift
+        """
+        return RuleGenerator(min_confidence, min_lift, max_consequent_size).generate(itemsets)
@@ -0,0 +1,173 @@
+"""
+Process-pool execution of per-context mining.
+
+The shared basket matrix is placed in shared memory once; worker processes
+attach to it and receive only the row positions of the segment they mine.
+"""
+
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .basket_matrix import BasketMatrix
+from .context_types import Context
+from .rule_set import RuleSet
+
+
+# ProcessPoolExecutor refuses more workers than this on Windows
+_MAX_WINDOWS_WORKERS = 61
+
+
+def resolve_n_jobs(n_jobs: Optional[int], n_tasks: Optional[int] = None) -> int:
+    """
+    Translate an n_jobs setting (None, -1, N) into a worker count.
+
+    Requests beyond the machine are clamped to its cores (and, when known,
+    to the number of tasks), so a large n_jobs never spawns idle processes.
+
+    Args:
+        n_jobs: Requested workers (None or 0 for one, negative counts back from all cores)
+        n_tasks: Number of tasks to run, if known
+
+    Returns:
+        Worker count of at least 1
+    """
+    cpus = os.cpu_count() or 1
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    workers = cpus + 1 + n_jobs if n_jobs < 0 else min(n_jobs, cpus)
+    if sys.platform == "win32":
+        workers = min(workers, _MAX_WINDOWS_WORKERS)
+    if n_tasks is not None:
+        workers = min(workers, n_tasks)
+    return max(1, workers)
+
+
+@dataclass
+class SharedArraySpec:
+    """Location of a NumPy array inside a shared memory block."""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+class SharedBasketMatrix:
+    """Owns shared-memory copies of a BasketMatrix's CSR index arrays."""
+
+    def __init__(self, basket: BasketMatrix):
+        self.shape = basket.matrix.shape
+        self.items = basket.items
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.indptr = self._share(basket.matrix.indptr)
+        self.indices = self._share(basket.matrix.indices)
+
+    def _share(self, array: np.ndarray) -> SharedArraySpec:
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        view[:] = array
+        self._blocks.append(block)
+        return SharedArraySpec(block.name, array.shape, array.dtype.str)
+
+    def spec(self) -> Dict[str, Any]:
+        """Picklable description handed to worker processes."""
+        return {
+            'shape': self.shape,
+            'items': self.items,
+            'indptr': self.indptr,
+            'indices': self.indices,
+        }
+
+    def release(self):
+        """Close and unlink all shared blocks."""
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+# How often a stoppable pool checks should_stop while segments are running
+_STOP_POLL_SECONDS = 0.05
+
+# Per-process state populated by _init_worker
+_WORKER: Dict[str, Any] = {}
+
+
+def _attach(spec: SharedArraySpec) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    block = shared_memory.SharedMemory(name=spec.name)
+    return block, np.ndarray(spec.shape, dtype=np.dtype(spec.dtype), buffer=block.buf)
+
+
+def _init_worker(matrix_spec: Dict[str, Any], miner_kwargs: Dict[str, Any]):
+    """Attach to the shared basket matrix and build a worker-local miner."""
+    from .context_aware_miner import ContextAwareMiner
+
+    indptr_block, indptr = _attach(matrix_spec['indptr'])
+    indices_block, indices = _attach(matrix_spec['indices'])
+    data = np.ones(len(indices), dtype=bool)
+    matrix = sparse.csr_matrix((data, indices, indptr), shape=matrix_spec['shape'])
+
+    _WORKER['blocks'] = (indptr_block, indices_block)
+    _WORKER['basket'] = BasketMatrix(matrix, matrix_spec['items'])
+    _WORKER['miner'] = ContextAwareMiner(**miner_kwargs)
+
+
+def _mine_task(task_index: int, context: Context, rows: np.ndarray) -> Tuple[int, RuleSet]:
+    """Mine one segment inside a worker process."""
+    basket: BasketMatrix = _WORKER['basket']
+    segment = basket if len(rows) == basket.n_baskets else basket.take(rows)
+    return task_index, _WORKER['miner']._mine_segment(context, segment)
+
+
+def mine_segments_parallel(basket: BasketMatrix,
+                           tasks: Sequence[Tuple[Context, np.ndarray]],
+                           miner_kwargs: Dict[str, Any],
+                           n_jobs: int,
+                           should_stop: Optional[Callable[[], bool]] = None) -> List[Optional[RuleSet]]:
+    """
+    Mine segments in a process pool, largest segments first.
+
+    Args:
+        basket: Shared basket matrix for all segments
+        tasks: (context, basket row positions) per segment, in output order
+        miner_kwargs: Keyword arguments to rebuild the miner inside each worker
+        n_jobs: Number of worker processes
+        should_stop: Polled while waiting; once it returns True, queued segments
+            are cancelled and the pool is abandoned without waiting for running ones
+
+    Returns:
+        Rules per task, in the same order as tasks regardless of completion order
+        (None for segments not finished before should_stop fired)
+    """
+    shared = SharedBasketMatrix(basket)
+    results: List[Optional[RuleSet]] = [None] * len(tasks)
+    schedule = sorted(range(len(tasks)), key=lambda i: len(tasks[i][1]), reverse=True)
+    if should_stop is not None:
+        # Callers that may stop early order tasks by priority; keep that order
+        schedule = list(range(len(tasks)))
+    pool = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                               initargs=(shared.spec(), miner_kwargs))
+    stopped = False
+    try:
+        pending = {pool.submit(_mine_task, i, tasks[i][0], tasks[i][1]) for i in schedule}
+        while pending:
+            done, pending = wait(pending, timeout=_STOP_POLL_SECONDS if should_stop else None,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                task_index, rules = future.result()
+                results[task_index] = rules
+            if pending and should_stop is not None and should_stop():
+                stopped = True
+                break
+    finally:
+        # Workers keep their own mapping of the shared blocks, so unlinking is safe
+        pool.shutdown(wait=not stopped, cancel_futures=True)
+        shared.release()
+    if should_stop is None:
+        return [rules if rules is not None else RuleSet.empty() for rules in results]
+    return results
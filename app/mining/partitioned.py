@@ -0,0 +1,219 @@
+"""
+Partitioned (SON) mining for transaction histories larger than memory.
+
+Savasere, Omiecinski & Navathe: an itemset frequent in the whole history is
+frequent, at the same relative threshold, in at least one partition. So
+(1) every partition's context segments are mined locally at min_support, in
+worker processes, and the union of the local results is the candidate set;
+(2) one more scan counts every candidate exactly in every partition. Only
+one partition (plus the candidates) is ever held per worker, and the
+results are exactly those of mining the whole history at once.
+
+Partitions are line-item DataFrames holding whole baskets; the source is a
+callable returning a fresh iterator so the history can be scanned twice.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .basket_matrix import BasketMatrix
+from .context_segmenter import ContextSegmenter
+from .context_types import Context
+
+
+PartitionSource = Callable[[], Iterable[pd.DataFrame]]
+
+# Relative slack on the local threshold so float rounding never drops a candidate
+_LOCAL_SUPPORT_SLACK = 1e-9
+
+# Per-process state populated by _init_worker
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(miner_kwargs: Dict[str, Any], max_depth: int,
+                 candidates: Optional[Dict[Context, List[Tuple[str, ...]]]] = None):
+    """Build a worker-local miner (and, for the counting scan, the candidate set)."""
+    from .context_aware_miner import ContextAwareMiner
+
+    _WORKER['miner'] = ContextAwareMiner(**miner_kwargs)
+    _WORKER['max_depth'] = max_depth
+    _WORKER['candidates'] = candidates
+
+
+def _partition_segments(partition: pd.DataFrame, max_depth: int) -> Tuple[BasketMatrix, Iterator]:
+    """Encode one partition and walk every context present in it."""
+    miner = _WORKER['miner']
+    basket, basket_ids = miner.encode_baskets(partition)
+    line_rows = basket_ids.get_indexer(partition['transaction_id'])
+    # Every context is kept: whether it reaches its row threshold is only known globally
+    segmenter = ContextSegmenter(min_rows=0)
+    segments = (
+        (context, positions, miner._segment_rows(positions, line_rows))
+        for context, positions in segmenter.iter_segments(partition, max_depth=max_depth)
+    )
+    return basket, segments
+
+
+def _local_candidates(partition: pd.DataFrame) -> Tuple[Dict[Context, Set[Tuple[str, ...]]],
+                                                          Dict[Context, Tuple[int, int]]]:
+    """
+    First scan: mine each context segment of one partition locally.
+
+    Returns:
+        Tuple of (locally frequent itemsets as sorted label tuples per context,
+        (line rows, baskets) per context)
+    """
+    miner = _WORKER['miner']
+    basket, segments = _partition_segments(partition, _WORKER['max_depth'])
+    local_support = miner.min_support * (1 - _LOCAL_SUPPORT_SLACK)
+
+    candidates: Dict[Context, Set[Tuple[str, ...]]] = {}
+    sizes: Dict[Context, Tuple[int, int]] = {}
+    for context, positions, rows in segments:
+        sizes[context] = (len(positions), len(rows))
+        segment = basket if len(rows) == basket.n_baskets else basket.take(rows)
+        engine = miner.selector.select(segment, local_support, miner.max_len).engine
+        itemsets = engine.mine_matrix(segment, min_support=local_support, max_len=miner.max_len)
+        candidates[context] = {tuple(sorted(itemset)) for itemset in itemsets['itemsets']}
+    return candidates, sizes
+
+
+def _count_candidates(partition: pd.DataFrame) -> Dict[Context, np.ndarray]:
+    """Second scan: exact counts of every context's candidates in one partition."""
+    basket, segments = _partition_segments(partition, _WORKER['max_depth'])
+    item_index = pd.Index(basket.items.astype(str))
+
+    counts: Dict[Context, np.ndarray] = {}
+    for context, _, rows in segments:
+        candidates = _WORKER['candidates'].get(context)
+        if not candidates:
+            continue
+        codes = [item_index.get_indexer(list(candidate)) for candidate in candidates]
+        present = [k for k, code in enumerate(codes) if (code >= 0).all()]
+        context_counts = np.zeros(len(candidates), dtype=np.int64)
+        if present:
+            segment = basket if len(rows) == basket.n_baskets else basket.take(rows)
+            context_counts[present] = segment.count_itemsets([tuple(np.sort(codes[k]).tolist()) for k in present])
+        counts[context] = context_counts
+    return counts
+
+
+def _scan(partitions: PartitionSource, task: Callable, n_jobs: int, initargs: tuple) -> Iterator:
+    """Apply task to every partition, in a bounded process pool when n_jobs > 1."""
+    if n_jobs <= 1:
+        _init_worker(*initargs)
+        for partition in partitions():
+            yield task(partition)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=initargs)
+    finished = False
+    try:
+        pending = []
+        for partition in partitions():
+            # At most two partitions per worker are in flight, bounding parent memory
+            if len(pending) >= 2 * n_jobs:
+                yield pending.pop(0).result()
+            pending.append(pool.submit(task, partition))
+        for future in pending:
+            yield future.result()
+        finished = True
+    finally:
+        # A scan closed early (mining stopped) drops its queued partitions instead of waiting
+        pool.shutdown(wait=finished, cancel_futures=not finished)
+
+
+class PartitionedMiner:
+    """SON mining of every context segment over partitions scanned twice."""
+
+    def __init__(self, miner_kwargs: Dict[str, Any], max_depth: int = 2, n_jobs: int = 1):
+        """
+        Initialize partitioned miner.
+
+        Args:
+            miner_kwargs: ContextAwareMiner settings used for local mining
+                (min_support, max_len, algorithms, ...)
+            max_depth: Context lattice depth
+            n_jobs: Worker processes (1 scans partitions in-process)
+        """
+        self.miner_kwargs = miner_kwargs
+        self.max_depth = max_depth
+        self.n_jobs = n_jobs
+        self.stopped = False  # Whether the last mine call stopped before finishing both scans
+        self.logger = logging.getLogger(__name__)
+
+    def mine(self, partitions: PartitionSource,
+             should_stop: Optional[Callable[[], bool]] = None
+             ) -> Tuple[Dict[Context, pd.DataFrame], Dict[Context, Tuple[int, int]]]:
+        """
+        Mine exact frequent itemsets per context from a partitioned history.
+
+        Counts are only exact once both scans have seen every partition, so
+        stopping (checked between partitions) returns nothing at all.
+
+        Args:
+            partitions: Callable returning an iterable of line-item DataFrames,
+                each holding whole baskets (no basket split across partitions)
+            should_stop: Polled after each partition; once it returns True the
+                scans are abandoned and stopped is set
+
+        Returns:
+            Tuple of (frequent itemsets per context with support and itemsets
+            columns, (line rows, baskets) per context over the whole history),
+            both empty when stopped
+        """
+        self.stopped = False
+        min_support = self.miner_kwargs.get('min_support', 0.01)
+        candidates: Dict[Context, Set[Tuple[str, ...]]] = {}
+        sizes: Dict[Context, Tuple[int, int]] = {}
+        n_partitions = 0
+        scan = _scan(partitions, _local_candidates, self.n_jobs, (self.miner_kwargs, self.max_depth))
+        for local, local_sizes in scan:
+            if self._stop(scan, should_stop):
+                return {}, {}
+            n_partitions += 1
+            for context, itemsets in local.items():
+                candidates.setdefault(context, set()).update(itemsets)
+            for context, (lines, baskets) in local_sizes.items():
+                total_lines, total_baskets = sizes.get(context, (0, 0))
+                sizes[context] = (total_lines + lines, total_baskets + baskets)
+
+        # Coarser contexts first, as the segmenter walks the lattice breadth-first
+        by_depth = sorted(candidates, key=lambda context: sum(v is not None for v in vars(context).values()))
+        ordered = {context: sorted(candidates[context]) for context in by_depth}
+        self.logger.info(
+            f"SON scan 1: {sum(len(c) for c in ordered.values())} candidates across "
+            f"{len(ordered)} contexts from {n_partitions} partitions"
+        )
+
+        totals = {context: np.zeros(len(itemsets), dtype=np.int64) for context, itemsets in ordered.items()}
+        scan = _scan(partitions, _count_candidates, self.n_jobs, (self.miner_kwargs, self.max_depth, ordered))
+        for counts in scan:
+            if self._stop(scan, should_stop):
+                return {}, {}
+            for context, context_counts in counts.items():
+                totals[context] += context_counts
+
+        frequent: Dict[Context, pd.DataFrame] = {}
+        for context, itemsets in ordered.items():
+            n_baskets = sizes[context][1]
+            support = totals[context] / n_baskets
+            keep = np.flatnonzero(support >= min_support)
+            frequent[context] = pd.DataFrame({
+                'support': support[keep],
+                'itemsets': [frozenset(itemsets[k]) for k in keep],
+            }, columns=['support', 'itemsets'])
+        return frequent, sizes
+
+    def _stop(self, scan: Iterator, should_stop: Optional[Callable[[], bool]]) -> bool:
+        """Close a scan and record the stop once should_stop fires."""
+        if should_stop is None or not should_stop():
+            return False
+        scan.close()
+        self.stopped = True
+        self.logger.warning("SON mining stopped between partitions; no context finished")
+        return True
@@ -0,0 +1,177 @@
+"""
+Association rule generation with pushed-down confidence, lift and size limits.
+
+Rules X \\ C → C are enumerated per frequent itemset X by growing the
+consequent C level-wise (Agrawal & Srikant's ap-genrules). Moving items from
+the antecedent to the consequent can only lower confidence, and lift is
+bounded by 1 / support(X \\ C), which also only falls as C grows, so a
+consequent is extended only while both bounds still allow a qualifying rule.
+Each level is evaluated for all itemsets of one size at once, with subset
+supports looked up through a hashed index on item codes.
+"""
+
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+RULE_COLUMNS = ['antecedents', 'consequents', 'antecedent support', 'consequent support',
+                'support', 'confidence', 'lift']
+
+# Relative slack on the lift bound so float rounding never prunes a qualifying rule
+_LIFT_BOUND_SLACK = 1e-9
+
+
+class RuleGenerator:
+    """Derives association rules from frequent itemsets, pruning while enumerating."""
+
+    def __init__(self, min_confidence: float = 0.3, min_lift: float = 0.0,
+                 max_consequent_size: Optional[int] = None):
+        """
+        Initialize rule generator.
+
+        Args:
+            min_confidence: Minimum confidence threshold (0.0 to 1.0)
+            min_lift: Minimum lift threshold (0 keeps every lift)
+            max_consequent_size: Largest consequent to enumerate (None for unlimited)
+        """
+        self.min_confidence = min_confidence
+        self.min_lift = min_lift
+        self.max_consequent_size = max_consequent_size
+
+    def generate(self, itemsets: pd.DataFrame) -> pd.DataFrame:
+        """
+        Generate association rules from frequent itemsets.
+
+        Every subset of a frequent itemset must be present in itemsets (as
+        with any complete frequent itemset result), so antecedent and
+        consequent supports are exact.
+
+        Args:
+            itemsets: DataFrame with support and itemsets (frozenset) columns
+
+        Returns:
+            DataFrame with association rules including support, confidence, and lift,
+            by descending confidence
+        """
+        if itemsets.empty:
+            return pd.DataFrame(columns=RULE_COLUMNS)
+
+        members = itemsets['itemsets'].tolist()
+        member_array = np.empty(len(members), dtype=object)
+        member_array[:] = members
+        supports = itemsets['support'].to_numpy(dtype=np.float64)
+        sizes = np.fromiter(map(len, members), dtype=np.int64, count=len(members))
+
+        item_index = pd.Index(sorted({item for itemset in members for item in itemset}))
+        levels = self._index_levels(members, sizes, item_index)
+
+        blocks = []
+        for size in sorted(levels):
+            if size >= 2:
+                blocks.extend(self._level_rules(levels, supports, size))
+        if not blocks:
+            return pd.DataFrame(columns=RULE_COLUMNS)
+
+        # Antecedents and consequents are frequent itemsets themselves, so the
+        # input frozensets are shared instead of building new ones per rule
+        rules_df = pd.DataFrame({
+            'antecedents': member_array[np.concatenate([block[0] for block in blocks])],
+            'consequents': member_array[np.concatenate([block[1] for block in blocks])],
+            'antecedent support': np.concatenate([block[2] for block in blocks]),
+            'consequent support': np.concatenate([block[3] for block in blocks]),
+            'support': np.concatenate([block[4] for block in blocks]),
+            'confidence': np.concatenate([block[5] for block in blocks]),
+            'lift': np.concatenate([block[6] for block in blocks]),
+        }, columns=RULE_COLUMNS)
+        return rules_df.sort_values('confidence', ascending=False, kind='mergesort').reset_index(drop=True)
+
+    @staticmethod
+    def _index_levels(members: List[frozenset], sizes: np.ndarray,
+                      item_index: pd.Index) -> Dict[int, Tuple[np.ndarray, np.ndarray, pd.Index]]:
+        """Per itemset size: (sorted item codes, itemsets row numbers, index over the code rows)."""
+        levels = {}
+        for size in np.unique(sizes).tolist():
+            rows = np.flatnonzero(sizes == size)
+            flat = [item for position in rows.tolist() for item in members[position]]
+            codes = np.sort(item_index.get_indexer(flat).reshape(len(rows), size), axis=1)
+            if size == 1:
+                index = pd.Index(codes[:, 0])
+            else:
+                index = pd.MultiIndex.from_arrays([codes[:, k] for k in range(size)])
+            levels[size] = (codes, rows, index)
+        return levels
+
+    @staticmethod
+    def _lookup(levels: Dict[int, Tuple[np.ndarray, np.ndarray, pd.Index]],
+                codes: np.ndarray) -> np.ndarray:
+        """Row numbers in itemsets of itemsets given as rows of sorted item codes."""
+        _, rows, index = levels[codes.shape[1]]
+        if codes.shape[1] == 1:
+            positions = index.get_indexer(codes[:, 0])
+        else:
+            positions = index.get_indexer(pd.MultiIndex.from_arrays([codes[:, k] for k in range(codes.shape[1])]))
+        if (positions < 0).any():
+            raise KeyError("Itemsets are not downward closed: a subset of a frequent itemset is missing")
+        return rows[positions]
+
+    def _level_rules(self, levels: Dict[int, Tuple[np.ndarray, np.ndarray, pd.Index]],
+                     supports: np.ndarray, size: int) -> List[Tuple[np.ndarray, ...]]:
+        """
+        Rules from all itemsets of one size, consequents grown level-wise.
+
+        Args:
+            levels: Output of _index_levels
+            supports: Support per itemsets row
+            size: Itemset size to derive rules from
+
+        Returns:
+            Blocks of (antecedent row, consequent row, antecedent support,
+            consequent support, support, confidence, lift)
+        """
+        codes, itemset_rows, _ = levels[size]
+        max_consequent = size - 1
+        if self.max_consequent_size is not None:
+            max_consequent = min(max_consequent, self.max_consequent_size)
+
+        blocks = []
+        # Itemsets whose rule with a given consequent (tuple of positions) may still be extended
+        extendable: Dict[Tuple[int, ...], np.ndarray] = {}
+        for consequent_size in range(1, max_consequent + 1):
+            for positions in combinations(range(size), consequent_size):
+                if consequent_size == 1:
+                    candidates = np.ones(len(codes), dtype=bool)
+                else:
+                    candidates = np.logical_and.reduce([
+                        extendable[positions[:k] + positions[k + 1:]] for k in range(consequent_size)
+                    ])
+                extendable[positions] = np.zeros(len(codes), dtype=bool)
+                rows = np.flatnonzero(candidates)
+                if not len(rows):
+                    continue
+
+                rest = [k for k in range(size) if k not in positions]
+                antecedents = self._lookup(levels, codes[np.ix_(rows, rest)])
+                consequents = self._lookup(levels, codes[np.ix_(rows, list(positions))])
+                support = supports[itemset_rows[rows]]
+                antecedent_support = supports[antecedents]
+                consequent_support = supports[consequents]
+                confidence = support / antecedent_support
+                lift = confidence / consequent_support
+
+                confident = confidence >= self.min_confidence
+                if self.min_lift > 0:
+                    # Larger consequents keep lift below 1 / support(antecedent)
+                    lift_bound = (1 + _LIFT_BOUND_SLACK) / antecedent_support
+                    extendable[positions][rows] = confident & (lift_bound >= self.min_lift)
+                    keep = confident & (lift >= self.min_lift)
+                else:
+                    extendable[positions][rows] = confident
+                    keep = confident
+
+                if keep.any():
+                    blocks.append((antecedents[keep], consequents[keep], antecedent_support[keep],
+                                   consequent_support[keep], support[keep], confidence[keep], lift[keep]))
+        return blocks
@@ -0,0 +1,388 @@
+"""
+Columnar storage for contextual association rules.
+
+A dense context can yield hundreds of thousands of rules; holding each as a
+ContextualRule (two frozensets of strings plus a Context) makes per-object
+overhead dominate. RuleSet keeps metrics in NumPy arrays, antecedents and
+consequents as ragged arrays of interned item codes, and one context id per
+rule. Individual rules are exposed as lazy RuleView objects, which behave like
+ContextualRule for code that still works rule by rule.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .context_types import Context, ContextualRule
+
+
+SCORE_COLUMNS = ('profit_score', 'diversity_score', 'overall_score')
+
+
+def _gather(offsets: np.ndarray, codes: np.ndarray, index: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Select rows of a ragged (offsets, codes) array."""
+    lengths = np.diff(offsets)[index]
+    new_offsets = np.zeros(len(index) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    positions = np.repeat(offsets[:-1][index] - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    return new_offsets, codes[positions]
+
+
+def _ragged(code_lists: Sequence[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Build a ragged (offsets, codes) array from per-rule code lists."""
+    offsets = np.zeros(len(code_lists) + 1, dtype=np.int64)
+    np.cumsum([len(codes) for codes in code_lists], out=offsets[1:])
+    codes = np.fromiter((c for codes in code_lists for c in codes), dtype=np.int32, count=offsets[-1])
+    return offsets, codes
+
+
+class RuleSet:
+    """Association rules from one or more contexts, stored column-wise."""
+
+    def __init__(self, items: np.ndarray, contexts: List[Context], context_ids: np.ndarray,
+                 antecedent_offsets: np.ndarray, antecedent_codes: np.ndarray,
+                 consequent_offsets: np.ndarray, consequent_codes: np.ndarray,
+                 support: np.ndarray, confidence: np.ndarray, lift: np.ndarray,
+                 profit_score: Optional[np.ndarray] = None,
+                 diversity_score: Optional[np.ndarray] = None,
+                 overall_score: Optional[np.ndarray] = None):
+        """
+        Initialize rule set.
+
+        Args:
+            items: Sorted item labels; codes index into this array, so ascending
+                codes within a rule are also its items in sorted order
+            contexts: Distinct contexts; context_ids index into this list
+            context_ids: Context of each rule
+            antecedent_offsets: Start of each rule's antecedent codes (length n + 1)
+            antecedent_codes: Concatenated, per-rule ascending antecedent item codes
+            consequent_offsets: Start of each rule's consequent codes (length n + 1)
+            consequent_codes: Concatenated, per-rule ascending consequent item codes
+            support: Rule support per rule
+            confidence: Rule confidence per rule
+            lift: Rule lift per rule
+            profit_score: Optional profit score per rule (NaN = not scored)
+            diversity_score: Optional diversity score per rule (NaN = not scored)
+            overall_score: Optional overall score per rule (NaN = not scored)
+        """
+        n = len(support)
+        self.items = items
+        self.contexts = contexts
+        self.context_ids = np.asarray(context_ids, dtype=np.int32)
+        self.antecedent_offsets = antecedent_offsets
+        self.antecedent_codes = antecedent_codes
+        self.consequent_offsets = consequent_offsets
+        self.consequent_codes = consequent_codes
+        self.support = np.asarray(support, dtype=np.float64)
+        self.confidence = np.asarray(confidence, dtype=np.float64)
+        self.lift = np.asarray(lift, dtype=np.float64)
+        self.profit_score = self._score_column(profit_score, n)
+        self.diversity_score = self._score_column(diversity_score, n)
+        self.overall_score = self._score_column(overall_score, n)
+
+    @staticmethod
+    def _score_column(values: Optional[np.ndarray], n: int) -> np.ndarray:
+        if values is None:
+            return np.full(n, np.nan)
+        return np.asarray(values, dtype=np.float64)
+
+    # ------------------------------------------------------------------ #
+    # Construction
+    # ------------------------------------------------------------------ #
+    @classmethod
+    def empty(cls) -> "RuleSet":
+        """Rule set with no rules."""
+        no_rules = np.zeros(1, dtype=np.int64)
+        no_codes = np.zeros(0, dtype=np.int32)
+        return cls(np.array([], dtype=object), [], np.zeros(0, dtype=np.int32),
+                   no_rules, no_codes, no_rules.copy(), no_codes.copy(),
+                   np.zeros(0), np.zeros(0), np.zeros(0))
+
+    @classmethod
+    def from_rules(cls, rules: Iterable[ContextualRule]) -> "RuleSet":
+        """
+        Build a rule set from ContextualRule objects.
+
+        Args:
+            rules: Rules to store (score fields are kept when set)
+
+        Returns:
+            RuleSet in the same order
+        """
+        rules = list(rules)
+        if not rules:
+            return cls.empty()
+        items = np.array(sorted({str(item) for rule in rules
+                                 for item in rule.antecedent | rule.consequent}), dtype=object)
+        code_of = {label: code for code, label in enumerate(items)}
+        context_index: Dict[Context, int] = {}
+        context_ids = np.array([context_index.setdefault(rule.context, len(context_index))
+                                for rule in rules], dtype=np.int32)
+        antecedents = _ragged([sorted(code_of[str(i)] for i in rule.antecedent) for rule in rules])
+        consequents = _ragged([sorted(code_of[str(i)] for i in rule.consequent) for rule in rules])
+
+        def column(name):
+            return np.array([np.nan if getattr(rule, name) is None else getattr(rule, name)
+                             for rule in rules], dtype=np.float64)
+
+        return cls(items, list(context_index), context_ids, *antecedents, *consequents,
+                   support=column('support'), confidence=column('confidence'), lift=column('lift'),
+                   **{name: column(name) for name in SCORE_COLUMNS})
+
+    @classmethod
+    def from_frame(cls, context: Context, rules_df: pd.DataFrame) -> "RuleSet":
+        """
+        Build a single-context rule set from an mlxtend-style rules DataFrame.
+
+        Antecedents and consequents repeat heavily across rules, so each
+        distinct itemset is interned once and rules gather their codes from
+        that table; metric columns are taken over as arrays.
+
+        Args:
+            context: Context every rule belongs to
+            rules_df: DataFrame with antecedents, consequents, support, confidence and lift
+
+        Returns:
+            RuleSet in frame order
+        """
+        if rules_df.empty:
+            return cls.empty()
+        antecedent_ids, antecedents = pd.factorize(rules_df['antecedents'], sort=False)
+        consequent_ids, consequents = pd.factorize(rules_df['consequents'], sort=False)
+        labels = set()
+        for itemset in list(antecedents) + list(consequents):
+            labels.update(str(item) for item in itemset)
+        items = np.array(sorted(labels), dtype=object)
+        code_of = {label: code for code, label in enumerate(items)}
+
+        def codes(itemsets, ids):
+            table = _ragged([sorted(code_of[str(i)] for i in itemset) for itemset in itemsets])
+            return _gather(*table, ids)
+
+        return cls(
+            items, [context], np.zeros(len(rules_df), dtype=np.int32),
+            *codes(antecedents, antecedent_ids),
+            *codes(consequents, consequent_ids),
+            support=rules_df['support'].to_numpy(dtype=np.float64),
+            confidence=rules_df['confidence'].to_numpy(dtype=np.float64),
+            lift=rules_df['lift'].to_numpy(dtype=np.float64),
+        )
+
+    @classmethod
+    def concat(cls, rule_sets: Iterable["RuleSet"]) -> "RuleSet":
+        """
+        Concatenate rule sets, merging their item vocabularies and contexts.
+
+        Args:
+            rule_sets: Rule sets in output order
+
+        Returns:
+            Combined RuleSet
+        """
+        rule_sets = [rs for rs in rule_sets if len(rs)]
+        if not rule_sets:
+            return cls.empty()
+        if len(rule_sets) == 1:
+            return rule_sets[0]
+
+        items = np.unique(np.concatenate([rs.items for rs in rule_sets]).astype(str)).astype(object)
+        context_index: Dict[Context, int] = {}
+        parts = {name: [] for name in ('context_ids', 'antecedent_codes', 'consequent_codes',
+                                       'antecedent_lengths', 'consequent_lengths',
+                                       'support', 'confidence', 'lift') + SCORE_COLUMNS}
+        for rs in rule_sets:
+            # Both vocabularies are sorted, so remapping keeps codes ascending within a rule
+            remap = np.searchsorted(items, rs.items.astype(str)).astype(np.int32)
+            context_remap = np.array([context_index.setdefault(c, len(context_index)) for c in rs.contexts],
+                                     dtype=np.int32)
+            parts['context_ids'].append(context_remap[rs.context_ids])
+            parts['antecedent_codes'].append(remap[rs.antecedent_codes])
+            parts['consequent_codes'].append(remap[rs.consequent_codes])
+            parts['antecedent_lengths'].append(np.diff(rs.antecedent_offsets))
+            parts['consequent_lengths'].append(np.diff(rs.consequent_offsets))
+            for name in ('support', 'confidence', 'lift') + SCORE_COLUMNS:
+                parts[name].append(getattr(rs, name))
+
+        merged = {name: np.concatenate(values) for name, values in parts.items()}
+
+        def offsets(lengths):
+            result = np.zeros(len(lengths) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=result[1:])
+            return result
+
+        return cls(
+            items, list(context_index), merged['context_ids'],
+            offsets(merged['antecedent_lengths']), merged['antecedent_codes'],
+            offsets(merged['consequent_lengths']), merged['consequent_codes'],
+            support=merged['support'], confidence=merged['confidence'], lift=merged['lift'],
+            **{name: merged[name] for name in SCORE_COLUMNS},
+        )
+
+    # ------------------------------------------------------------------ #
+    # Sequence protocol
+    # ------------------------------------------------------------------ #
+    def __len__(self) -> int:
+        return len(self.support)
+
+    def __iter__(self) -> Iterator["RuleView"]:
+        return (RuleView(self, i) for i in range(len(self)))
+
+    def __getitem__(self, key: Union[int, slice, np.ndarray, Sequence[int]]):
+        """Integer keys return a RuleView; slices, index arrays and masks return a RuleSet."""
+        if isinstance(key, (int, np.integer)):
+            n = len(self)
+            if not -n <= key < n:
+                raise IndexError("rule index out of range")
+            return RuleView(self, int(key) % n)
+        if isinstance(key, slice):
+            return self.take(np.arange(len(self))[key])
+        key = np.asarray(key)
+        return self.take(np.flatnonzero(key) if key.dtype == bool else key)
+
+    def __repr__(self) -> str:
+        return f"RuleSet({len(self)} rules, {len(self.contexts)} contexts, {len(self.items)} items)"
+
+    def take(self, index: np.ndarray) -> "RuleSet":
+        """
+        Rules at the given positions, in that order.
+
+        The item vocabulary and context list are shared with this set.
+
+        Args:
+            index: Integer positions
+
+        Returns:
+            RuleSet of the selected rules
+        """
+        index = np.asarray(index, dtype=np.int64)
+        return RuleSet(
+            self.items, self.contexts, self.context_ids[index],
+            *_gather(self.antecedent_offsets, self.antecedent_codes, index),
+            *_gather(self.consequent_offsets, self.consequent_codes, index),
+            support=self.support[index], confidence=self.confidence[index], lift=self.lift[index],
+            **{name: getattr(self, name)[index] for name in SCORE_COLUMNS},
+        )
+
+    def to_rules(self) -> List[ContextualRule]:
+        """Materialize every rule as a standalone ContextualRule."""
+        return [view.materialize() for view in self]
+
+    # ------------------------------------------------------------------ #
+    # Column access
+    # ------------------------------------------------------------------ #
+    def antecedent_labels(self, i: int) -> List[str]:
+        """Sorted antecedent item labels of rule i."""
+        return self.items[self.antecedent_codes[self.antecedent_offsets[i]:self.antecedent_offsets[i + 1]]].tolist()
+
+    def consequent_labels(self, i: int) -> List[str]:
+        """Sorted consequent item labels of rule i."""
+        return self.items[self.consequent_codes[self.consequent_offsets[i]:self.consequent_offsets[i + 1]]].tolist()
+
+    def context_labels(self) -> np.ndarray:
+        """Human-readable context label per rule."""
+        labels = np.array([str(context) for context in self.contexts], dtype=object)
+        return labels[self.context_ids] if len(labels) else np.array([], dtype=object)
+
+    def item_matrix(self, part: str = 'both') -> sparse.csr_matrix:
+        """
+        Rules × items incidence matrix.
+
+        Args:
+            part: 'antecedent', 'consequent' or 'both' (items of either side)
+
+        Returns:
+            CSR matrix of shape (n_rules, n_items) with 1 where the rule holds the item
+        """
+        shape = (len(self), len(self.items))
+        sides = {'antecedent': [(self.antecedent_offsets, self.antecedent_codes)],
+                 'consequent': [(self.consequent_offsets, self.consequent_codes)]}
+        sides['both'] = sides['antecedent'] + sides['consequent']
+        matrix = sparse.csr_matrix(shape, dtype=np.int32)
+        for offsets, codes in sides[part]:
+            rows = np.repeat(np.arange(len(self)), np.diff(offsets))
+            matrix = matrix + sparse.csr_matrix((np.ones(len(codes), dtype=np.int32), (rows, codes)),
+                                                shape=shape)
+        return matrix
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the rule columns."""
+        arrays = [self.context_ids, self.antecedent_offsets, self.antecedent_codes,
+                  self.consequent_offsets, self.consequent_codes, self.support,
+                  self.confidence, self.lift] + [getattr(self, name) for name in SCORE_COLUMNS]
+        return sum(a.nbytes for a in arrays)
+
+
+class RuleView(ContextualRule):
+    """
+    Lazy ContextualRule backed by one row of a RuleSet.
+
+    Fields are read from the columns on access; setting a score field writes
+    through to the RuleSet.
+    """
+
+    def __init__(self, rules: RuleSet, index: int):
+        object.__setattr__(self, '_rules', rules)
+        object.__setattr__(self, '_index', index)
+
+    @property
+    def antecedent(self) -> frozenset:
+        return frozenset(self._rules.antecedent_labels(self._index))
+
+    @property
+    def consequent(self) -> frozenset:
+        return frozenset(self._rules.consequent_labels(self._index))
+
+    @property
+    def context(self) -> Context:
+        return self._rules.contexts[self._rules.context_ids[self._index]]
+
+    @property
+    def support(self) -> float:
+        return float(self._rules.support[self._index])
+
+    @property
+    def confidence(self) -> float:
+        return float(self._rules.confidence[self._index])
+
+    @property
+    def lift(self) -> float:
+        return float(self._rules.lift[self._index])
+
+    def _score(self, name: str) -> Optional[float]:
+        value = getattr(self._rules, name)[self._index]
+        return None if np.isnan(value) else float(value)
+
+    def _set_score(self, name: str, value: Optional[float]):
+        getattr(self._rules, name)[self._index] = np.nan if value is None else value
+
+    profit_score = property(lambda self: self._score('profit_score'),
+                            lambda self, value: self._set_score('profit_score', value))
+    diversity_score = property(lambda self: self._score('diversity_score'),
+                               lambda self, value: self._set_score('diversity_score', value))
+    overall_score = property(lambda self: self._score('overall_score'),
+                             lambda self, value: self._set_score('overall_score', value))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ContextualRule):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in (
+            'antecedent', 'consequent', 'support', 'confidence', 'lift', 'context') + SCORE_COLUMNS)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"RuleView(antecedent={self.antecedent!r}, consequent={self.consequent!r}, "
+                f"support={self.support!r}, confidence={self.confidence!r}, lift={self.lift!r}, "
+                f"context={self.context!r})")
+
+    def materialize(self) -> ContextualRule:
+        """Standalone ContextualRule copy of this row."""
+        return ContextualRule(
+            antecedent=self.antecedent, consequent=self.consequent,
+            support=self.support, confidence=self.confidence, lift=self.lift,
+            context=self.context, profit_score=self.profit_score,
+            diversity_score=self.diversity_score, overall_score=self.overall_score,
+        )
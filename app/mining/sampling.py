@@ -0,0 +1,197 @@
+"""
+Sampling-based approximate mining with an exact verification pass.
+
+Toivonen's method: mine a random sample of baskets at a lowered support
+threshold, then count the sample's frequent itemsets together with their
+negative border (minimal itemsets not frequent in the sample) exactly over
+the full data. Reported supports are always exact. If no border itemset turns
+out frequent, the result is also provably complete; otherwise the miss is
+either repaired by further exact level-wise passes or reported.
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .basket_matrix import BasketMatrix, apriori_gen, min_support_count
+from .engine_selector import EngineSelector, SegmentProfile
+
+
+@dataclass
+class SamplingConfig:
+    """How much of a segment to sample and how strict the verification is."""
+    sample_size: Optional[int] = None     # Fixed sample size (baskets)
+    time_budget_ms: Optional[float] = None  # Target mining time; sample is scaled to fit
+    delta: float = 0.05                   # Failure probability for the error bound
+    min_sample_size: int = 1000           # Never sample fewer baskets than this
+    complete: bool = True                 # Repair misses with extra exact passes
+    seed: int = 0
+
+
+@dataclass
+class SamplingReport:
+    """Error bounds and verification outcome for one sampled segment."""
+    n_baskets: int
+    sample_size: int
+    sampled: bool             # False when the segment was small enough to mine exactly
+    epsilon: float            # Sample support is within ±epsilon of true support w.p. 1 - delta
+    delta: float
+    lowered_support: float    # Threshold the sample was mined at
+    candidates: int           # Itemsets counted in the verification pass
+    border_size: int          # Negative border itemsets among the candidates
+    border_frequent: int      # Border itemsets that were frequent in the full data
+    extra_passes: int         # Exact passes run to complete the result
+    miss_probability: float   # Per-itemset chance a frequent itemset fell below the lowered threshold
+    complete: bool            # Result is guaranteed to contain every frequent itemset
+
+
+class SampledMiner:
+    """Mines a segment from a random sample and verifies it exactly."""
+
+    def __init__(self, min_support: float, max_len: Optional[int] = None,
+                 selector: Optional[EngineSelector] = None,
+                 config: Optional[SamplingConfig] = None):
+        """
+        Initialize sampled miner.
+
+        Args:
+            min_support: Minimum support threshold over the full segment
+            max_len: Maximum itemset length (None for unlimited)
+            selector: Engine selector used for the sample (and for time budgets)
+            config: Sample size / budget settings (defaults to SamplingConfig())
+        """
+        self.min_support = min_support
+        self.max_len = max_len
+        self.selector = selector or EngineSelector()
+        self.config = config or SamplingConfig()
+        self.logger = logging.getLogger(__name__)
+
+    def sample_size(self, basket: BasketMatrix) -> int:
+        """
+        Number of baskets to sample from a segment.
+
+        A fixed sample_size wins; a time budget scales the segment by the
+        predicted cost of mining it exactly (half the budget is left for the
+        verification pass); otherwise the Hoeffding bound is used so sample
+        supports are within min_support / 2 of the truth with probability 1 - delta.
+
+        Args:
+            basket: Full segment basket matrix
+
+        Returns:
+            Sample size (>= n_baskets means mine exactly)
+        """
+        n = basket.n_baskets
+        config = self.config
+        if config.sample_size is not None:
+            m = config.sample_size
+        elif config.time_budget_ms is not None:
+            profile = SegmentProfile.from_basket(basket, self.min_support, self.max_len)
+            full_seconds = min(self.selector.estimate(name, profile)
+                               for name in self.selector.eligible(profile))
+            budget_seconds = config.time_budget_ms / 1000.0 / 2
+            m = n if full_seconds <= budget_seconds else int(n * budget_seconds / full_seconds)
+        else:
+            epsilon = self.min_support / 2
+            m = int(math.ceil(math.log(2 / config.delta) / (2 * epsilon ** 2)))
+        return min(max(m, config.min_sample_size), n)
+
+    def mine(self, basket: BasketMatrix) -> Tuple[pd.DataFrame, SamplingReport]:
+        """
+        Mine frequent itemsets from a sample, verified over the full segment.
+
+        Args:
+            basket: Full segment basket matrix
+
+        Returns:
+            Tuple of (frequent itemsets DataFrame with exact supports, SamplingReport)
+        """
+        n = basket.n_baskets
+        m = self.sample_size(basket)
+        delta = self.config.delta
+
+        if m >= n:
+            engine = self.selector.select(basket, self.min_support, self.max_len).engine
+            itemsets = engine.mine_matrix(basket, min_support=self.min_support, max_len=self.max_len)
+            report = SamplingReport(n_baskets=n, sample_size=n, sampled=False, epsilon=0.0, delta=delta,
+                                    lowered_support=self.min_support, candidates=0, border_size=0,
+                                    border_frequent=0, extra_passes=0, miss_probability=0.0, complete=True)
+            return itemsets, report
+
+        rng = np.random.default_rng(self.config.seed)
+        sample = basket.take(np.sort(rng.choice(n, size=m, replace=False)))
+        epsilon = math.sqrt(math.log(2 / delta) / (2 * m))
+        # Floor keeps the sample's candidate set from exploding on small samples
+        lowered = max(self.min_support - epsilon, self.min_support / 2)
+
+        engine = self.selector.select(sample, lowered, self.max_len).engine
+        sample_itemsets = engine.mine_matrix(sample, min_support=lowered, max_len=self.max_len)
+
+        column_of = {str(item): k for k, item in enumerate(basket.items)}
+        in_sample = {tuple(sorted(column_of[label] for label in itemset))
+                     for itemset in sample_itemsets['itemsets']}
+        border = self._negative_border(in_sample, basket.n_items)
+
+        candidates = sorted(in_sample) + border
+        counts = dict(zip(candidates, basket.count_itemsets(candidates)))
+        min_count = min_support_count(self.min_support, n)
+        border_frequent = sum(1 for itemset in border if counts[itemset] >= min_count)
+
+        extra_passes = 0
+        if border_frequent and self.config.complete:
+            extra_passes = self._complete(basket, counts, min_count)
+
+        frequent = {itemset: count for itemset, count in counts.items() if count >= min_count}
+        report = SamplingReport(
+            n_baskets=n, sample_size=m, sampled=True, epsilon=epsilon, delta=delta,
+            lowered_support=lowered, candidates=len(candidates), border_size=len(border),
+            border_frequent=border_frequent, extra_passes=extra_passes,
+            miss_probability=math.exp(-2 * m * (self.min_support - lowered) ** 2),
+            complete=border_frequent == 0 or self.config.complete,
+        )
+        self.logger.debug(f"Sampled {m}/{n} baskets at support {lowered:.4f}: {report}")
+        return self._to_frame(frequent, basket, n), report
+
+    def _negative_border(self, frequent: set, n_items: int) -> List[Tuple[int, ...]]:
+        """Minimal itemsets (within max_len) not frequent in the sample whose subsets all are."""
+        border = [(k,) for k in range(n_items) if (k,) not in frequent]
+        by_size: Dict[int, List[Tuple[int, ...]]] = {}
+        for itemset in frequent:
+            by_size.setdefault(len(itemset), []).append(itemset)
+        for size, level in sorted(by_size.items()):
+            if self.max_len is not None and size >= self.max_len:
+                break
+            border.extend(c for c in apriori_gen(level) if c not in frequent)
+        return border
+
+    def _complete(self, basket: BasketMatrix, counts: Dict[Tuple[int, ...], int],
+                  min_count: int) -> int:
+        """Exactly count any level-wise candidates the sample never produced."""
+        passes = 0
+        size = 1
+        while self.max_len is None or size < self.max_len:
+            level = [itemset for itemset, count in counts.items()
+                     if len(itemset) == size and count >= min_count]
+            if not level:
+                break
+            missing = [c for c in apriori_gen(level) if c not in counts]
+            if missing:
+                counts.update(zip(missing, basket.count_itemsets(missing)))
+                passes += 1
+            size += 1
+        return passes
+
+    @staticmethod
+    def _to_frame(frequent: Dict[Tuple[int, ...], int], basket: BasketMatrix, n: int) -> pd.DataFrame:
+        if not frequent:
+            return pd.DataFrame(columns=['support', 'itemsets'])
+        labels = [str(item) for item in basket.items]
+        result = pd.DataFrame({
+            'support': [count / n for count in frequent.values()],
+            'itemsets': [frozenset(labels[k] for k in itemset) for itemset in frequent],
+        })
+        return result.sort_values('support', ascending=False, kind='mergesort').reset_index(drop=True)
@@ -0,0 +1,47 @@
+"""Rolling time windows and recency weights for transaction data."""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def window_transactions(transactions: pd.DataFrame, window_days: Optional[float],
+                        anchor: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """
+    Keep line items whose transaction falls inside a trailing window.
+
+    Args:
+        transactions: Line items with a timestamp column
+        window_days: Window length in days (None or <= 0 keeps everything)
+        anchor: End of the window (defaults to the latest timestamp in the data)
+
+    Returns:
+        Line items within (anchor - window_days, anchor]
+    """
+    if not window_days or window_days <= 0 or transactions.empty:
+        return transactions
+    timestamps = pd.to_datetime(transactions['timestamp'], errors='coerce')
+    anchor = anchor if anchor is not None else timestamps.max()
+    start = anchor - pd.Timedelta(days=window_days)
+    return transactions[(timestamps > start) & (timestamps <= anchor)]
+
+
+def decay_weights(transactions: pd.DataFrame, half_life_days: float,
+                  anchor: Optional[pd.Timestamp] = None) -> pd.Series:
+    """
+    Exponential recency weight per transaction (1.0 at the anchor, 0.5 one half-life earlier).
+
+    Args:
+        transactions: Line items with transaction_id and timestamp columns
+        half_life_days: Age in days at which a basket counts half
+        anchor: Reference time (defaults to the latest timestamp in the data)
+
+    Returns:
+        Series of weights indexed by transaction_id
+    """
+    baskets = transactions.drop_duplicates('transaction_id').set_index('transaction_id')
+    timestamps = pd.to_datetime(baskets['timestamp'], errors='coerce')
+    anchor = anchor if anchor is not None else timestamps.max()
+    age_days = ((anchor - timestamps).dt.total_seconds() / 86400.0).clip(lower=0).fillna(0.0)
+    return pd.Series(np.exp2(-age_days.to_numpy() / half_life_days), index=baskets.index)
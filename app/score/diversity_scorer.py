@@ -2,7 +2,11 @@ from typing import List, Dict
 from collections import defaultdict
 import logging
 
+import numpy as np
+from scipy import sparse
+
 from ..mining.context_types import ContextualRule
+from ..mining.rule_set import RuleSet
 
 
 class DiversityScorer:
@@ -66,6 +70,41 @@ class DiversityScorer:
             self.logger.error(f"Error calculating diversity for rule {rule}: {e}")
             return 0.5  # Neutral score on error
 
+    def calculate_diversities(self, rules: RuleSet) -> np.ndarray:
+        """
+        Diversity score of every rule in a RuleSet, against rules of the same context.
+
+        Same definition as calculate_diversity, computed for all rules at once
+        from per-context item counts.
+
+        Args:
+            rules: Rules to score
+
+        Returns:
+            Diversity score per rule between 0 and 1
+        """
+        n = len(rules)
+        if n == 0:
+            return np.zeros(0)
+
+        incidence = rules.item_matrix('both').tocoo()
+        context_sizes = np.bincount(rules.context_ids, minlength=len(rules.contexts))
+        membership = sparse.csr_matrix(
+            (np.ones(n, dtype=np.int32), (rules.context_ids, np.arange(n))),
+            shape=(len(rules.contexts), n),
+        )
+        # Rules per context holding each item
+        item_counts = (membership @ incidence.tocsr()).tocsr()
+
+        rule_contexts = rules.context_ids[incidence.row]
+        frequencies = np.asarray(item_counts[rule_contexts, incidence.col]).ravel() / context_sizes[rule_contexts]
+        rule_sizes = np.bincount(incidence.row, minlength=n)
+        avg_frequency = np.bincount(incidence.row, weights=frequencies, minlength=n) / np.maximum(rule_sizes, 1)
+
+        diversity = np.clip(1.0 - avg_frequency, 0.0, 1.0)
+        # A rule alone in its context (or with no items) has maximum diversity
+        return np.where((context_sizes[rules.context_ids] <= 1) | (rule_sizes == 0), 1.0, diversity)
+
     def calculate_context_diversity_stats(self, rules: List[ContextualRule]) -> Dict[str, float]:
         """
         Calculate diversity statistics for all contexts.
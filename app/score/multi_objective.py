@@ -1,10 +1,12 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 import logging
+import numpy as np
 import pandas as pd
 
 from .profit_calculator import ProfitCalculator
 from .diversity_scorer import DiversityScorer
 from ..mining.context_types import ContextualRule
+from ..mining.rule_set import RuleSet
 
 
 class MultiObjectiveScorer:
@@ -33,77 +35,74 @@ class MultiObjectiveScorer:
         if abs(total_weight - 1.0) > 0.001:
             self.logger.warning(f"Weights don't sum to 1.0: {total_weight}")
 
-    def score_rules(self, rules: List[ContextualRule],
-                   transactions: pd.DataFrame) -> List[ContextualRule]:
+    def score_rules(self, rules: Union[RuleSet, List[ContextualRule]],
+                   transactions: pd.DataFrame) -> Union[RuleSet, List[ContextualRule]]:
         """
         Score rules WITHIN each context separately using multi-objective scoring.
 
         Overall_score = w_lift*norm(lift) + w_profit*norm(profit) + w_diversity*diversity + w_confidence*confidence
 
+        Scoring runs on the rule columns; a list of ContextualRule objects is
+        scored through a temporary RuleSet and its objects updated in place.
+
         Args:
-            rules: List of contextual rules to score
+            rules: RuleSet or list of contextual rules to score
             transactions: Transaction data for profit calculations
 
         Returns:
-            Same rules list with profit_score, diversity_score, and overall_score populated
+            Rules sorted by overall_score (descending) with profit_score,
+            diversity_score, and overall_score populated; a RuleSet when given one
         """
-        # Group rules by context
-        context_groups = {}
-        for rule in rules:
-            ctx = rule.context
-            ctx_key = str(ctx)  # Use string representation as key
-            if ctx_key not in context_groups:
-                context_groups[ctx_key] = []
-            context_groups[ctx_key].append(rule)
-
-        self.logger.info(f"Scoring rules across {len(context_groups)} contexts")
-
-        scored_rules = []
-
-        # Score each context group separately
-        for ctx_key, ctx_rules in context_groups.items():
-            self.logger.debug(f"Scoring {len(ctx_rules)} rules in context: {ctx_key}")
-
-            # Calculate profit for all rules in this context
-            for rule in ctx_rules:
-                rule.profit_score = self.profit_calc.calculate_rule_profit(rule, transactions)
-
-            # Calculate diversity within this context
-            for rule in ctx_rules:
-                rule.diversity_score = self.diversity_scorer.calculate_diversity(rule, ctx_rules)
-
-            # Get normalization ranges for this context
-            lift_vals = [r.lift for r in ctx_rules]
-            profit_vals = [r.profit_score for r in ctx_rules]
-
-            lift_min, lift_max = min(lift_vals), max(lift_vals)
-            profit_min, profit_max = min(profit_vals), max(profit_vals)
-
+        if isinstance(rules, RuleSet):
+            order = self._score_columns(rules, transactions)
+            return rules.take(order)
+
+        rule_set = RuleSet.from_rules(rules)
+        order = self._score_columns(rule_set, transactions)
+        for rule, profit, diversity, overall in zip(
+            rules, rule_set.profit_score, rule_set.diversity_score, rule_set.overall_score
+        ):
+            rule.profit_score = float(profit)
+            rule.diversity_score = float(diversity)
+            rule.overall_score = float(overall)
+        return [rules[i] for i in order]
+
+    def _score_columns(self, rules: RuleSet, transactions: pd.DataFrame) -> np.ndarray:
+        """Fill a RuleSet's score columns and return the descending overall_score order."""
+        if len(rules) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        # Group rules by context (by label, as contexts are shown to users)
+        groups, labels = pd.factorize(rules.context_labels())
+        self.logger.info(f"Scoring rules across {len(labels)} contexts")
+
+        rules.profit_score[:] = self.profit_calc.calculate_rule_profits(rules, transactions)
+        rules.diversity_score[:] = self.diversity_scorer.calculate_diversities(rules)
+
+        # Normalize lift and profit within each context
+        frame = pd.DataFrame({'group': groups, 'lift': rules.lift, 'profit': rules.profit_score})
+        by_group = frame.groupby('group')
+        norm = {}
+        for column in ('lift', 'profit'):
+            low = by_group[column].transform('min').to_numpy()
+            high = by_group[column].transform('max').to_numpy()
             # Handle edge case where all values are the same
-            lift_range = lift_max - lift_min if lift_max != lift_min else 1.0
-            profit_range = profit_max - profit_min if profit_max != profit_min else 1.0
-
-            # Calculate overall score for each rule in this context
-            for rule in ctx_rules:
-                # Normalize lift and profit within this context
-                norm_lift = (rule.lift - lift_min) / lift_range
-                norm_profit = (rule.profit_score - profit_min) / profit_range
-
-                # Calculate overall score
-                rule.overall_score = (
-                    self.weights['lift'] * norm_lift +
-                    self.weights['profit_margin'] * norm_profit +
-                    self.weights['diversity'] * rule.diversity_score +
-                    self.weights['confidence'] * rule.confidence
-                )
-
-            scored_rules.extend(ctx_rules)
-
-        # Sort all rules by overall score (descending)
-        scored_rules.sort(key=lambda r: r.overall_score, reverse=True)
-
-        self.logger.info(f"Scored {len(scored_rules)} rules total")
-        return scored_rules
+            spread = np.where(high != low, high - low, 1.0)
+            norm[column] = (frame[column].to_numpy() - low) / spread
+
+        rules.overall_score[:] = (
+            self.weights['lift'] * norm['lift'] +
+            self.weights['profit_margin'] * norm['profit'] +
+            self.weights['diversity'] * rules.diversity_score +
+            self.weights['confidence'] * rules.confidence
+        )
+
+        # Contexts in order of first appearance, then a stable sort by score
+        grouped = np.argsort(groups, kind='stable')
+        order = grouped[np.argsort(-rules.overall_score[grouped], kind='stable')]
+
+        self.logger.info(f"Scored {len(rules)} rules total")
+        return order
 
     def get_scoring_weights(self) -> Dict[str, float]:
         """Get current scoring weights."""
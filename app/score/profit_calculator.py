@@ -1,8 +1,11 @@
+import numpy as np
 import pandas as pd
 from typing import Optional
 import logging
 
 from ..mining.context_types import ContextualRule
+from ..mining.hierarchy import CATEGORY_PREFIX
+from ..mining.rule_set import RuleSet
 
 
 class ProfitCalculator:
@@ -59,6 +62,55 @@ class ProfitCalculator:
             self.logger.error(f"Error calculating profit for rule {rule}: {e}")
             return 0.0
 
+    def calculate_rule_profits(self, rules: RuleSet, transactions: pd.DataFrame) -> np.ndarray:
+        """
+        Expected incremental profit per basket for every rule in a RuleSet.
+
+        Same formula as calculate_rule_profit, computed from per-item price and
+        margin totals so each rule costs one sparse row product.
+
+        Args:
+            rules: Rules to evaluate
+            transactions: Transaction data with price and margin information
+
+        Returns:
+            Profit per rule (0.0 where no consequent item appears in the data)
+        """
+        if len(rules) == 0:
+            return np.zeros(0)
+
+        labels = transactions['item_id'].astype(str)
+        lines = pd.DataFrame({
+            'rows': 1,
+            'price_sum': transactions['price'].fillna(0.0),
+            'price_rows': transactions['price'].notna().astype(int),
+        })
+        if 'margin_pct' in transactions.columns:
+            lines['margin_sum'] = transactions['margin_pct'].fillna(self.default_margin_pct)
+        per_item = lines.groupby(labels.to_numpy()).sum()
+        if 'category' in transactions.columns:
+            # Category items from multi-level mining average over every line of the category
+            known = transactions['category'].notna().to_numpy()
+            categories = (CATEGORY_PREFIX + transactions['category'][known].astype(str)).to_numpy()
+            per_item = pd.concat([per_item, lines[known].groupby(categories).sum()])
+        per_item = per_item.reindex(rules.items.astype(str), fill_value=0)
+
+        consequents = rules.item_matrix('consequent')
+        rows = consequents @ per_item['rows'].to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg_price = (consequents @ per_item['price_sum'].to_numpy(dtype=np.float64)) / \
+                (consequents @ per_item['price_rows'].to_numpy(dtype=np.float64))
+            if 'margin_sum' in per_item.columns:
+                avg_margin = (consequents @ per_item['margin_sum'].to_numpy(dtype=np.float64)) / rows
+            else:
+                avg_margin = self.default_margin_pct
+            profit = avg_price * avg_margin * rules.confidence
+
+        missing = rows == 0
+        if missing.any():
+            self.logger.warning(f"No transaction data found for the consequents of {int(missing.sum())} rules")
+        return np.where(missing, 0.0, profit)
+
     def _get_margin(self, item_data: pd.DataFrame) -> float:
         """
         Calculate average margin percentage from item data.
@@ -40,3 +40,53 @@ def sample_csv_path():
             f.write("transaction_id,date,item_id,price,cost\n")
             f.write("1,2023-01-01,apple,1.0,0.5\n")
     return path
+
+
+def _grocery_items(tid):
+    """Default basket: milk and bread, eggs in every third basket, jam in every fourth."""
+    items = ['milk', 'bread'] if tid % 3 else ['milk', 'eggs', 'bread']
+    if tid % 4 == 0:
+        items.append('jam')
+    return items
+
+
+def _build_baskets(n, base=None, extra=None, festival=None, stores=3):
+    """
+    Line items of n synthetic baskets with context columns.
+
+    Basket tid is in store S{tid % stores} and in the morning (odd tid) or
+    evening (even tid); transaction ids are zero-padded so they sort in basket order.
+
+    Args:
+        n: Number of baskets
+        base: Items of basket tid (defaults to milk / bread / eggs / jam); an item
+            may be a dict of line columns holding at least item_id
+        extra: Items appended to basket tid
+        festival: context_festival of basket tid (column omitted when None)
+        stores: Number of stores
+    """
+    import pandas as pd
+
+    base = base or _grocery_items
+    width = len(str(max(n - 1, 0)))
+    rows = []
+    for tid in range(n):
+        basket = {'transaction_id': f'{tid:0{width}d}', 'store_id': f'S{tid % stores}',
+                  'context_time_bin': 'morning' if tid % 2 else 'evening'}
+        if festival is not None:
+            basket['context_festival'] = festival(tid)
+        for item in list(base(tid)) + list(extra(tid) if extra else []):
+            rows.append({**basket, **(item if isinstance(item, dict) else {'item_id': item})})
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def synthetic_baskets():
+    """Builder for synthetic line-item DataFrames (see _build_baskets)."""
+    return _build_baskets
+
+
+@pytest.fixture
+def multi_core(monkeypatch):
+    """Report four cores, so n_jobs=2 exercises the process pool on any machine."""
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
@@ -40,6 +40,11 @@ def test_rules_endpoint(client):
     response = client.get("/api/rules")
     assert response.status_code == 200
     assert isinstance(response.json(), list)
+    assert response.headers["X-Partial-Result"] in ("true", "false")
+
+    response = client.get("/api/rules", params={"deadline_ms": 60000})
+    assert response.status_code == 200
+    assert response.headers["X-Partial-Result"] == "false"
 
 def test_bundles_endpoint(client):
     """Test /api/bundles endpoint."""
@@ -72,3 +77,43 @@ def test_api_error_handling(client):
     # Test invalid upload (no file)
     response = client.post("/api/upload")
     assert response.status_code == 422 # Validation error
+
+def test_db_metrics_endpoint(client):
+    """Test /api/metrics/db exposes statement statistics."""
+    client.get("/api/settings/overview")
+    response = client.get("/api/metrics/db")
+    assert response.status_code == 200
+    data = response.json()
+    assert "statements" in data
+    assert "slow_queries" in data
+
+
+def test_budget_adjusted_mining_is_reported(client, monkeypatch):
+    """Rules and bundles mined at budget-adjusted thresholds say so in X-Mining-Adjusted."""
+    import dataclasses
+    from app.api.services import get_analytics_service
+    from app.mining.cost_estimator import CostEstimator
+
+    original = CostEstimator.plan
+
+    def adjusting_plan(self, basket, tasks, min_support, max_len=None):
+        plan = original(self, basket, tasks, min_support * 2, 2)
+        return dataclasses.replace(plan, adjusted=True)
+
+    service = get_analytics_service()
+    service.clear_cache()
+    response = client.get("/api/rules", params={"min_support": 0.05})
+    assert response.headers["X-Mining-Adjusted"] == "false"
+
+    service.clear_cache()
+    monkeypatch.setattr(CostEstimator, "plan", adjusting_plan)
+    try:
+        for endpoint in ("/api/rules", "/api/bundles"):
+            response = client.get(endpoint, params={"min_support": 0.05})
+            assert response.status_code == 200
+            assert response.headers["X-Mining-Adjusted"] == "min_support=0.1; max_len=2"
+            # Cached results keep reporting the adjustment
+            response = client.get(endpoint, params={"min_support": 0.05})
+            assert response.headers["X-Mining-Adjusted"] == "min_support=0.1; max_len=2"
+    finally:
+        service.clear_cache()
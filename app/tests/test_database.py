@@ -0,0 +1,145 @@
+"""Tests for the SQLite database manager."""
+import pytest
+from pathlib import Path
+from app.assets.database import DatabaseManager
+from app.assets.query_metrics import QueryMetrics
+
+
+def _insert_item(db, item_id):
+    db.execute_insert(
+        "INSERT INTO items (item_id, item_name, category, avg_price, margin_pct) VALUES (?, ?, ?, ?, ?)",
+        (item_id, item_id, "Dairy", 1.0, 0.25),
+    )
+
+
+def test_snapshot_ignores_later_writes(temp_db):
+    """A pinned snapshot keeps reading the state it was opened on."""
+    _insert_item(temp_db, "milk")
+
+    with temp_db.snapshot() as snapshot:
+        assert snapshot.get_table_count("items") == 1
+        _insert_item(temp_db, "bread")
+        assert temp_db.get_table_count("items") == 2
+        assert snapshot.get_table_count("items") == 1
+
+    with temp_db.snapshot() as snapshot:
+        assert snapshot.get_table_count("items") == 2
+
+
+def test_copy_snapshot(temp_db):
+    """Copy snapshots read from a temp file that is removed on release."""
+    _insert_item(temp_db, "milk")
+
+    with temp_db.snapshot(copy=True) as snapshot:
+        copy_path = snapshot._copy_path
+        _insert_item(temp_db, "bread")
+        assert snapshot.get_table_count("items") == 1
+
+    assert copy_path is not None
+    assert not Path(copy_path).exists()
+
+
+def test_transaction_is_atomic(temp_db):
+    """Writes inside transaction() become visible together or not at all."""
+    with temp_db.transaction():
+        _insert_item(temp_db, "milk")
+        with temp_db.snapshot() as snapshot:
+            assert snapshot.get_table_count("items") == 0
+        _insert_item(temp_db, "bread")
+    assert temp_db.get_table_count("items") == 2
+
+    with pytest.raises(RuntimeError):
+        with temp_db.transaction():
+            _insert_item(temp_db, "butter")
+            raise RuntimeError("import failed")
+    assert temp_db.get_table_count("items") == 2
+
+
+def test_memory_database_snapshot():
+    """In-memory databases fall back to the shared connection."""
+    db = DatabaseManager(":memory:")
+    _insert_item(db, "milk")
+    with db.snapshot() as snapshot:
+        assert snapshot.get_table_count("items") == 1
+    assert db.get_table_count("items") == 1
+    db.close()
+
+
+def test_query_metrics_record_latency_and_rows(tmp_path):
+    """Statements are aggregated per normalized SQL with row counts."""
+    metrics = QueryMetrics(slow_query_ms=1e9)
+    db = DatabaseManager(str(tmp_path / "metrics.db"), metrics=metrics)
+    _insert_item(db, "milk")
+    _insert_item(db, "bread")
+    db.execute_query("SELECT *   FROM items")
+
+    stats = {s["statement"]: s for s in metrics.snapshot()["statements"]}
+    select = stats["SELECT * FROM items"]
+    assert select["count"] == 1
+    assert select["rows"] == 2
+    assert sum(select["histogram"].values()) == 1
+    inserts = [s for s in stats.values() if s["kind"] == "insert"]
+    assert inserts[0]["count"] == 2
+    db.close()
+
+
+def test_slow_query_log_attaches_plan(tmp_path):
+    """Queries above the threshold land in the slow log with their plan."""
+    metrics = QueryMetrics(slow_query_ms=0.0)
+    db = DatabaseManager(str(tmp_path / "slow.db"), metrics=metrics)
+    db.execute_query("SELECT * FROM items WHERE item_id = ?", ("milk",))
+
+    slow = metrics.snapshot()["slow_queries"]
+    select = [entry for entry in slow if entry["statement"].startswith("SELECT")][0]
+    assert select["plan"]
+    db.close()
+
+
+
+def test_streamed_baskets_mine_like_a_loaded_history(temp_db, synthetic_baskets):
+    """Baskets streamed from the cursor stay whole and mine to the same rules."""
+    import pandas as pd
+    from app.mining.basket_stream import BasketStream
+    from app.mining.context_aware_miner import ContextAwareMiner
+
+    df = synthetic_baskets(40, stores=2)
+    for item in df["item_id"].unique():
+        _insert_item(temp_db, item)
+    baskets = df.drop_duplicates("transaction_id")
+    temp_db.execute_many(
+        "INSERT INTO transactions (transaction_id, timestamp, store_id, context_time_bin) VALUES (?, ?, ?, ?)",
+        [(f"T{tid}", "2024-01-01 09:00:00", store, time_bin) for tid, store, time_bin in zip(
+            baskets["transaction_id"], baskets["store_id"], baskets["context_time_bin"])],
+    )
+    lines = [(f"T{tid}", item, 1.0) for tid, item in zip(df["transaction_id"], df["item_id"])]
+    temp_db.execute_many(
+        "INSERT INTO transaction_items (transaction_id, item_id, price) VALUES (?, ?, ?)", lines
+    )
+
+    query = (
+        "SELECT t.transaction_id, t.store_id, t.context_time_bin, ti.item_id "
+        "FROM transactions t JOIN transaction_items ti ON t.transaction_id = ti.transaction_id "
+        "ORDER BY t.transaction_id"
+    )
+    with temp_db.snapshot() as snapshot:
+        # Fetches of 7 rows cut through baskets; batches must not
+        stream = BasketStream(lambda: snapshot.iter_query(query, batch_size=7), batch_baskets=6)
+        batches = list(stream())
+        assert [batch["transaction_id"].nunique() for batch in batches] == [6] * 6 + [4]
+        assert sum(len(batch) for batch in batches) == len(lines)
+        ids = [set(batch["transaction_id"]) for batch in batches]
+        assert all(not (a & b) for a, b in zip(ids, ids[1:]))
+
+        kwargs = dict(min_support=0.1, min_confidence=0.3, min_rows_per_context=10)
+        streamed = ContextAwareMiner(**kwargs).mine_partitioned(stream, max_depth=2)
+        loaded = ContextAwareMiner(**kwargs).mine_all_contexts(
+            pd.DataFrame(snapshot.execute_query(query)), max_depth=2
+        )
+
+    def rule_map(rules):
+        return {(r.context, r.antecedent, r.consequent): (r.support, r.confidence) for r in rules}
+
+    assert rule_map(loaded)
+    assert rule_map(streamed).keys() == rule_map(loaded).keys()
+    for key, metrics in rule_map(loaded).items():
+        assert rule_map(streamed)[key] == pytest.approx(metrics)
@@ -50,3 +50,30 @@ def test_api_to_ui_flow(temp_db):
     # This is implicitly covered by test_full_pipeline returning RuleResponse objects
     # which are Pydantic models used by the API.
     pass
+
+def test_rolling_window_refresher(temp_db, sample_csv_path):
+    """The refresher persists a rule set that the dashboard reads until data changes."""
+    from app.api.scheduler import RuleRefreshScheduler
+
+    CSVImporter(db_path=temp_db.db_path).import_csv(str(sample_csv_path))
+
+    service = AnalyticsService()
+    service.db = temp_db
+    service.streaming_enabled = True
+    service.rolling_window_days = 7
+    service.decay_half_life_days = 3
+
+    scheduler = RuleRefreshScheduler(service, interval_seconds=3600)
+    assert scheduler.run_once()
+    assert not scheduler.run_once()  # No new data since the last refresh
+
+    precomputed = service.get_precomputed_rules()
+    assert precomputed is not None
+    assert temp_db.get_table_count("association_rules") == len(precomputed)
+    assert service.get_stats()["active_rules"] == len(precomputed)
+
+    temp_db.execute_insert(
+        "INSERT INTO transaction_items (transaction_id, item_id, quantity, price) VALUES (?, ?, ?, ?)",
+        ("new", "milk", 1, 2.0),
+    )
+    assert service.get_precomputed_rules() is None  # Stale until the next refresh
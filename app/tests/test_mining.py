@@ -5,6 +5,7 @@ from app.mining.context_segmenter import ContextSegmenter
 from app.mining.context_types import Context
 from app.mining.fpgrowth import FPGrowthMiner
 from app.mining.eclat import EclatMiner
+from app.mining.basket_matrix import BasketMatrix
 
 # --- Context Segmenter Tests ---
 
@@ -100,6 +101,47 @@ def test_context_combinations():
     assert combined_ctx in segments
     assert len(segments[combined_ctx]) == 2
 
+def test_segments_are_row_positions():
+    """Segments are row positions into the shared frame, matching boolean masks."""
+    df = pd.DataFrame({
+        'transaction_id': [str(i) for i in range(8)],
+        'store_id': ['S1', 'S2', 'S1', 'S2', 'S1', None, 'S2', 'S1'],
+        'context_time_bin': ['morning', 'morning', 'evening', 'evening', 'morning', 'morning', 'morning', 'evening'],
+        'context_festival': ['', 'diwali', '', 'diwali', '', '', 'diwali', ''],
+    })
+
+    segmenter = ContextSegmenter(min_rows=1)
+    segments = segmenter.segment(df)
+
+    positions = segments[Context(store_id='S2', time_bin='morning')]
+    mask = (df['store_id'] == 'S2') & (df['context_time_bin'] == 'morning')
+    assert list(positions) == list(mask.to_numpy().nonzero()[0])
+    assert segmenter.take(df, positions)['transaction_id'].tolist() == ['1', '6']
+    # Empty festival values are not a festival context
+    assert Context(festival_period='') not in segments
+    # Festivals keep their minimum-row floor
+    assert Context(festival_period='diwali') not in segments
+    assert list(segments[Context(store_id='S1')]) == [0, 2, 4, 7]
+
+def test_context_lattice_beyond_two_dimensions():
+    """The lattice reaches store × time × festival and prunes below min_rows."""
+    n = 60
+    df = pd.DataFrame({
+        'transaction_id': [str(i) for i in range(n)],
+        'store_id': ['S1' if i < 40 else 'S2' for i in range(n)],
+        'context_time_bin': ['morning' if i % 2 else 'evening' for i in range(n)],
+        'context_festival': ['diwali' if i < 36 else '' for i in range(n)],
+    })
+
+    segmenter = ContextSegmenter(min_rows=30)
+    segments = segmenter.segment(df, max_depth=3)
+
+    # Festival combinations use the lower max(min_rows // 3, 15) threshold
+    diwali_morning = Context(store_id='S1', time_bin='morning', festival_period='diwali')
+    assert list(segments[diwali_morning]) == list(range(1, 36, 2))
+    assert Context(store_id='S2', time_bin='morning') not in segments
+    assert Context(store_id='S1', time_bin='morning', festival_period='diwali') not in segmenter.segment(df, max_depth=2)
+
 # --- FP-Growth Tests ---
 
 def test_fpgrowth_itemset_mining():
@@ -184,3 +226,830 @@ def test_eclat_validation():
     assert len(fp_supports) == len(eclat_supports)
     for s1, s2 in zip(fp_supports, eclat_supports):
         assert abs(s1 - s2) < 0.001
+
+def test_fpgrowth_sparse_matches_dense_encoding():
+    """Sparse basket encoding yields the same itemsets as TransactionEncoder."""
+    from mlxtend.preprocessing import TransactionEncoder
+    from mlxtend.frequent_patterns import fpgrowth
+
+    transactions = [
+        ['milk', 'bread', 'butter'],
+        ['milk', 'bread', 'bread'],
+        ['milk', 'diapers'],
+        ['bread', 'butter', 'jam'],
+        ['milk', 'bread', 'jam'],
+    ]
+    te = TransactionEncoder()
+    dense = pd.DataFrame(te.fit(transactions).transform(transactions), columns=te.columns_)
+    expected = fpgrowth(dense, min_support=0.4, use_colnames=True)
+
+    itemsets = FPGrowthMiner().mine(transactions, min_support=0.4)
+
+    assert dict(zip(itemsets['itemsets'], itemsets['support'])) == \
+        dict(zip(expected['itemsets'], expected['support']))
+
+
+def test_basket_matrix_scales_with_line_items():
+    """The basket matrix stores one entry per distinct line item."""
+    from app.mining.basket_matrix import BasketMatrix
+
+    basket = BasketMatrix.from_transactions([['a', 'b'], ['b', 'b', 'c'], []])
+    assert basket.n_baskets == 3
+    assert list(basket.items) == ['a', 'b', 'c']
+    assert basket.nnz == 4
+    assert list(basket.item_counts()) == [1, 2, 1]
+
+
+def test_encode_once_matches_per_segment_encoding(synthetic_baskets):
+    """Segments mined from the shared basket matrix match per-segment encoding."""
+    from app.mining.context_aware_miner import ContextAwareMiner
+
+    df = synthetic_baskets(40, stores=2)
+
+    miner = ContextAwareMiner(min_support=0.2, min_confidence=0.3, min_rows_per_context=5)
+    rules = miner.mine_all_contexts(df, max_depth=1)
+
+    store_rules = {(r.antecedent, r.consequent): r.support
+                   for r in rules if r.context == Context(store_id='S1')}
+    segment = df[df['store_id'] == 'S1']
+    fp = FPGrowthMiner()
+    expected = fp.generate_rules(fp.mine(miner._df_to_transactions(segment), 0.2), 0.3)
+
+    assert store_rules
+    assert store_rules == {
+        (frozenset(r['antecedents']), frozenset(r['consequents'])): r['support']
+        for _, r in expected.iterrows()
+    }
+
+
+def test_parallel_mining_is_deterministic(synthetic_baskets, multi_core):
+    """Process-pool mining returns the same rules, in the same order, as sequential."""
+    from app.mining.context_aware_miner import ContextAwareMiner
+    from app.mining.parallel import resolve_n_jobs
+
+    # Worker counts are capped at the (four reported) cores and the number of tasks
+    assert [resolve_n_jobs(n) for n in (None, 1, 2, 1000, -1, -2, -10)] == [1, 1, 2, 4, 4, 3, 1]
+    assert resolve_n_jobs(1000, n_tasks=3) == 3
+
+    df = synthetic_baskets(60)
+
+    def mine(n_jobs):
+        miner = ContextAwareMiner(min_support=0.2, min_confidence=0.3,
+                                  min_rows_per_context=5, n_jobs=n_jobs)
+        return [(r.context, r.antecedent, r.consequent, r.support)
+                for r in miner.mine_all_contexts(df, max_depth=2)]
+
+    sequential = mine(1)
+    assert sequential
+    assert mine(2) == sequential
+
+
+def test_eclat_finds_large_itemsets_with_exact_metrics():
+    """Eclat finds 3+ itemsets and derives confidence/lift from subset supports."""
+    transactions = [
+        ['milk', 'bread', 'butter'],
+        ['milk', 'bread', 'butter'],
+        ['milk', 'bread'],
+        ['milk', 'butter'],
+        ['bread', 'jam'],
+    ]
+    for use_diffsets in (False, True):
+        miner = EclatMiner(use_diffsets=use_diffsets)
+        itemsets = miner.mine(transactions, min_support=0.4)
+        assert frozenset({'milk', 'bread', 'butter'}) in set(itemsets['itemsets'])
+
+        rules = miner.generate_rules(itemsets, min_confidence=0.0)
+        rule = rules[(rules['antecedents'] == frozenset({'milk', 'bread'})) &
+                     (rules['consequents'] == frozenset({'butter'}))].iloc[0]
+        assert rule['confidence'] == pytest.approx(2 / 3)
+        assert rule['lift'] == pytest.approx((2 / 3) / 0.6)
+
+
+def test_pair_matrix_matches_fpgrowth_rules():
+    """The pair/triple engine yields the same rules as FP-Growth for max_len <= 3."""
+    from app.mining.pair_miner import PairMatrixMiner
+
+    transactions = [
+        ['milk', 'bread', 'butter'],
+        ['milk', 'bread', 'butter', 'jam'],
+        ['milk', 'bread'],
+        ['milk', 'butter'],
+        ['bread', 'jam'],
+        ['milk', 'bread', 'jam'],
+    ]
+    fp = FPGrowthMiner()
+    pairs = PairMatrixMiner()
+    for max_len in (2, 3):
+        basket = BasketMatrix.from_transactions(transactions)
+        expected = fp.generate_rules(fp.mine_matrix(basket, 0.3, max_len=max_len), 0.5)
+        actual = pairs.generate_rules(pairs.mine_matrix(basket, 0.3, max_len=max_len), 0.5)
+
+        def as_dict(rules):
+            return {(r['antecedents'], r['consequents']): (r['support'], r['confidence'], r['lift'])
+                    for _, r in rules.iterrows()}
+
+        assert as_dict(actual) == as_dict(expected)
+
+
+def test_engine_selector_honors_configured_algorithms():
+    """The selector only picks configured engines and skips pairs without a length cap."""
+    from app.mining.engine_selector import EngineSelector
+
+    basket = BasketMatrix.from_transactions([
+        ['milk', 'bread', 'butter'],
+        ['milk', 'bread'],
+        ['bread', 'jam'],
+        ['milk', 'butter'],
+    ])
+    assert EngineSelector(['fpgrowth']).select(basket, 0.25, max_len=2).name == 'fpgrowth'
+    assert EngineSelector(['pairs', 'bogus']).select(basket, 0.25, max_len=None).name == 'fpgrowth'
+
+    # With pairs made free, it wins whenever max_len allows it
+    calibration = {
+        'fpgrowth': {'intercept': 1.0},
+        'eclat': {'intercept': 1.0},
+        'pairs': {'intercept': 0.0},
+    }
+    selector = EngineSelector(calibration=calibration)
+    choice = selector.select(basket, 0.25, max_len=3)
+    assert choice.name == 'pairs'
+    assert '4 baskets' in choice.reason
+    assert selector.select(basket, 0.25, max_len=None).name in ('fpgrowth', 'eclat')
+
+
+def test_single_pass_counting_matches_per_segment_mining(synthetic_baskets):
+    """Counting all contexts in one pass yields the same rules as mining each segment."""
+    from app.mining.context_aware_miner import ContextAwareMiner
+
+    df = synthetic_baskets(60, extra=lambda tid: ['eggs'] if tid % 5 == 0 else [])
+
+    def mine(counting):
+        miner = ContextAwareMiner(min_support=0.1, min_confidence=0.3,
+                                  min_rows_per_context=5, counting=counting)
+        return {(r.context, r.antecedent, r.consequent): (r.support, r.confidence, r.lift)
+                for r in miner.mine_all_contexts(df, max_depth=2)}
+
+    per_segment = mine('per_segment')
+    single_pass = mine('single_pass')
+    assert per_segment
+    assert single_pass.keys() == per_segment.keys()
+    for key, metrics in per_segment.items():
+        assert single_pass[key] == pytest.approx(metrics)
+
+
+def test_incremental_update_matches_full_mine(temp_db, synthetic_baskets):
+    """Folding appended baskets into stored counts gives the same rules as re-mining."""
+    from app.mining.context_aware_miner import ContextAwareMiner
+    from app.mining.incremental import IncrementalMiner
+
+    # 'tea' only becomes frequent once the later baskets arrive
+    df = synthetic_baskets(80, stores=2,
+                           extra=lambda tid: ['tea', 'biscuits'] if tid >= 60 and tid % 2 == 0 else [])
+    df['line_id'] = range(1, len(df) + 1)
+
+    params = dict(min_support=0.1, min_confidence=0.3, min_rows_per_context=5, max_depth=1)
+    initial = df[df['transaction_id'].astype(int) < 60]
+    IncrementalMiner(temp_db, **params).update(initial)
+
+    incremental = IncrementalMiner(temp_db, **params).update(df)
+    full = ContextAwareMiner(min_support=0.1, min_confidence=0.3,
+                             min_rows_per_context=5).mine_all_contexts(df, max_depth=1)
+
+    def as_dict(rules):
+        return {(r.context, r.antecedent, r.consequent): r.support for r in rules}
+
+    assert any('tea' in r.antecedent for r in incremental)
+    assert as_dict(incremental).keys() == as_dict(full).keys()
+    for key, support in as_dict(full).items():
+        assert as_dict(incremental)[key] == pytest.approx(support)
+
+
+def test_incremental_mining_keeps_budget_adjusted_thresholds(temp_db, monkeypatch, synthetic_baskets):
+    """Full incremental mines are planned; FUP updates keep counting at the planned thresholds."""
+    import dataclasses
+    from app.mining.context_aware_miner import ContextAwareMiner
+    from app.mining.cost_estimator import CostEstimator, MiningBudget
+    from app.mining.incremental import IncrementalMiner
+
+    df = synthetic_baskets(80, stores=2)
+    df['line_id'] = range(1, len(df) + 1)
+
+    original = CostEstimator.plan
+
+    def adjusting_plan(self, basket, tasks, min_support, max_len=None):
+        return dataclasses.replace(original(self, basket, tasks, 0.3, 2), adjusted=True)
+
+    monkeypatch.setattr(CostEstimator, "plan", adjusting_plan)
+    params = dict(min_support=0.1, min_confidence=0.3, min_rows_per_context=5, max_depth=1)
+    first = IncrementalMiner(temp_db, budget=MiningBudget(), **params)
+    first.update(df[df['transaction_id'].astype(int) < 60])
+    assert first.adjusted == (0.3, 2)
+    assert IncrementalMiner.stored_params(temp_db)[0]['applied'] == {'min_support': 0.3, 'max_len': 2}
+
+    # A later request with the same parameters resumes at the stored thresholds
+    monkeypatch.setattr(CostEstimator, "plan", original)
+    second = IncrementalMiner(temp_db, budget=MiningBudget(), **params)
+    incremental = second.update(df)
+    assert second.adjusted == (0.3, 2)
+    full = ContextAwareMiner(min_support=0.3, min_confidence=0.3, min_rows_per_context=5,
+                             max_len=2).mine_all_contexts(df, max_depth=1)
+    assert {(r.context, r.antecedent, r.consequent) for r in incremental} == \
+        {(r.context, r.antecedent, r.consequent) for r in full}
+
+
+def test_incremental_state_survives_another_threads_rollback(temp_db, synthetic_baskets):
+    """State is written on its own connection, not inside another thread's open transaction."""
+    import threading
+    from app.mining.incremental import IncrementalMiner
+
+    df = synthetic_baskets(40, stores=2)
+    df['line_id'] = range(1, len(df) + 1)
+
+    opened, saved = threading.Event(), threading.Event()
+
+    def failing_job():
+        with pytest.raises(RuntimeError):
+            with temp_db.transaction():
+                opened.set()
+                saved.wait(timeout=10)
+                raise RuntimeError("job failed")
+
+    job = threading.Thread(target=failing_job)
+    job.start()
+    opened.wait(timeout=10)
+    IncrementalMiner(temp_db, min_support=0.1, min_rows_per_context=5, max_depth=1).update(df)
+    saved.set()
+    job.join()
+
+    assert IncrementalMiner.stored_params(temp_db)
+    assert temp_db.execute_query("SELECT COUNT(*) AS n FROM context_itemset_counts")[0]['n'] > 0
+
+
+def test_weighted_mining_with_unit_weights_matches_unweighted(synthetic_baskets):
+    """Uniform basket weights reproduce unweighted support; decay shifts it toward recent baskets."""
+    from app.mining.context_aware_miner import ContextAwareMiner
+    from app.mining.time_window import decay_weights, window_transactions
+
+    df = synthetic_baskets(40, base=lambda tid: ['milk', 'bread'] if tid < 20 else ['milk', 'eggs'])
+    df['timestamp'] = pd.Timestamp('2024-01-01') + pd.to_timedelta(df['transaction_id'].astype(int), unit='D')
+    miner = ContextAwareMiner(min_support=0.2, min_confidence=0.1, min_rows_per_context=5)
+
+    def supports(rules):
+        return {(r.antecedent, r.consequent): r.support for r in rules}
+
+    unit = pd.Series(1.0, index=df['transaction_id'].unique())
+    plain = supports(miner.mine_all_contexts(df, max_depth=0))
+    assert supports(miner.mine_all_contexts(df, max_depth=0, basket_weights=unit)) == pytest.approx(plain)
+
+    decayed = supports(miner.mine_all_contexts(df, max_depth=0, basket_weights=decay_weights(df, 5)))
+    assert (frozenset({'milk'}), frozenset({'bread'})) not in decayed
+    assert decayed[(frozenset({'milk'}), frozenset({'eggs'}))] > plain[(frozenset({'milk'}), frozenset({'eggs'}))]
+
+    assert window_transactions(df, 10)['transaction_id'].nunique() == 10
+
+
+def test_sampled_mining_verifies_supports_exactly():
+    """Sample-then-verify mining returns exactly the full-data itemsets and supports."""
+    import numpy as np
+    from app.mining.calibration import synthetic_basket
+    from app.mining.sampling import SampledMiner, SamplingConfig
+
+    basket = synthetic_basket(20000, 120, 5, seed=7)
+    exact = EclatMiner().mine_matrix(basket, min_support=0.01)
+
+    for config in (SamplingConfig(sample_size=1500), SamplingConfig(sample_size=1500, seed=3),
+                   SamplingConfig(time_budget_ms=1.0)):
+        itemsets, report = SampledMiner(0.01, config=config).mine(basket)
+        assert report.sampled and report.sample_size < basket.n_baskets
+        assert report.complete and 0 < report.epsilon < 1
+        assert dict(zip(itemsets['itemsets'], itemsets['support'])) == \
+            pytest.approx(dict(zip(exact['itemsets'], exact['support'])))
+
+    # Small segments are mined exactly
+    _, report = SampledMiner(0.01, config=SamplingConfig()).mine(basket.take(np.arange(500)))
+    assert not report.sampled and report.epsilon == 0.0
+
+
+def test_rules_frame_conversion_filters_lift_before_converting():
+    """Frame-to-RuleSet conversion keeps rule order and drops low-lift rules up front."""
+    from app.mining.context_aware_miner import ContextAwareMiner
+
+    rules_df = pd.DataFrame({
+        'antecedents': [frozenset({'milk'}), frozenset({'bread', 'milk'}), frozenset({'milk'})],
+        'consequents': [frozenset({'bread'}), frozenset({'eggs'}), frozenset({'eggs'})],
+        'support': [0.4, 0.2, 0.3],
+        'confidence': [0.8, 0.5, 0.6],
+        'lift': [1.6, 0.9, 1.2],
+    })
+    context = Context(store_id='S1')
+
+    rules = ContextAwareMiner(min_lift=1.0)._to_contextual_rules(context, rules_df)
+    assert [(r.antecedent, r.consequent) for r in rules] == [
+        (frozenset({'milk'}), frozenset({'bread'})),
+        (frozenset({'milk'}), frozenset({'eggs'})),
+    ]
+    assert list(rules.lift) == [1.6, 1.2] and rules[1].context == context
+
+    everything = ContextAwareMiner()._to_contextual_rules(context, rules_df)
+    assert len(everything) == 3 and everything[1].antecedent == frozenset({'bread', 'milk'})
+
+
+def test_closed_and_maximal_itemsets_summarize_frequent_itemsets():
+    """Closed/maximal itemsets match brute force and their rules are exact, non-redundant rules."""
+    import random
+    from app.mining.closed import ClosedItemsetMiner
+
+    rng = random.Random(5)
+    groups = [['milk', 'bread', 'butter', 'eggs'], ['tea', 'sugar', 'biscuits'], ['rice', 'dal']]
+    transactions = []
+    for _ in range(400):
+        basket = set(rng.sample(['salt', 'oil', 'soap', 'jam', 'curd', 'ghee'], 2))
+        for group, p in zip(groups, (0.6, 0.4, 0.3)):
+            if rng.random() < p:
+                basket.update(item for item in group if rng.random() < 0.9)
+        transactions.append(sorted(basket))
+
+    frequent = EclatMiner().mine(transactions, min_support=0.05)
+    support = dict(zip(frequent['itemsets'], frequent['support']))
+    expected_closed = {s for s in support if not any(s < t and support[t] == support[s] for t in support)}
+    expected_maximal = {s for s in support if not any(s < t for t in support)}
+
+    closed = ClosedItemsetMiner('closed').mine(transactions, min_support=0.05)
+    assert set(closed['itemsets']) == expected_closed
+    assert dict(zip(closed['itemsets'], closed['support'])) == pytest.approx(
+        {s: support[s] for s in expected_closed})
+    assert set(closed.loc[closed['maximal'], 'itemsets']) == expected_maximal
+
+    all_rules = EclatMiner().generate_rules(frequent, min_confidence=0.3)
+    all_metrics = {(a, c): (s, conf, lift) for a, c, s, conf, lift in zip(
+        all_rules['antecedents'], all_rules['consequents'], all_rules['support'],
+        all_rules['confidence'], all_rules['lift'])}
+    for mode in ('closed', 'maximal'):
+        miner = ClosedItemsetMiner(mode)
+        rules = miner.generate_rules(miner.mine(transactions, min_support=0.05), min_confidence=0.3)
+        assert 0 < len(rules) < len(all_rules)
+        for a, c, s, conf, lift in zip(rules['antecedents'], rules['consequents'], rules['support'],
+                                       rules['confidence'], rules['lift']):
+            assert all_metrics[(a, c)] == pytest.approx((s, conf, lift))
+
+    with pytest.raises(ValueError):
+        ClosedItemsetMiner('all')
+
+
+def test_closed_itemsets_respect_max_len_and_consequent_cap():
+    """Length-capped closed sets and capped consequents keep every summary brute force has."""
+    from app.mining.closed import ClosedItemsetMiner
+
+    transactions = ([['a', 'b', 'c', 'd']] * 6 + [['a', 'b', 'c', 'd', 'e']] * 4
+                    + [['e', 'f']] * 5 + [['a', 'e']] * 3)
+    basket = BasketMatrix.from_transactions(transactions)
+
+    for max_len in (1, 2, 3, 4):
+        frequent = EclatMiner().mine_matrix(basket, 0.2, max_len=max_len)
+        support = dict(zip(frequent['itemsets'], frequent['support']))
+        expected_closed = {s for s in support if not any(s < t and support[t] == support[s] for t in support)}
+        expected_maximal = {s for s in support if not any(s < t for t in support)}
+
+        closed = ClosedItemsetMiner('closed').mine_matrix(basket, 0.2, max_len=max_len)
+        assert set(closed['itemsets']) == expected_closed
+        assert dict(zip(closed['itemsets'], closed['support'])) == pytest.approx(
+            {s: support[s] for s in expected_closed})
+        assert set(closed.loc[closed['maximal'], 'itemsets']) == expected_maximal
+
+    closed = ClosedItemsetMiner('closed').mine_matrix(basket, 0.2, max_len=3)
+    support = dict(zip(closed['itemsets'], closed['support']))
+    maximal = dict(zip(closed['itemsets'], closed['maximal']))
+    assert support[frozenset('abc')] == pytest.approx(10 / 18)
+    assert not maximal[frozenset('ae')] and maximal[frozenset('abe')]
+
+    frequent = EclatMiner().mine_matrix(basket, 0.2)
+    all_rules = EclatMiner().generate_rules(frequent, 0.5, max_consequent_size=2)
+    all_metrics = {(a, c): (s, conf, lift) for a, c, s, conf, lift in zip(
+        all_rules['antecedents'], all_rules['consequents'], all_rules['support'],
+        all_rules['confidence'], all_rules['lift'])}
+    miner = ClosedItemsetMiner('closed')
+    rules = miner.generate_rules(miner.mine_matrix(basket, 0.2), 0.5, max_consequent_size=2)
+    metrics = {(a, c): (s, conf, lift) for a, c, s, conf, lift in zip(
+        rules['antecedents'], rules['consequents'], rules['support'],
+        rules['confidence'], rules['lift'])}
+    assert len(metrics) == len(rules) and all(len(c) <= 2 for _, c in metrics)
+    for key, values in metrics.items():
+        assert all_metrics[key] == pytest.approx(values)
+    for consequent in ('a', 'c', 'd', 'ac', 'cd'):
+        assert metrics[(frozenset('b'), frozenset(consequent))][1] == pytest.approx(1.0)
+
+
+def test_rule_generator_matches_mlxtend_with_pushed_down_constraints():
+    """Pushed-down lift and consequent-size limits give exactly the post-filtered mlxtend rules."""
+    from mlxtend.frequent_patterns import association_rules
+    from app.mining.rule_generator import RuleGenerator
+
+    transactions = [
+        ['milk', 'bread', 'butter', 'eggs'],
+        ['milk', 'bread', 'butter'],
+        ['milk', 'bread', 'eggs', 'jam'],
+        ['milk', 'butter', 'eggs'],
+        ['bread', 'butter', 'eggs', 'jam'],
+        ['milk', 'bread', 'butter', 'eggs', 'jam'],
+        ['tea', 'sugar'],
+        ['milk', 'tea', 'sugar'],
+    ]
+    itemsets = FPGrowthMiner().mine(transactions, min_support=0.2)
+    reference = association_rules(itemsets, metric='confidence', min_threshold=0.4)
+
+    def as_dict(rules):
+        return {(a, c): (s, conf, lift) for a, c, s, conf, lift in zip(
+            rules['antecedents'], rules['consequents'], rules['support'],
+            rules['confidence'], rules['lift'])}
+
+    for min_lift, max_consequent_size in ((0.0, None), (1.2, None), (0.0, 1), (1.1, 2)):
+        rules = RuleGenerator(0.4, min_lift, max_consequent_size).generate(itemsets)
+        expected = reference[(reference['lift'] >= min_lift) & (
+            reference['consequents'].map(len) <= (max_consequent_size or 10))]
+        assert len(rules) == len(expected) > 0
+        actual, wanted = as_dict(rules), as_dict(expected)
+        assert actual.keys() == wanted.keys()
+        for key, metrics in wanted.items():
+            assert actual[key] == pytest.approx(metrics)
+        assert list(rules['confidence']) == sorted(rules['confidence'], reverse=True)
+
+
+def test_cost_estimator_predicts_itemsets_and_enforces_budget():
+    """Predicted itemset counts track mined ones; over-budget requests are adjusted or rejected."""
+    import numpy as np
+    from app.mining.calibration import synthetic_basket
+    from app.mining.context_aware_miner import ContextAwareMiner
+    from app.mining.cost_estimator import CostEstimator, MiningBudget, MiningBudgetExceeded
+
+    basket = synthetic_basket(4000, 40, 8, seed=1)
+    estimator = CostEstimator()
+    for min_support in (0.02, 0.08):
+        predicted, truncated = estimator.predict_itemsets(basket, min_support)
+        actual = EclatMiner().mine_matrix(basket, min_support)
+        assert not truncated
+        assert predicted[0] == (actual['itemsets'].map(len) == 1).sum()
+        assert 0.5 <= sum(predicted) / len(actual) <= 2.0
+
+    tasks = [(Context(), np.arange(basket.n_baskets))]
+    loose = CostEstimator(MiningBudget(time_budget_ms=60000, memory_budget_mb=4096))
+    plan = loose.plan(basket, tasks, 0.02)
+    assert not plan.adjusted and plan.min_support == 0.02
+
+    tight = MiningBudget(time_budget_ms=60000, memory_budget_mb=1.0)
+    plan = CostEstimator(tight).plan(basket, tasks, 0.005)
+    assert plan.adjusted and plan.estimate.fits(tight)
+    assert plan.min_support > 0.005 or plan.max_len is not None
+    assert not plan.requested.fits(tight)
+
+    with pytest.raises(MiningBudgetExceeded, match="over the budget") as excinfo:
+        CostEstimator(MiningBudget(memory_budget_mb=1.0, on_exceed="reject")).plan(basket, tasks, 0.005)
+    assert excinfo.value.suggestion is not None
+
+    # The miner mines with the adjusted parameters
+    rows = [{'transaction_id': str(t), 'item_id': f'sku_{i}'}
+            for t in range(basket.n_baskets)
+            for i in basket.matrix.indices[basket.matrix.indptr[t]:basket.matrix.indptr[t + 1]]]
+    miner = ContextAwareMiner(min_support=0.005, min_confidence=0.1, budget=tight)
+    rules = miner.mine_all_contexts(pd.DataFrame(rows), max_depth=0)
+    assert miner.cost_plan.adjusted and miner.min_support == miner.cost_plan.min_support
+    assert all(r.support >= miner.min_support - 1e-12 for r in rules)
+    assert miner.max_len is None or all(len(r.antecedent | r.consequent) <= miner.max_len for r in rules)
+
+
+def test_contrast_patterns_compare_contexts_with_their_parents(synthetic_baskets):
+    """Emerging patterns report exact supports against every lattice parent."""
+    from app.mining.context_aware_miner import ContextAwareMiner
+
+    # Every S0 evening basket (tid % 6 == 0) has diya + sweets; elsewhere one in ten
+    df = synthetic_baskets(120, base=lambda tid: ['milk', 'bread'],
+                           extra=lambda tid: ['diya', 'sweets'] if tid % 6 == 0 or tid % 10 == 0 else [])
+
+    def support_in(context, itemset):
+        mask = pd.Series(True, index=df.index)
+        if context.store_id:
+            mask &= df['store_id'] == context.store_id
+        if context.time_bin:
+            mask &= df['context_time_bin'] == context.time_bin
+        baskets = df[mask].groupby('transaction_id')['item_id'].agg(set)
+        return baskets.map(lambda items: itemset <= items).mean()
+
+    miner = ContextAwareMiner(min_support=0.1, min_rows_per_context=5, max_len=3)
+    patterns = miner.mine_contrasts(df, max_depth=2, min_growth=2.0)
+
+    pair = frozenset({'diya', 'sweets'})
+    found = {(p.context, p.itemset): p for p in patterns}
+    spike = found[(Context(store_id='S0', time_bin='evening'), pair)]
+    assert spike.support == pytest.approx(1.0)
+    assert spike.parent_support == pytest.approx(support_in(spike.parent, pair))
+    assert spike.parent in Context(store_id='S0', time_bin='evening').parents()
+    # Growth is the smallest ratio over both parents
+    assert spike.growth_rate == pytest.approx(min(
+        1.0 / support_in(parent, pair) for parent in spike.context.parents()
+    ))
+    assert all(p.growth_rate >= 2.0 and len(p.itemset) >= 2 for p in patterns)
+    assert [p.growth_rate for p in patterns] == sorted((p.growth_rate for p in patterns), reverse=True)
+    # Overall has no parent and milk + bread is in every basket
+    assert all(p.context != Context() and p.itemset != frozenset({'milk', 'bread'}) for p in patterns)
+
+
+def test_contrast_mining_is_planned_against_the_budget(synthetic_baskets):
+    """The shared counting pass is priced like rule mining and adjusted or rejected when over budget."""
+    import random
+    from app.mining.context_aware_miner import ContextAwareMiner
+    from app.mining.cost_estimator import MiningBudget, MiningBudgetExceeded
+
+    rng = random.Random(3)
+    catalogue = [f'i{k}' for k in range(30)]
+    df = synthetic_baskets(300, base=lambda tid: rng.sample(catalogue, 12))
+    tight = dict(time_budget_ms=60000, memory_budget_mb=2.0)
+
+    with pytest.raises(MiningBudgetExceeded, match="over the budget"):
+        ContextAwareMiner(min_support=0.001, min_rows_per_context=5,
+                          budget=MiningBudget(**tight, on_exceed="reject")).mine_contrasts(df, max_depth=1)
+
+    miner = ContextAwareMiner(min_support=0.001, min_rows_per_context=5, budget=MiningBudget(**tight))
+    patterns = miner.mine_contrasts(df, max_depth=1)
+    plan = miner.cost_plan
+    assert plan.adjusted and plan.estimate.rules == 0
+    assert (miner.min_support, miner.max_len) == (plan.min_support, plan.max_len) != (0.001, None)
+    assert all(p.support >= plan.min_support for p in patterns)
+    assert plan.max_len is None or all(len(p.itemset) <= plan.max_len for p in patterns)
+
+
+def test_high_utility_mining_finds_rare_high_margin_itemsets(synthetic_baskets):
+    """Utility mining matches brute force and keeps combos too rare for min_support."""
+    from itertools import combinations
+    from app.mining.context_aware_miner import ContextAwareMiner
+
+    def line(item, price, margin):
+        return {'item_id': item, 'price': price, 'quantity': 2 if item == 'milk' else 1, 'margin_pct': margin}
+
+    df = synthetic_baskets(
+        100,
+        base=lambda tid: [line('milk', 2.0, 0.1), line('bread', 1.5, 0.1) if tid % 2 else line('eggs', 3.0, 0.2)],
+        extra=lambda tid: [line('saffron', 40.0, 0.5), line('ghee', 30.0, 0.4)] if tid % 25 == 0 else [],
+    )
+    df['utility'] = df['price'] * df['quantity'] * df['margin_pct']
+
+    miner = ContextAwareMiner(min_support=0.1, min_rows_per_context=5)
+    found = {p.itemset: p for p in miner.mine_high_utility(df, max_depth=0, min_utility=0.05)}
+
+    baskets = df.groupby('transaction_id')
+    total = df['utility'].sum()
+    expected = {}
+    for size in (1, 2, 3, 4):
+        for itemset in combinations(sorted(df['item_id'].unique()), size):
+            value = sum(group.loc[group['item_id'].isin(itemset), 'utility'].sum()
+                        for _, group in baskets if set(itemset) <= set(group['item_id']))
+            if value >= 0.05 * total:
+                expected[frozenset(itemset)] = value
+    assert found.keys() == expected.keys()
+    for itemset, value in expected.items():
+        assert found[itemset].utility == pytest.approx(value)
+
+    # 4% of baskets: pruned by min_support=0.1, but over a quarter of the margin
+    rare = found[frozenset({'saffron', 'ghee'})]
+    assert rare.support == pytest.approx(0.04)
+    assert rare.utility_share > 0.25
+
+
+def test_high_utility_mining_is_planned_against_the_budget(synthetic_baskets):
+    """TWU-weighted predictions price utility mining; over-budget requests are adjusted or rejected."""
+    import random
+    import numpy as np
+    from app.mining.context_aware_miner import ContextAwareMiner
+    from app.mining.cost_estimator import CostEstimator, MiningBudget, MiningBudgetExceeded
+    from app.mining.high_utility import HighUtilityMiner
+
+    rng = random.Random(11)
+    catalogue = [f'i{k}' for k in range(30)]
+    df = synthetic_baskets(
+        300,
+        base=lambda tid: [{'item_id': item, 'price': 1.0 + catalogue.index(item), 'margin_pct': 0.2}
+                          for item in rng.sample(catalogue, 12)],
+    )
+
+    miner = ContextAwareMiner(min_rows_per_context=5)
+    basket, basket_ids, tasks = miner._segment_tasks(df, 0)
+    utility = miner._utility_matrix(df, basket, basket_ids)
+    weights = np.asarray(utility.sum(axis=1)).ravel()
+    # Single items are predicted exactly: those whose TWU share reaches the threshold
+    present = basket.matrix.toarray()
+    twu_share = present.T @ weights / weights.sum()
+    levels, _ = CostEstimator()._predict(CostEstimator._segment(basket, weights), 0.41, 1)[:2]
+    assert levels == [int((twu_share >= 0.41).sum())] and 0 < levels[0] < len(catalogue)
+
+    tight = dict(time_budget_ms=60000, memory_budget_mb=2.0)
+    with pytest.raises(MiningBudgetExceeded, match="min_utility"):
+        ContextAwareMiner(min_rows_per_context=5, budget=MiningBudget(**tight, on_exceed="reject")
+                          ).mine_high_utility(df, max_depth=0, min_utility=0.001)
+
+    adjusting = ContextAwareMiner(min_rows_per_context=5, budget=MiningBudget(**tight))
+    found = adjusting.mine_high_utility(df, max_depth=0, min_utility=0.001)
+    plan = adjusting.cost_plan
+    assert plan.adjusted and plan.estimate.fits(MiningBudget(**tight))
+    assert (plan.min_support, plan.max_len) != (0.001, None) and plan.estimate.threshold == "min_utility"
+    expected = HighUtilityMiner(plan.min_support, plan.max_len).mine_matrix(utility, basket.items)
+    assert {p.itemset for p in found} == set(expected['itemsets'])
+
+
+def test_multi_level_mining_counts_categories_and_drops_redundant_rules(synthetic_baskets):
+    """Category and SKU itemsets are mined together; rules implied by an ancestor are dropped."""
+    from app.mining.context_aware_miner import ContextAwareMiner
+
+    categories = {'d0': 'Dairy', 'd1': 'Dairy', 'd2': 'Dairy', 'b0': 'Bakery', 'b1': 'Bakery',
+                  'jam': 'Spreads', 'tea': 'Beverages'}
+
+    def items(tid):
+        if tid < 120:
+            return [f'd{tid % 2}', f'b{(tid // 2) % 2}']
+        return ['d2', 'jam'] if tid < 160 else ['tea']
+
+    df = synthetic_baskets(200, base=items)
+    df['category'] = df['item_id'].map(categories)
+
+    def mine(multi_level):
+        miner = ContextAwareMiner(min_support=0.05, min_confidence=0.2, min_rows_per_context=5,
+                                  multi_level=multi_level)
+        return {(r.antecedent, r.consequent): r for r in miner.mine_all_contexts(df, max_depth=0)}
+
+    sku_rules = mine(False)
+    rules = mine(True)
+
+    dairy_bakery = rules[(frozenset({'category:Dairy'}), frozenset({'category:Bakery'}))]
+    assert dairy_bakery.support == pytest.approx(0.6)
+    assert dairy_bakery.confidence == pytest.approx(0.75)
+    # d0 always comes with bakery while d2 never does: more than the category rule implies
+    assert (frozenset({'d0'}), frozenset({'category:Bakery'})) in rules
+    assert (frozenset({'d2'}), frozenset({'category:Spreads'})) in rules
+    # jam is the whole Spreads category, so d2 -> jam only restates d2 -> Spreads
+    assert (frozenset({'d2'}), frozenset({'jam'})) in sku_rules
+    assert (frozenset({'d2'}), frozenset({'jam'})) not in rules
+    # b0 is half of bakery with or without d0, so d0 -> b0 restates d0 -> Bakery
+    assert (frozenset({'d0'}), frozenset({'b0'})) in sku_rules
+    assert (frozenset({'d0'}), frozenset({'b0'})) not in rules
+    for antecedent, consequent in rules:
+        itemset = antecedent | consequent
+        assert not any(f'category:{categories[i]}' in itemset for i in itemset if i in categories)
+
+
+def test_partitioned_mining_matches_in_memory_mining(synthetic_baskets, multi_core):
+    """SON over partitions yields exactly the rules of mining the whole history at once."""
+    from app.mining.context_aware_miner import ContextAwareMiner
+
+    # tea is only frequent in the last partition
+    df = synthetic_baskets(150, extra=lambda tid: ['eggs', 'tea'] if tid >= 100 and tid % 5 == 0 else [])
+
+    def partitions():
+        for start in range(0, 150, 50):
+            ids = {f'{tid:03d}' for tid in range(start, start + 50)}
+            yield df[df['transaction_id'].isin(ids)]
+
+    def rule_map(rules):
+        return {(r.context, r.antecedent, r.consequent): (r.support, r.confidence, r.lift) for r in rules}
+
+    kwargs = dict(min_support=0.1, min_confidence=0.3, min_rows_per_context=20, max_len=3)
+    expected = rule_map(ContextAwareMiner(**kwargs).mine_all_contexts(df, max_depth=2))
+    assert expected
+    for n_jobs in (1, 2):
+        rules = ContextAwareMiner(n_jobs=n_jobs, **kwargs).mine_partitioned(partitions, max_depth=2)
+        found = rule_map(rules)
+        assert found.keys() == expected.keys()
+        for key, metrics in expected.items():
+            assert found[key] == pytest.approx(metrics)
+
+
+def test_partitioned_mining_is_planned_against_the_budget(monkeypatch, synthetic_baskets):
+    """SON plans from the first partition: adjusted thresholds apply, over-budget requests are rejected."""
+    import dataclasses
+    from app.mining.context_aware_miner import ContextAwareMiner
+    from app.mining.cost_estimator import CostEstimator, MiningBudget, MiningBudgetExceeded
+
+    df = synthetic_baskets(150)
+
+    def partitions():
+        for start in range(0, 150, 50):
+            ids = {f'{tid:03d}' for tid in range(start, start + 50)}
+            yield df[df['transaction_id'].isin(ids)]
+
+    kwargs = dict(min_support=0.1, min_confidence=0.3, min_rows_per_context=20)
+    with pytest.raises(MiningBudgetExceeded):
+        ContextAwareMiner(budget=MiningBudget(memory_budget_mb=1e-6, on_exceed="reject"), **kwargs) \
+            .mine_partitioned(partitions, max_depth=1, total_baskets=150)
+
+    original = CostEstimator.plan
+    planned = []
+
+    def adjusting_plan(self, basket, tasks, min_support, max_len=None):
+        planned.append((basket.n_baskets, self.budget.time_budget_ms))
+        return dataclasses.replace(original(self, basket, tasks, 0.3, 2), adjusted=True)
+
+    monkeypatch.setattr(CostEstimator, "plan", adjusting_plan)
+    miner = ContextAwareMiner(budget=MiningBudget(time_budget_ms=30000), **kwargs)
+    rules = miner.mine_partitioned(partitions, max_depth=1, total_baskets=150)
+    # One partition of three was sampled, so it gets a third of the time budget
+    assert planned == [(50, pytest.approx(10000))]
+    assert (miner.min_support, miner.max_len) == (0.3, 2)
+    expected = ContextAwareMiner(min_support=0.3, min_confidence=0.3, min_rows_per_context=20, max_len=2)
+    assert {(r.context, r.antecedent, r.consequent) for r in rules} == \
+        {(r.context, r.antecedent, r.consequent) for r in expected.mine_all_contexts(df, max_depth=1)}
+
+
+def test_deadline_mining_returns_priority_contexts_first(synthetic_baskets, multi_core):
+    """A deadline or cancel event stops mining between contexts and flags the result as partial."""
+    import threading
+    import time
+    from app.mining.context_aware_miner import ContextAwareMiner, context_priority
+    from app.mining.cost_estimator import MiningBudget
+
+    df = synthetic_baskets(60, festival=lambda tid: 'Diwali' if tid < 20 else None)
+
+    assert context_priority(Context()) < context_priority(Context(festival_period='Diwali'))
+    assert context_priority(Context(festival_period='Diwali')) < context_priority(Context(store_id='S1'))
+    assert context_priority(Context(store_id='S1')) < context_priority(Context(store_id='S1', time_bin='morning'))
+
+    def rule_keys(rules):
+        return {(r.context, r.antecedent, r.consequent) for r in rules}
+
+    kwargs = dict(min_support=0.2, min_confidence=0.3, min_rows_per_context=5)
+    full = ContextAwareMiner(**kwargs).mine_all_contexts(df, max_depth=2)
+
+    miner = ContextAwareMiner(**kwargs)
+    assert rule_keys(miner.mine_all_contexts(df, max_depth=2, deadline_ms=60_000)) == rule_keys(full)
+    assert not miner.partial and miner.skipped_contexts == []
+
+    cancel = threading.Event()
+    cancel.set()
+    for n_jobs in (1, 2):
+        miner = ContextAwareMiner(n_jobs=n_jobs, budget=MiningBudget(), **kwargs)
+        assert len(miner.mine_all_contexts(df, max_depth=2, cancel=cancel)) == 0
+        assert miner.partial and Context() in miner.skipped_contexts
+        assert miner.cost_plan is None  # Abandoned requests are not planned
+
+    # Planning does not count against the deadline
+    miner = ContextAwareMiner(budget=MiningBudget(), **kwargs)
+    miner._apply_budget = lambda basket, tasks: time.sleep(0.05)
+    rules = miner.mine_all_contexts(df, max_depth=2, deadline_ms=20)
+    assert Context() in {r.context for r in rules}
+
+    # Stop once the first (Overall) context is done
+    checks = iter([False, True])
+    miner = ContextAwareMiner(**kwargs)
+    original = miner._mine_sequential
+
+    def stop_after_first(basket, tasks, should_stop):
+        return original(basket, tasks, lambda: next(checks, True))
+
+    miner._mine_sequential = stop_after_first
+    rules = miner.mine_all_contexts(df, max_depth=2, deadline_ms=60_000)
+    assert miner.partial
+    assert {r.context for r in rules} == {Context()}
+    assert Context() not in miner.skipped_contexts
+
+
+def test_partitioned_and_incremental_mining_stop_on_deadline_or_cancel(temp_db, synthetic_baskets, multi_core):
+    """SON stops between partitions with no rules; incremental updates stop between contexts unsaved."""
+    import threading
+    from app.mining.context_aware_miner import ContextAwareMiner
+    from app.mining.incremental import IncrementalMiner
+
+    df = synthetic_baskets(150)
+    df['line_id'] = range(1, len(df) + 1)
+
+    def rule_keys(rules):
+        return {(r.context, r.antecedent, r.consequent) for r in rules}
+
+    kwargs = dict(min_support=0.1, min_confidence=0.3, min_rows_per_context=20)
+    full = rule_keys(ContextAwareMiner(**kwargs).mine_all_contexts(df, max_depth=1))
+    for n_jobs in (1, 2):
+        cancel = threading.Event()
+
+        def partitions():
+            for start in range(0, 150, 50):
+                ids = {f'{tid:03d}' for tid in range(start, start + 50)}
+                yield df[df['transaction_id'].isin(ids)]
+                cancel.set()
+
+        miner = ContextAwareMiner(n_jobs=n_jobs, **kwargs)
+        assert rule_keys(miner.mine_partitioned(partitions, max_depth=1, deadline_ms=60_000)) == full
+        assert not miner.partial
+        cancel.clear()
+        assert len(miner.mine_partitioned(partitions, max_depth=1, cancel=cancel)) == 0
+        assert miner.partial
+
+    params = dict(min_support=0.1, min_confidence=0.3, min_rows_per_context=20, max_depth=1)
+    cancel = threading.Event()
+    stopping = IncrementalMiner(temp_db, **params)
+    original = stopping._mine_counts
+
+    def count_then_cancel(context, basket):
+        cancel.set()
+        return original(context, basket)
+
+    stopping._mine_counts = count_then_cancel
+    rules = stopping.update(df, cancel=cancel)
+    assert stopping.partial and {r.context for r in rules} == {Context()}
+    assert temp_db.execute_query("SELECT * FROM mining_state") == []
+
+    resumed = IncrementalMiner(temp_db, **params)
+    assert rule_keys(resumed.update(df, deadline_ms=60_000)) == full and not resumed.partial
@@ -169,3 +169,40 @@ def test_score_normalization(sample_transactions):
     r4_score = next(r for r in scored_rules if r == rule4).overall_score
     
     assert abs(r2_score - r4_score) < 0.001
+
+
+def test_rule_set_scoring_matches_per_rule_scoring(sample_transactions):
+    """Columnar scoring of a RuleSet agrees with the per-rule calculators."""
+    from app.mining.rule_set import RuleSet
+
+    ctx1, ctx2 = Context(time_bin='morning'), Context(time_bin='evening')
+    rules = [
+        ContextualRule(frozenset({'milk'}), frozenset({'bread'}), 0.3, 0.8, 2.0, ctx1),
+        ContextualRule(frozenset({'milk'}), frozenset({'cereal', 'butter'}), 0.2, 0.6, 1.2, ctx1),
+        ContextualRule(frozenset({'bread'}), frozenset({'milk'}), 0.2, 0.5, 1.1, ctx1),
+        ContextualRule(frozenset({'eggs'}), frozenset({'jam'}), 0.1, 0.5, 3.0, ctx2),
+    ]
+    rule_set = RuleSet.from_rules(rules)
+
+    profits = ProfitCalculator().calculate_rule_profits(rule_set, sample_transactions)
+    diversities = DiversityScorer().calculate_diversities(rule_set)
+    for i, rule in enumerate(rules):
+        context_rules = [r for r in rules if r.context == rule.context]
+        assert profits[i] == pytest.approx(ProfitCalculator().calculate_rule_profit(rule, sample_transactions))
+        assert diversities[i] == pytest.approx(DiversityScorer().calculate_diversity(rule, context_rules))
+
+    scored = MultiObjectiveScorer().score_rules(rule_set, sample_transactions)
+    assert isinstance(scored, RuleSet)
+    assert list(scored.overall_score) == sorted(scored.overall_score, reverse=True)
+
+    # Views read from the columns and compare equal to the original rules
+    by_items = {(r.antecedent, r.consequent): r for r in rules}
+    for view in scored:
+        original = by_items[(view.antecedent, view.consequent)]
+        assert view.context == original.context and view.lift == original.lift
+        assert view.overall_score is not None
+    assert scored[0].materialize() == scored[0]
+
+    merged = RuleSet.concat([scored[:2], RuleSet.from_rules(rules[3:])])
+    assert len(merged) == 3 and merged[2].consequent == frozenset({'jam'})
+    assert merged[2].overall_score is None